@@ -1,59 +1,265 @@
 # app.py
 
 # Import necessary libraries
-from flask import Flask, render_template, jsonify
-import plotly.express as px
-import pandas as pd
-from datetime import datetime
+import hashlib
 import json
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+from flask import Flask, Response, jsonify, render_template, request, send_file, stream_with_context, url_for
+
+# Signals come from the store the pipeline writes to (src/signal_store.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from downsample import downsample
+from signal_store import get_signal_store
+from signal_stream import InProcessPublisher, get_broadcaster
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Example data - This should be dynamically updated with real-time signals
-signal_data = {
-    "timestamp": [datetime.now().strftime('%Y-%m-%d %H:%M:%S')] * 5,
-    "symbol": ["Bitcoin"] * 5,
-    "signal": [1, 0, 1, -1, 0],  # 1: Buy, 0: Hold, -1: Sell
-    "sentiment": [0.5, 0.2, 0.8, -0.3, 0.1],  # Sentiment score
-    "trend": [65, 50, 70, 30, 55]  # Google Trend scores
-}
-
-# Convert data into a DataFrame
-df_signal = pd.DataFrame(signal_data)
-
-# Plotting function to create interactive graphs
-def create_signal_plot():
-    fig = px.scatter(df_signal, x="timestamp", y="sentiment", color="signal",
-                     labels={'timestamp': 'Time', 'sentiment': 'Sentiment Score'},
-                     title="Real-Time Sentiment Analysis")
-    return fig
-
-def create_trend_plot():
-    fig = px.scatter(df_signal, x="timestamp", y="trend", color="signal",
-                     labels={'timestamp': 'Time', 'trend': 'Google Trend Score'},
-                     title="Real-Time Google Trend Analysis")
-    return fig
-
-# Flask route to serve the dashboard
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Chart payloads: at most this many points per symbol and pixel of viewport width
+DEFAULT_CHART_WIDTH = 1000
+MAX_CHART_WIDTH = 4000
+SIGNAL_COLORSCALE = [[0, '#d62728'], [0.5, '#7f7f7f'], [1, '#2ca02c']]  # Sell / Hold / Buy
+
+
+class VersionedCache:
+    """
+    Small LRU of rendered responses keyed by (store version, request key).
+    Entries for older versions are never hit again and age out.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+
+api_cache = VersionedCache()
+
+
+def make_etag(version, key=''):
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+    return f"v{version}-{digest}"
+
+
+def cached_response(body, etag, mimetype):
+    """Response with an ETag; clients revalidate each time and get a 304 while it matches."""
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified(etag):
+    return request.if_none_match.contains(etag)
+
+
+# Plotting functions: compact Plotly figure specs, downsampled to the viewport
+def create_figure(df_signal, y, title, y_label, n_points, method='lttb'):
+    """
+    Plotly figure spec with one marker trace per symbol, coloured by signal.
+    Each symbol's series is reduced to at most `n_points` points; times are
+    epoch milliseconds on a date axis to keep the JSON small.
+    """
+    traces, raw_points = [], 0
+    for symbol, g in df_signal.dropna(subset=[y]).groupby('symbol', sort=True):
+        x = g['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        values = g[y].to_numpy(dtype=float)
+        idx = downsample(x, values, n_points, method)
+        raw_points += len(x)
+        traces.append({
+            'type': 'scattergl', 'mode': 'markers', 'name': symbol,
+            'x': x[idx].tolist(), 'y': np.round(values[idx], 4).tolist(),
+            'marker': {'color': g['signal'].to_numpy()[idx].tolist(), 'cmin': -1, 'cmax': 1,
+                       'colorscale': SIGNAL_COLORSCALE, 'size': 5},
+        })
+    layout = {'title': {'text': title}, 'uirevision': y,
+              'xaxis': {'type': 'date', 'title': {'text': 'Time'}},
+              'yaxis': {'title': {'text': y_label}}}
+    return {'data': traces, 'layout': layout,
+            'meta': {'points': sum(len(t['x']) for t in traces), 'raw_points': raw_points}}
+
+def create_signal_plot(df_signal, n_points=DEFAULT_CHART_WIDTH, method='lttb'):
+    return create_figure(df_signal, 'sentiment', "Real-Time Sentiment Analysis", 'Sentiment Score',
+                         n_points, method)
+
+def create_trend_plot(df_signal, n_points=DEFAULT_CHART_WIDTH, method='lttb'):
+    return create_figure(df_signal, 'trend', "Real-Time Google Trend Analysis", 'Google Trend Score',
+                         n_points, method)
+
+FIGURES = {'sentiment': create_signal_plot, 'trend': create_trend_plot}
+
+# Flask route to serve the dashboard; figures are fetched as JSON by the page
 @app.route('/')
 def index():
-    # Create plots
-    sentiment_plot = create_signal_plot()
-    trend_plot = create_trend_plot()
-    
-    # Convert plots to HTML format to be embedded in the page
-    sentiment_plot_html = sentiment_plot.to_html(full_html=False)
-    trend_plot_html = trend_plot.to_html(full_html=False)
+    return render_template('index.html', figures=list(FIGURES))
+
+# plotly.js is served once from the installed plotly package and cached by the browser
+@app.route('/assets/plotly.min.js')
+def plotly_js():
+    import plotly
+    path = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+    return send_file(path, mimetype='application/javascript', max_age=365 * 24 * 3600)
+
+@app.context_processor
+def plotly_js_url():
+    from importlib.metadata import version
+    return {'plotly_js_url': url_for('plotly_js', v=version('plotly'))}
+
+# Flask route to provide a downsampled figure spec
+@app.route('/api/figures/<name>', methods=['GET'])
+def api_figure(name):
+    """
+    Figure spec for ?width= pixels (points per symbol), optionally zoomed to
+    ?start=/?end= (a zoomed range gets the same point budget, so finer
+    resolution), for one ?symbol=, with ?method=lttb|minmax. Cached per store
+    version like the signals API.
+    """
+    if name not in FIGURES:
+        return jsonify({'error': f"unknown figure '{name}'"}), 404
+    method = request.args.get('method', 'lttb')
+    if method not in ('lttb', 'minmax'):
+        return jsonify({'error': 'method must be lttb or minmax'}), 400
+    try:
+        width = min(max(int(request.args.get('width', DEFAULT_CHART_WIDTH)), 10), MAX_CHART_WIDTH)
+    except ValueError:
+        return jsonify({'error': 'width must be an integer'}), 400
+    query = {'symbol': request.args.get('symbol'), 'start': request.args.get('start'),
+             'end': request.args.get('end')}
+
+    store = get_signal_store()
+    version = store.version()
+    key = ('figure', name, width, method) + tuple(sorted(query.items()))
+    etag = make_etag(version, key)
+    if not_modified(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
 
-    return render_template('index.html', sentiment_plot=sentiment_plot_html, trend_plot=trend_plot_html)
+    body = api_cache.get((version, key))
+    if body is None:
+        try:
+            df_signal = store.load(**query)
+        except ValueError:
+            return jsonify({'error': 'start and end must be ISO timestamps'}), 400
+        figure = FIGURES[name](df_signal, n_points=width, method=method)
+        body = api_cache.put((version, key), json.dumps(figure, separators=(',', ':')).encode('utf-8'))
+    return cached_response(body, etag, 'application/json')
 
 # Flask route to provide real-time signals via API
 @app.route('/api/real_time_signals', methods=['GET'])
 def api_real_time_signals():
-    # Return current signals data in JSON format
-    return jsonify(df_signal.to_dict(orient="records"))
+    """
+    Signals as JSON, filtered by ?symbol=, ?start=, ?end= (ISO times) and
+    paginated with ?limit= and ?offset=. The body is serialized once per store
+    version and query; a matching If-None-Match gets a 304.
+    """
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be non-negative integers'}), 400
+    query = {'symbol': request.args.get('symbol'), 'start': request.args.get('start'),
+             'end': request.args.get('end'), 'limit': limit, 'offset': offset}
+
+    store = get_signal_store()
+    version = store.version()
+    key = tuple(sorted(query.items()))
+    etag = make_etag(version, key)
+    if not_modified(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    cached = api_cache.get((version, key))
+    if cached is None:
+        try:
+            rows = store.query(**dict(query, limit=limit + 1))
+        except ValueError:
+            return jsonify({'error': 'start and end must be ISO timestamps'}), 400
+        next_offset = offset + limit if len(rows) > limit else None
+        body = json.dumps(rows[:limit], separators=(',', ':')).encode('utf-8')
+        cached = api_cache.put((version, key), (body, next_offset))
+
+    body, next_offset = cached
+    response = cached_response(body, etag, 'application/json')
+    response.headers['X-Signals-Version'] = str(version)
+    if next_offset is not None:
+        response.headers['X-Next-Offset'] = str(next_offset)
+    return response
+
+# Flask route to provide stored SHAP explanations ("why") of the signals
+@app.route('/api/explanations', methods=['GET'])
+def api_explanations():
+    """
+    Explanations as JSON, filtered like the signals API; ?top= keeps each
+    row's largest contributions (default 5). Cached and ETagged per
+    explanations version.
+    """
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        top = int(request.args.get('top', 5))
+        if limit < 1 or offset < 0 or top < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'limit, offset and top must be non-negative integers'}), 400
+    query = {'symbol': request.args.get('symbol'), 'start': request.args.get('start'),
+             'end': request.args.get('end'), 'limit': limit, 'offset': offset, 'top': top}
+
+    store = get_signal_store()
+    version = store.explanations_version()
+    key = ('explanations',) + tuple(sorted(query.items()))
+    etag = make_etag(version, key)
+    if not_modified(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    body = api_cache.get((version, key))
+    if body is None:
+        try:
+            rows = store.query_explanations(**query)
+        except ValueError:
+            return jsonify({'error': 'start and end must be ISO timestamps'}), 400
+        body = api_cache.put((version, key), json.dumps(rows, separators=(',', ':')).encode('utf-8'))
+    return cached_response(body, etag, 'application/json')
+
+# Server-Sent Events stream of new/changed signals
+@app.route('/api/signal_stream', methods=['GET'])
+def api_signal_stream():
+    """
+    Pushes only rows written since the client's cursor. Reconnecting clients
+    resume from the Last-Event-ID header (sent automatically by EventSource)
+    or ?cursor=; ?symbol= limits the stream to one symbol.
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    try:
+        cursor = int(cursor) if cursor is not None else None
+    except ValueError:
+        return jsonify({'error': 'cursor must be an integer event id'}), 400
+
+    stream = get_broadcaster().stream(cursor=cursor, symbol=request.args.get('symbol'))
+    return Response(stream_with_context(stream), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # Running the Flask app
 if __name__ == '__main__':
-    app.run(debug=True)
+    # SIGNALS_DEMO=1 publishes random signals in-process to try the stream locally
+    if os.getenv('SIGNALS_DEMO'):
+        InProcessPublisher(get_broadcaster()).start_demo()
+    app.run(debug=True, threaded=True)
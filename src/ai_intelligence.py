@@ -1,18 +1,26 @@
 # src/ai_intelligence.py
 
-import requests
-import openai
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from pytrends.request import TrendReq
 from datetime import datetime
 import os
+from news_ingest import get_news_ingestor
+from sentiment_service import get_sentiment_service
+from trends_client import get_trends_client
 
-# Load OpenAI key from environment
-openai.api_key = os.getenv("OPENAI_API_KEY")
+_openai = None
 
-analyzer = SentimentIntensityAnalyzer()
-pytrends = TrendReq(hl='en-US', tz=360)
+
+def _get_openai():
+    """Import the OpenAI client on first use (it is slow to import)."""
+    global _openai
+    if _openai is None:
+        import openai
+        from data_loader import load_env
+        # Load OpenAI key from environment (.env included)
+        load_env()
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+        _openai = openai
+    return _openai
 
 
 # 1. Get Crypto News (GNews API)
@@ -20,12 +28,10 @@ def get_crypto_news(keyword="crypto", max_articles=10):
     """
     Fetch latest news articles using GNews API.
     """
-    GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")
-    url = f"https://gnews.io/api/v4/search?q={keyword}&lang=en&max={max_articles}&token={GNEWS_API_KEY}"
     print(f"[*] Fetching news for: {keyword}")
     
-    response = requests.get(url)
-    articles = response.json().get("articles", [])
+    # Shares the ingestion pipeline's pooled session and rate limiter
+    articles = get_news_ingestor().search(keyword, max_articles)
     
     news_data = [
         {
@@ -47,7 +53,7 @@ def summarize_with_gpt(text, model="gpt-3.5-turbo"):
     prompt = f"Summarize the following crypto news in 2-3 bullet points:\n\n{text}"
     
     print("[*] Summarizing with GPT...")
-    response = openai.ChatCompletion.create(
+    response = _get_openai().ChatCompletion.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
         max_tokens=200,
@@ -60,15 +66,11 @@ def summarize_with_gpt(text, model="gpt-3.5-turbo"):
 # 3. Google Trends Tracker
 def get_trend_score(keyword="Bitcoin"):
     """
-    Fetch interest over time for a keyword using Google Trends.
+    Latest Google Trends interest for a keyword (served from the trends cache when fresh).
     """
-    pytrends.build_payload([keyword], timeframe='now 7-d')
-    df = pytrends.interest_over_time()
-    if not df.empty:
-        score = int(df[keyword].iloc[-1])
-        print(f"[✓] Google Trends score for {keyword}: {score}")
-        return score
-    return 0
+    score = get_trends_client().latest_score(keyword, timeframe='now 7-d')
+    print(f"[✓] Google Trends score for {keyword}: {score}")
+    return score
 
 
 # 4. VADER Sentiment Scoring
@@ -76,5 +78,4 @@ def analyze_sentiment(text):
     """
     Score sentiment from -1 (negative) to +1 (positive).
     """
-    sentiment = analyzer.polarity_scores(text)
-    return sentiment['compound']
+    return get_sentiment_service().score(text)
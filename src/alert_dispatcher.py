@@ -0,0 +1,362 @@
+# src/alert_dispatcher.py
+
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from rate_limiter import TokenBucket
+
+SIGNAL_LABELS = {1: 'Buy', 0: 'Hold', -1: 'Sell'}
+
+
+class AlertOutbox:
+    """
+    Persistent SQLite outbox for alerts.
+
+    `pending_signals` holds the latest signal per (chat, symbol) until it is
+    folded into a digest; `outbox` holds messages and documents until they
+    are delivered or give up after too many attempts. Both survive restarts.
+    """
+
+    def __init__(self, path="data/cache/alert_outbox.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_signals (chat_id TEXT, symbol TEXT, payload TEXT, "
+                "created REAL, PRIMARY KEY (chat_id, symbol))")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id TEXT, "
+                "kind TEXT, payload TEXT, status TEXT DEFAULT 'pending', attempts INTEGER DEFAULT 0, "
+                "next_attempt REAL, created REAL, last_error TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)")
+            self._conn.commit()
+
+    def add_signal(self, chat_id, symbol, payload):
+        """Queue a signal for the next digest, replacing an older one for the same symbol."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending_signals VALUES (?, ?, ?, ?) ON CONFLICT (chat_id, symbol) "
+                "DO UPDATE SET payload = excluded.payload",
+                (str(chat_id), symbol, json.dumps(payload), now))
+            self._conn.commit()
+
+    def digest_chats(self, older_than):
+        """Chats whose oldest pending signal was queued before `older_than`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chat_id FROM pending_signals GROUP BY chat_id HAVING MIN(created) <= ?",
+                (older_than,)).fetchall()
+        return [r[0] for r in rows]
+
+    def take_digest(self, chat_id, build):
+        """
+        Turn a chat's pending signals into one outbox message, atomically.
+
+        Args:
+            build (callable): {symbol: payload} -> message text
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT symbol, payload FROM pending_signals WHERE chat_id = ? ORDER BY symbol",
+                (chat_id,)).fetchall()
+            if not rows:
+                return None
+            text = build({symbol: json.loads(payload) for symbol, payload in rows})
+            with self._conn:
+                self._conn.execute("DELETE FROM pending_signals WHERE chat_id = ?", (chat_id,))
+                cursor = self._conn.execute(
+                    "INSERT INTO outbox (chat_id, kind, payload, next_attempt, created) VALUES (?, ?, ?, ?, ?)",
+                    (chat_id, 'message', json.dumps({'text': text}), 0.0, time.time()))
+            return cursor.lastrowid
+
+    def add(self, chat_id, kind, payload):
+        """Queue a 'message' ({'text'}) or 'document' ({'path', 'caption'}) for delivery."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (chat_id, kind, payload, next_attempt, created) VALUES (?, ?, ?, ?, ?)",
+                (str(chat_id), kind, json.dumps(payload), 0.0, time.time()))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def due(self, now, limit=100):
+        """Pending items whose next attempt is due, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, chat_id, kind, payload, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, limit)).fetchall()
+        return [{'id': i, 'chat_id': c, 'kind': k, 'payload': json.loads(p), 'attempts': a}
+                for i, c, k, p, a in rows]
+
+    def mark_sent(self, item_id):
+        self._update(item_id, "status = 'sent', attempts = attempts + 1")
+
+    def retry_later(self, item_id, delay, error):
+        self._update(item_id, "attempts = attempts + 1, next_attempt = ?, last_error = ?",
+                     (time.time() + delay, str(error)))
+
+    def mark_failed(self, item_id, error):
+        self._update(item_id, "status = 'failed', attempts = attempts + 1, last_error = ?", (str(error),))
+
+    def _update(self, item_id, assignments, params=()):
+        with self._lock:
+            self._conn.execute(f"UPDATE outbox SET {assignments} WHERE id = ?", (*params, item_id))
+            self._conn.commit()
+
+    def counts(self):
+        """{status: count} for the outbox, plus 'digest' for signals awaiting a digest."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            counts['digest'] = self._conn.execute("SELECT COUNT(*) FROM pending_signals").fetchone()[0]
+        return counts
+
+
+class FakeBot:
+    """
+    Offline stand-in for `telegram.Bot` that records what would have been sent.
+    The first `fail_first` calls raise, to exercise retries; set `retry_after`
+    to make those failures look like Telegram flood-control errors.
+    """
+
+    def __init__(self, fail_first=0, retry_after=None):
+        self.sent = []
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.calls = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            error = RuntimeError("Flood control exceeded" if self.retry_after else "Network error")
+            error.retry_after = self.retry_after
+            raise error
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self._maybe_fail()
+        self.sent.append({'chat_id': chat_id, 'kind': 'message', 'text': text, 'at': time.time()})
+
+    async def send_document(self, chat_id, document, caption="", **kwargs):
+        self._maybe_fail()
+        self.sent.append({'chat_id': chat_id, 'kind': 'document', 'name': getattr(document, 'name', None),
+                          'caption': caption, 'at': time.time()})
+
+
+def format_digest(signals):
+    """Digest text for {symbol: {'signal', 'confidence', 'price', ...}}."""
+    lines = [f"📈 Signal update ({len(signals)} symbol{'s' if len(signals) != 1 else ''})"]
+    for symbol, s in signals.items():
+        label = SIGNAL_LABELS.get(s.get('signal'), s.get('signal'))
+        line = f"{symbol}: {label}"
+        extras = []
+        if s.get('confidence') is not None:
+            extras.append(f"conf {s['confidence']:.2f}")
+        if s.get('price') is not None:
+            extras.append(f"@ {s['price']:.6g}")
+        if extras:
+            line += f" ({', '.join(extras)})"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+class AlertDispatcher:
+    """
+    Batched, rate-limited Telegram delivery.
+
+    Signals are coalesced per symbol (the latest wins) and sent as one digest
+    per chat once the oldest has waited `window` seconds. Every message goes
+    through the persistent outbox and is delivered by an asyncio loop that
+    spends a per-chat token bucket (Telegram allows about one message per
+    second per chat) plus a global one, and retries failures with exponential
+    backoff, honouring a flood-control `retry_after` when the error carries one.
+
+    Producers call the `submit_*` methods from any thread; `start()` runs the
+    loop in a background thread, or `await run()` runs it in an existing loop.
+    """
+
+    def __init__(self, bot=None, outbox=None, chat_id=None, window=60.0, rate=1.0, burst=3,
+                 global_rate=30.0, max_attempts=5, backoff=2.0, max_backoff=300.0, poll_interval=1.0,
+                 format_digest=format_digest):
+        self._bot = bot
+        self.outbox = outbox if outbox is not None else AlertOutbox()
+        if chat_id is None:
+            from data_loader import load_env
+            load_env()
+            chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        self.chat_id = chat_id
+        self.window = window
+        self.rate = rate
+        self.burst = burst
+        self.global_bucket = TokenBucket(global_rate)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.format_digest = format_digest
+        self._buckets = {}
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def bot(self):
+        if self._bot is None:
+            from alerts import get_bot
+            self._bot = get_bot()
+        return self._bot
+
+    # Producers (any thread)
+
+    def _chat(self, chat_id):
+        chat_id = chat_id or self.chat_id
+        if not chat_id:
+            raise ValueError("No Telegram chat id: pass chat_id or set TELEGRAM_CHAT_ID (e.g. in .env)")
+        return chat_id
+
+    def submit_signal(self, symbol, signal, chat_id=None, **details):
+        """Queue a signal for the chat's next digest (e.g. confidence=0.8, price=64000)."""
+        self.outbox.add_signal(self._chat(chat_id), symbol, dict(details, signal=signal))
+        self._notify()
+
+    def submit_message(self, text, chat_id=None):
+        item_id = self.outbox.add(self._chat(chat_id), 'message', {'text': text})
+        self._notify()
+        return item_id
+
+    def submit_file(self, path, caption="", chat_id=None):
+        item_id = self.outbox.add(self._chat(chat_id), 'document', {'path': path, 'caption': caption})
+        self._notify()
+        return item_id
+
+    def _notify(self):
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # Delivery
+
+    def _bucket(self, chat_id):
+        if chat_id not in self._buckets:
+            self._buckets[chat_id] = TokenBucket(self.rate, self.burst)
+        return self._buckets[chat_id]
+
+    def flush_digests(self, force=False):
+        """Move due digests into the outbox; `force` ignores the window. Returns the count."""
+        older_than = float('inf') if force else time.time() - self.window
+        return sum(self.outbox.take_digest(chat_id, self.format_digest) is not None
+                   for chat_id in self.outbox.digest_chats(older_than))
+
+    async def _call(self, method, **kwargs):
+        if inspect.iscoroutinefunction(method):
+            return await method(**kwargs)
+        return await asyncio.to_thread(method, **kwargs)
+
+    async def _deliver(self, item):
+        payload = item['payload']
+        if item['kind'] == 'message':
+            await self._call(self.bot.send_message, chat_id=item['chat_id'], text=payload['text'])
+        elif item['kind'] == 'document':
+            with open(payload['path'], 'rb') as document:
+                await self._call(self.bot.send_document, chat_id=item['chat_id'], document=document,
+                                 caption=payload.get('caption', ''))
+        else:
+            raise ValueError(f"Unknown outbox item kind: {item['kind']}")
+
+    async def send_due(self):
+        """
+        Deliver due outbox items, in order per chat, as far as the rate limits
+        allow right now. Returns the number delivered.
+        """
+        sent = 0
+        blocked = set()
+        for item in self.outbox.due(time.time()):
+            chat_id = item['chat_id']
+            if chat_id in blocked:
+                continue
+            if self._bucket(chat_id).try_acquire() > 0:
+                blocked.add(chat_id)  # keep this chat's order; retry on the next pass
+                continue
+            await self.global_bucket.acquire_async()
+            try:
+                await self._deliver(item)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"[x] Dropping alert {item['id']}: {e}")
+                self.outbox.mark_failed(item['id'], e)
+                continue
+            except Exception as e:
+                attempts = item['attempts'] + 1
+                if attempts >= self.max_attempts:
+                    print(f"[x] Alert {item['id']} failed after {attempts} attempts: {e}")
+                    self.outbox.mark_failed(item['id'], e)
+                else:
+                    delay = getattr(e, 'retry_after', None)
+                    if delay is None:
+                        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+                    elif hasattr(delay, 'total_seconds'):
+                        delay = delay.total_seconds()
+                    print(f"[!] Alert {item['id']} failed ({e}); retrying in {delay:.1f}s")
+                    self.outbox.retry_later(item['id'], delay, e)
+                blocked.add(chat_id)
+                continue
+            self.outbox.mark_sent(item['id'])
+            sent += 1
+        return sent
+
+    async def run(self):
+        """Flush digests and deliver the outbox until `stop()` is called."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        while not self._stopping:
+            self._wake.clear()
+            self.flush_digests()
+            await self.send_due()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        self._loop = None
+
+    async def drain(self, timeout=None):
+        """Flush all digests now and deliver until the outbox has nothing pending (or timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.flush_digests(force=True)
+        while self.outbox.counts().get('pending', 0):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            if not await self.send_due():
+                await asyncio.sleep(min(self.poll_interval, 1.0 / self.rate))
+        return self.outbox.counts()
+
+    def start(self):
+        """Run the delivery loop in a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=asyncio.run, args=(self.run(),),
+                                            name='alert-dispatcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping = True
+        self._notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_dispatcher = None
+
+
+def get_alert_dispatcher():
+    """Shared dispatcher for the Telegram bot and chat from the environment, started on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = AlertDispatcher().start()
+    return _dispatcher
@@ -1,33 +1,50 @@
 # src/alerts.py
 
-import telegram
 from fpdf import FPDF
 from datetime import datetime
 import os
 
-# Load Telegram credentials
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+_bot = None
+
+
+def __getattr__(name):
+    # Telegram credentials are read when used, after .env has been loaded
+    if name in ('TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHAT_ID'):
+        from data_loader import load_env
+        load_env()
+        return os.getenv(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_bot():
+    """Telegram bot, created on first use so importing this module needs no token."""
+    global _bot
+    if _bot is None:
+        import telegram
+        from data_loader import load_env
+        load_env()
+        _bot = telegram.Bot(token=os.getenv("TELEGRAM_BOT_TOKEN"))
+    return _bot
 
-# Initialize bot
-bot = telegram.Bot(token=TELEGRAM_BOT_TOKEN)
 
 # 1. Send message to Telegram
+# Messages go through the alert dispatcher's persistent outbox: delivery is
+# asynchronous, rate-limited per chat and retried, so these calls don't block.
 def send_telegram_message(message: str):
-    try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-        print("[✓] Telegram message sent!")
-    except Exception as e:
-        print(f"[x] Failed to send message: {e}")
+    from alert_dispatcher import get_alert_dispatcher
+    get_alert_dispatcher().submit_message(message)  # Sent to TELEGRAM_CHAT_ID
+    print("[✓] Telegram message queued!")
 
 # 2. Send a file to Telegram (PDF, CSV, etc.)
 def send_telegram_file(file_path: str, caption: str = ""):
-    try:
-        with open(file_path, "rb") as file:
-            bot.send_document(chat_id=TELEGRAM_CHAT_ID, document=file, caption=caption)
-        print("[✓] Telegram file sent!")
-    except Exception as e:
-        print(f"[x] Failed to send file: {e}")
+    from alert_dispatcher import get_alert_dispatcher
+    get_alert_dispatcher().submit_file(file_path, caption=caption)
+    print("[✓] Telegram file queued!")
+
+# Per-symbol signals are coalesced into one digest message per time window
+def send_signal_alert(symbol: str, signal: int, **details):
+    from alert_dispatcher import get_alert_dispatcher
+    get_alert_dispatcher().submit_signal(symbol, signal, **details)
 
 
 # 3. Generate PDF report
@@ -51,6 +68,16 @@ class PDFReport(FPDF):
         for token, signal in signal_data.items():
             self.cell(0, 10, f"{token}: {signal}", 0, 1)
 
+    def add_explanation_section(self, explanations):
+        from explanation_service import format_explanation
+
+        self.ln(5)
+        self.set_font("Arial", "B", 12)
+        self.cell(0, 10, "Why (top SHAP contributions)", 0, 1)
+        self.set_font("Arial", "", 11)
+        for token, contributions in explanations.items():
+            self.multi_cell(0, 8, f"{token}: {format_explanation(contributions)}")
+
     def add_summary_section(self, ai_summary):
         self.ln(5)
         self.set_font("Arial", "B", 12)
@@ -59,10 +86,13 @@ class PDFReport(FPDF):
         self.multi_cell(0, 10, ai_summary)
 
 
-def generate_pdf_report(signal_data: dict, ai_summary: str, filename="daily_signals.pdf"):
+def generate_pdf_report(signal_data: dict, ai_summary: str, filename="daily_signals.pdf",
+                        explanations: dict = None):
     pdf = PDFReport()
     pdf.add_page()
     pdf.add_signal_section(signal_data)
+    if explanations:  # {symbol: {feature: contribution}} from the signal store
+        pdf.add_explanation_section(explanations)
     pdf.add_summary_section(ai_summary)
     pdf.output(filename)
     print(f"[✓] PDF report generated: {filename}")
@@ -0,0 +1,212 @@
+# src/backtest_sweep.py
+
+import itertools
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import run_vectorized_backtest
+
+# Parameters understood by `_run_task`; anything else in a grid is ignored by the strategy
+STRATEGY_DEFAULTS = {
+    'buy_threshold': 0.5,
+    'sell_threshold': -0.5,
+    'rebalance': 'daily',
+    'fees': 0.0,
+    'slippage': 0.0,
+}
+
+METRIC_COLUMNS = ["Total Return (%)", "Sharpe Ratio", "Max Drawdown (%)", "Win Rate (%)"]
+
+# Worker-process globals, set once per worker by `_init_worker`
+_prices = None
+_scores = None
+_index = None
+_columns = None
+
+
+def thresholds_to_signals(scores, buy_threshold, sell_threshold):
+    """Turn a score block into -1/0/1 signals: Buy above, Sell below, Hold in between."""
+    return np.where(scores >= buy_threshold, 1, np.where(scores <= sell_threshold, -1, 0))
+
+
+def _init_worker(data_dir):
+    """Map the shared arrays once per worker instead of pickling them per task."""
+    global _prices, _scores, _index, _columns
+    _prices = np.load(os.path.join(data_dir, 'prices.npy'), mmap_mode='r')
+    _scores = np.load(os.path.join(data_dir, 'scores.npy'), mmap_mode='r')
+    _index = pd.DatetimeIndex(np.load(os.path.join(data_dir, 'index.npy')))
+    _columns = list(np.load(os.path.join(data_dir, 'columns.npy'), allow_pickle=False))
+
+
+def _run_task(task):
+    """Run one backtest on a slice of the shared arrays; returns a result row."""
+    params, start, end, labels = task
+    p = dict(STRATEGY_DEFAULTS, **params)
+    index = _index[start:end]
+    prices = pd.DataFrame(_prices[start:end], index=index, columns=_columns)
+    signals = pd.DataFrame(
+        thresholds_to_signals(_scores[start:end], p['buy_threshold'], p['sell_threshold']),
+        index=index, columns=_columns)
+
+    result = run_vectorized_backtest(prices, signals, fees=p['fees'], slippage=p['slippage'],
+                                     rebalance=p['rebalance'])
+    row = dict(labels)
+    row.update(params)
+    row.update(result.metrics())
+    return row
+
+
+def _share_arrays(price_data, score_df):
+    """Write prices/scores as .npy files that workers memory-map read-only."""
+    score_df = score_df.reindex(index=price_data.index, columns=price_data.columns)
+    data_dir = tempfile.mkdtemp(prefix='sweep_')
+    np.save(os.path.join(data_dir, 'prices.npy'), price_data.to_numpy(dtype=float))
+    np.save(os.path.join(data_dir, 'scores.npy'), score_df.to_numpy(dtype=float))
+    np.save(os.path.join(data_dir, 'index.npy'), price_data.index.to_numpy(dtype='datetime64[ns]'))
+    np.save(os.path.join(data_dir, 'columns.npy'), np.array(price_data.columns, dtype=str))
+    return data_dir
+
+
+def expand_grid(grid):
+    """{'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def walk_forward_windows(index, train_size, test_size, step=None):
+    """
+    Rolling train/test windows over a datetime index, in bar counts.
+
+    Returns:
+        List[dict]: {'window', 'train': (start, end), 'test': (start, end)} positional slices
+    """
+    step = step or test_size
+    windows = []
+    start = 0
+    while start + train_size + test_size <= len(index):
+        windows.append({
+            'window': len(windows),
+            'train': (start, start + train_size),
+            'test': (start + train_size, start + train_size + test_size),
+        })
+        start += step
+    return windows
+
+
+class BacktestSweep:
+    """
+    Runs many backtests over shared price/score arrays on a process pool.
+
+    price_data: pd.DataFrame of prices (datetime index, one column per asset)
+    score_df: pd.DataFrame of per-asset scores, thresholded into signals by
+        `buy_threshold` / `sell_threshold` (a -1/0/1 signal frame works as is)
+
+    Use as a context manager so the pool and the shared files are cleaned up.
+    """
+
+    def __init__(self, price_data, score_df, max_workers=None):
+        self.price_data = price_data.ffill().bfill()
+        self.index = self.price_data.index
+        self.data_dir = _share_arrays(self.price_data, score_df)
+        self.max_workers = max_workers or os.cpu_count()
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                         initializer=_init_worker, initargs=(self.data_dir,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _segments(self, windows):
+        if not windows:
+            return [({'window': None, 'segment': 'full'}, 0, len(self.index))]
+        segments = []
+        for w in windows:
+            for segment in ('train', 'test'):
+                start, end = w[segment]
+                segments.append(({'window': w['window'], 'segment': segment,
+                                  'start': self.index[start], 'end': self.index[end - 1]},
+                                 start, end))
+        return segments
+
+    def _map(self, tasks):
+        chunksize = max(1, len(tasks) // (self.max_workers * 4))
+        return list(self._pool.map(_run_task, tasks, chunksize=chunksize))
+
+    def run_grid(self, grid, windows=None):
+        """
+        Backtest every parameter combination on every window segment.
+
+        Args:
+            grid (dict | List[dict]): {param: [values]} or an explicit list of param dicts
+            windows (List[dict] | None): From `walk_forward_windows`; None = full history
+
+        Returns:
+            pd.DataFrame: One row per (window, segment, params) with the backtest metrics
+        """
+        combos = expand_grid(grid) if isinstance(grid, dict) else list(grid)
+        tasks = [(params, start, end, labels)
+                 for labels, start, end in self._segments(windows)
+                 for params in combos]
+        print(f"[*] Running {len(tasks)} backtests on {self.max_workers} workers...")
+        return pd.DataFrame(self._map(tasks))
+
+    def run_optuna(self, space, n_trials=100, metric="Sharpe Ratio", window=None):
+        """
+        Optuna search over strategy parameters, evaluating trials in parallel
+        batches of `max_workers` (ask/tell).
+
+        Args:
+            space (dict): {param: ('float', low, high) | ('int', low, high) | ('categorical', [choices])}
+            metric (str): Metric column to maximize
+            window (dict | None): Walk-forward window whose 'train' slice is searched
+
+        Returns:
+            (dict, pd.DataFrame): Best params, and the results of every trial
+        """
+        import optuna
+
+        start, end = window['train'] if window else (0, len(self.index))
+        study = optuna.create_study(direction='maximize')
+        rows = []
+        while len(rows) < n_trials:
+            batch = [study.ask() for _ in range(min(self.max_workers, n_trials - len(rows)))]
+            tasks = []
+            for trial in batch:
+                params = {}
+                for name, (kind, *args) in space.items():
+                    if kind == 'categorical':
+                        params[name] = trial.suggest_categorical(name, args[0])
+                    else:
+                        params[name] = getattr(trial, f"suggest_{kind}")(name, *args)
+                tasks.append((params, start, end, {'trial': trial.number}))
+            for trial, row in zip(batch, self._map(tasks)):
+                value = row[metric]
+                study.tell(trial, value if np.isfinite(value) else float('-inf'))
+                rows.append(row)
+
+        print(f"[✓] Best {metric}: {study.best_value:.3f} with {study.best_params}")
+        return study.best_params, pd.DataFrame(rows)
+
+
+def walk_forward_summary(results, metric="Sharpe Ratio"):
+    """
+    For each window, pick the params with the best train `metric` and report
+    how they did out of sample on the test segment.
+    """
+    param_cols = [c for c in results.columns
+                  if c not in ('window', 'segment', 'start', 'end') and c not in METRIC_COLUMNS]
+    train = results[results['segment'] == 'train'].dropna(subset=[metric])
+    test = results[results['segment'] == 'test']
+    best = train.loc[train.groupby('window')[metric].idxmax(), ['window'] + param_cols]
+    return best.merge(test, on=['window'] + param_cols, how='left')
@@ -0,0 +1,169 @@
+# src/bulk_fetcher.py
+
+import asyncio
+import random
+import time
+
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def create_async_exchange(exchange_id='binance'):
+    """Build a ccxt async exchange client (public data, no API keys)."""
+    import ccxt.async_support as ccxt_async
+    exchange_class = getattr(ccxt_async, exchange_id)
+    return exchange_class({'enableRateLimit': True})
+
+
+class FakeAsyncExchange:
+    """
+    Offline stand-in for a ccxt async exchange.
+
+    Serves synthetic hourly candles and can be told to fail a symbol a given
+    number of times (to exercise retries) or always (to exercise failures).
+    """
+
+    def __init__(self, n_candles=1000, rateLimit=0, fail_times=None,
+                 always_fail=(), latency=0.0):
+        self.n_candles = n_candles
+        self.rateLimit = rateLimit
+        self.fail_times = dict(fail_times or {})
+        self.always_fail = set(always_fail)
+        self.latency = latency
+        self.calls = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self.closed = False
+
+    async def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=1000):
+        self.calls.append((symbol, timeframe, since, limit))
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if symbol in self.always_fail:
+                raise ConnectionError(f"{symbol} unavailable")
+            if self.fail_times.get(symbol, 0) > 0:
+                self.fail_times[symbol] -= 1
+                raise ConnectionError(f"transient error for {symbol}")
+
+            step = 3_600_000
+            start = since if since is not None else 1_700_000_000_000
+            n = min(limit, self.n_candles)
+            seed = sum(map(ord, symbol))
+            return [[start + i * step, seed + i, seed + i + 1, seed + i - 1, seed + i + 0.5, 10.0]
+                    for i in range(n)]
+        finally:
+            self._in_flight -= 1
+
+    async def close(self):
+        self.closed = True
+
+
+class _RateLimiter:
+    """Spaces request starts at least `interval` seconds apart across all tasks."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if self.interval <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _fetch_one(exchange, semaphore, limiter, symbol, timeframe, since, limit,
+                     retries, backoff):
+    """Fetch a single (symbol, timeframe) with retry + exponential backoff."""
+    attempt = 0
+    while True:
+        async with semaphore:
+            await limiter.wait()
+            try:
+                data = await exchange.fetch_ohlcv(symbol, timeframe=timeframe,
+                                                  since=since, limit=limit)
+                df = pd.DataFrame(data, columns=OHLCV_COLUMNS)
+                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                return df
+            except Exception as e:
+                if attempt >= retries:
+                    raise
+                error = e
+        # Sleep outside the semaphore so a backing-off task doesn't hold a slot
+        delay = backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+        print(f"[!] {symbol} {timeframe}: {error} (retry {attempt + 1}/{retries} in {delay:.2f}s)")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def fetch_ohlcv_bulk_async(symbols, timeframes='1h', since=None, limit=1000,
+                                 max_concurrency=10, retries=3, backoff=1.0,
+                                 exchange=None):
+    """
+    Fetch OHLCV for many symbols concurrently.
+
+    Args:
+        symbols (List[str]): E.g. ['BTC/USDT', 'ETH/USDT']
+        timeframes (str | List[str]): One or more ccxt timeframes
+        since (int | dict | None): Start in ms, or {symbol: ms} per symbol
+        limit (int): Candles per request
+        max_concurrency (int): Maximum requests in flight at once
+        retries (int): Retries per symbol before it is reported as failed
+        backoff (float): Base delay in seconds, doubled on each retry
+        exchange: ccxt async exchange (or FakeAsyncExchange); created and
+            closed here when not given
+
+    Returns:
+        (dict, dict): results {symbol: df} and failures {symbol: error message}.
+            Keys are (symbol, timeframe) tuples when several timeframes are requested.
+    """
+    if isinstance(timeframes, str):
+        timeframes = [timeframes]
+        single_timeframe = True
+    else:
+        single_timeframe = len(timeframes) == 1
+
+    owns_exchange = exchange is None
+    if owns_exchange:
+        exchange = create_async_exchange()
+
+    # Respect the exchange's own spacing between calls (rateLimit is in ms)
+    limiter = _RateLimiter(getattr(exchange, 'rateLimit', 0) / 1000)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    jobs = [(symbol, tf) for symbol in symbols for tf in timeframes]
+    tasks = []
+    for symbol, tf in jobs:
+        symbol_since = since.get(symbol) if isinstance(since, dict) else since
+        tasks.append(_fetch_one(exchange, semaphore, limiter, symbol, tf,
+                                symbol_since, limit, retries, backoff))
+
+    try:
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if owns_exchange:
+            await exchange.close()
+
+    results, failures = {}, {}
+    for (symbol, tf), outcome in zip(jobs, outcomes):
+        key = symbol if single_timeframe else (symbol, tf)
+        if isinstance(outcome, BaseException):
+            failures[key] = f"{type(outcome).__name__}: {outcome}"
+        else:
+            results[key] = outcome
+
+    print(f"[✓] Bulk fetch: {len(results)} ok, {len(failures)} failed")
+    return results, failures
+
+
+def fetch_ohlcv_bulk(symbols, timeframes='1h', **kwargs):
+    """Blocking wrapper around `fetch_ohlcv_bulk_async` for scripts and notebooks."""
+    return asyncio.run(fetch_ohlcv_bulk_async(symbols, timeframes, **kwargs))
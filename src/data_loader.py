@@ -1,22 +1,57 @@
 # src/data_loader.py
 
-import ccxt
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
-import requests
-from time import sleep
-import os
-# Load from .env
-from dotenv import load_dotenv
-load_dotenv()
+
+# ccxt, requests and dotenv are imported on first use so that importing this
+# module stays cheap and works without network access.
+_env_loaded = False
+_exchange = None
+
+
+def load_env():
+    """Load credentials from .env into the environment (once); call before reading them."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_exchange():
+    """Shared ccxt Binance client, created on first use."""
+    global _exchange
+    if _exchange is None:
+        import ccxt
+        load_env()
+        # No need for API keys in puclic data
+        _exchange = ccxt.binance({
+            'enableRateLimit': True
+        })
+    return _exchange
+
+
+def __getattr__(name):
+    # Keep `data_loader.exchange` / `data_loader.GNEWS_API_KEY` working without import-time setup
+    if name == 'exchange':
+        return get_exchange()
+    if name == 'GNEWS_API_KEY':
+        load_env()
+        return os.getenv("GNEWS_API_KEY")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_top_10_symbols_vs_usdt():
     """
     Fetch top crypto symbols by market cap from CoinGecko,
     validate 'SYMBOL/USDT' exists in Binance.
     Returns: List of valid tradable symbols.
     """
-    exchange = ccxt.binance()
+    import requests
+
+    exchange = get_exchange()
     exchange.load_markets()
 
     url = "https://api.coingecko.com/api/v3/coins/markets"
@@ -62,14 +97,10 @@ exchange = ccxt.binance({
     'enableRateLimit': True
 })
 '''
-# No need for API keys in puclic data
-exchange = ccxt.binance({
-    'enableRateLimit': True
-})
 
 def fetch_ohlcv(symbol, timeframe='1h', limit=1000):
     """Fetch historical OHLCV data."""
-    data = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+    data = get_exchange().fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
     df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
     return df
@@ -82,9 +113,189 @@ def save_raw_data(df, symbol, folder="data/raw/"):
     print(f"[✓] Saved: {path}")
 
 
+# Incremental OHLCV sync
+# Instead of re-downloading the last `limit` candles on every run, read the last
+# stored timestamp per symbol and page forward with ccxt's `since` cursor.
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def _last_line(path, block=4096):
+    """
+    (byte offset, text) of the last line of a file, read backwards from the
+    end so a large CSV isn't scanned. The text keeps its line ending.
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b''
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            start = data.rstrip(b'\r\n').rfind(b'\n')
+            if start != -1:
+                return pos + start + 1, data[start + 1:].decode()
+        return 0, data.decode()
+
+
+def _last_row_timestamp(line):
+    """Timestamp in the first field of a CSV line, or None for a header or blank line."""
+    first = line.split(',', 1)[0].strip()
+    return None if first in ('', 'timestamp') else pd.Timestamp(first)
+
+
+def get_last_timestamp(symbol, folder="data/raw/ohlcv/"):
+    """
+    Return the last stored candle timestamp for a symbol, or None if
+    nothing has been saved yet. Only the last line of the CSV is read; it
+    is kept in time order by `append_raw_data`.
+    """
+    symbol_clean = symbol.replace('/', '_')
+    path = os.path.join(folder, f"{symbol_clean}.csv")
+    if not os.path.exists(path):
+        return None
+    return _last_row_timestamp(_last_line(path)[1])
+
+
+def fetch_ohlcv_since(symbol, since, timeframe='1h', limit=1000, max_pages=None):
+    """
+    Page forward from `since` until the exchange has no newer candles.
+
+    Args:
+        symbol (str): E.g. 'BTC/USDT'
+        since (datetime | pd.Timestamp | int): First candle to request (ms if int)
+        timeframe (str): ccxt timeframe, e.g. '1h'
+        limit (int): Candles per request (exchange maximum, 1000 on Binance)
+        max_pages (int | None): Stop after this many requests (None = until caught up)
+
+    Returns:
+        pd.DataFrame: OHLCV candles from `since` onwards
+    """
+    if not isinstance(since, (int, np.integer)):
+        since = int(pd.Timestamp(since).value // 1_000_000)
+    exchange = get_exchange()
+    timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+
+    rows = []
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        batch = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        pages += 1
+        if not batch:
+            break
+        rows.extend(batch)
+        since = batch[-1][0] + timeframe_ms
+        if len(batch) < limit:
+            break
+
+    df = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+
+def append_raw_data(df, symbol, folder="data/raw/ohlcv/"):
+    """
+    Append new OHLCV rows to the symbol's CSV without rereading it.
+
+    Only rows from the last stored candle on are written: that candle, which
+    may still have been open at the previous sync, is rewritten with its
+    newly fetched values (the file is truncated before its last line) and
+    newer candles are appended. Older rows in `df` are already final on disk
+    and are skipped.
+
+    Returns:
+        pd.DataFrame: The rows written
+    """
+    symbol_clean = symbol.replace('/', '_')
+    path = os.path.join(folder, f"{symbol_clean}.csv")
+    df = (df.drop_duplicates(subset='timestamp', keep='last')
+            .sort_values('timestamp')
+            .reset_index(drop=True))
+
+    offset, line = _last_line(path) if os.path.exists(path) else (0, '')
+    last_ts = _last_row_timestamp(line)
+    if last_ts is None:
+        df.to_csv(path, index=False)
+        return df
+
+    df = df[df['timestamp'] >= last_ts]
+    if df.empty:
+        return df
+    with open(path, 'rb') as f:
+        columns = f.readline().decode().strip().split(',')
+    newline = '\r\n' if line.endswith('\r\n') else '\n'  # Match the file's line endings
+    with open(path, 'r+b') as f:
+        if df['timestamp'].iloc[0] == last_ts:
+            f.truncate(offset)
+        elif not line.endswith('\n'):
+            f.seek(0, os.SEEK_END)
+            f.write(newline.encode())
+    df[columns].to_csv(path, mode='a', header=False, index=False, lineterminator=newline)
+    return df
+
+
+def sync_ohlcv(symbol, timeframe='1h', folder="data/raw/ohlcv/", limit=1000,
+               backfill_since=None, max_pages=None, store=None):
+    """
+    Incrementally sync one symbol's OHLCV CSV with the exchange.
+
+    The request starts at the last stored candle (inclusive) so the previously
+    open candle is refreshed. When nothing is stored yet, `backfill_since`
+    sets how far back to page; without it only the latest `limit` candles
+    are fetched, same as `fetch_ohlcv`.
+
+    If a `MarketDataStore` is passed, candles are appended to it instead of
+    the CSV and the cursor is read from the store.
+
+    Returns:
+        int: Number of new candles written
+    """
+    if store is not None:
+        last_ts = store.last_timestamp(symbol, timeframe)
+    else:
+        last_ts = get_last_timestamp(symbol, folder)
+    if last_ts is not None:
+        since = last_ts
+    elif backfill_since is not None:
+        since = backfill_since
+    else:
+        since = None
+
+    if since is None:
+        new_df = fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+    else:
+        new_df = fetch_ohlcv_since(symbol, since, timeframe=timeframe,
+                                   limit=limit, max_pages=max_pages)
+
+    if new_df.empty:
+        print(f"[✓] {symbol}: up to date")
+        return 0
+
+    if store is not None:
+        store.append(new_df, symbol, timeframe)
+        written = new_df
+    else:
+        os.makedirs(folder, exist_ok=True)
+        written = append_raw_data(new_df, symbol, folder)
+    n_new = len(written) if last_ts is None else int((written['timestamp'] > last_ts).sum())
+    print(f"[✓] {symbol}: +{n_new} candles (last: {new_df['timestamp'].max()})")
+    return n_new
+
+
+def sync_all_ohlcv(symbols, timeframe='1h', folder="data/raw/ohlcv/", **kwargs):
+    """Incrementally sync every symbol; returns {symbol: new candle count}."""
+    synced = {}
+    for symbol in symbols:
+        try:
+            synced[symbol] = sync_ohlcv(symbol, timeframe=timeframe, folder=folder, **kwargs)
+        except Exception as e:
+            print(f"⚠️ Error syncing {symbol}: {e}")
+    return synced
+
+
 # Fetching news using GNews API
 # Make sure to set up your .env file with GNEWS_API_KEY
-GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")  # Make sure this is in your .env
 
 def fetch_crypto_news_gnews(top_symbols, max_articles_per_symbol=5, sleep_time=1):
     """
@@ -93,50 +304,20 @@ def fetch_crypto_news_gnews(top_symbols, max_articles_per_symbol=5, sleep_time=1
     Args:
         top_symbols (List[str]): E.g., ['BTC/USDT', 'ETH/USDT']
         max_articles_per_symbol (int): Number of news articles to fetch per symbol
-        sleep_time (int): Delay between API calls (to avoid rate limits)
+        sleep_time (int): Minimum spacing between API calls in seconds (to avoid rate limits)
 
     Returns:
         pd.DataFrame: News articles with metadata
     """
-    print("🔎 Fetching crypto news via GNews API...")
-
-    base_url = "https://gnews.io/api/v4/search"
-    all_articles = []
-
-    for symbol in top_symbols:
-        coin_name = symbol.split('/')[0]
-        query = f"{coin_name} crypto"
-        params = {
-            'q': query,
-            'lang': 'en',
-            'token': GNEWS_API_KEY,
-            'max': max_articles_per_symbol,
-        }
-
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            for article in data.get('articles', []):
-                all_articles.append({
-                    'symbol': symbol,
-                    'coin': coin_name,
-                    'title': article['title'],
-                    'description': article['description'],
-                    'content': article['content'],
-                    'publishedAt': article['publishedAt'],
-                    'url': article['url'],
-                    'source': article['source']['name'],
-                    'fetchedAt': datetime.utcnow().isoformat()
-                })
-
-        except Exception as e:
-            print(f"⚠️ Error fetching news for {coin_name}: {e}")
+    from news_ingest import NewsIngestor
 
-        sleep(sleep_time)
+    print("🔎 Fetching crypto news via GNews API...")
 
-    news_df = pd.DataFrame(all_articles)
+    # Queries run concurrently on a pooled session; the token bucket enforces the spacing
+    load_env()
+    ingestor = NewsIngestor(api_key=os.getenv("GNEWS_API_KEY"), rate=1 / sleep_time if sleep_time else 100,
+                            max_articles_per_symbol=max_articles_per_symbol)
+    news_df = ingestor.fetch(top_symbols)
     return news_df
 
 
@@ -144,79 +325,121 @@ def fetch_crypto_news_gnews(top_symbols, max_articles_per_symbol=5, sleep_time=1
 # Fetching Google Trends data using pytrends
 
 
-from pytrends.request import TrendReq
-
-def fetch_google_trends(top_symbols):
+def fetch_google_trends(top_symbols, timeframe='now 7-d'):
     """
     Fetch Google Trends interest for each top crypto coin.
     
+    Keywords are sent five per payload with a shared anchor keyword
+    (see `TrendsClient`), so scores are comparable across coins.
+
     Args:
         top_symbols (list): List of crypto symbols like ['BTC/USDT', 'ETH/USDT']
+        timeframe (str): Google Trends timeframe
     
     Returns:
         pd.DataFrame: Trends data for each symbol
     """
-    print("🔍 Fetching Google Trends data...")
-
-    pytrends = TrendReq(hl='en-US', tz=360)
-    trend_data = []
+    from trends_client import get_trends_client
 
-    for symbol in top_symbols:
-        coin = symbol.split('/')[0]
-        kw_list = [f"{coin} crypto"]
-        pytrends.build_payload(kw_list, cat=0, timeframe='now 7-d', geo='', gprop='')
+    print("🔍 Fetching Google Trends data...")
 
-        df = pytrends.interest_over_time()
-        if not df.empty:
-            df = df.reset_index()
-            df['symbol'] = symbol
-            df['coin'] = coin
-            df.rename(columns={df.columns[1]: 'trend_score'}, inplace=True)
-            trend_data.append(df)
+    empty = pd.DataFrame(columns=['date', 'trend_score', 'isPartial', 'symbol', 'coin'])
+    keywords = {f"{symbol.split('/')[0]} crypto": symbol for symbol in top_symbols}
+    if not keywords:
+        return empty
+    wide = get_trends_client().interest_over_time(list(keywords), timeframe=timeframe)
+    if wide.empty:
+        return empty
 
+    trend_data = []
+    for kw, symbol in keywords.items():
+        if kw not in wide:
+            continue
+        df = wide[[kw] + (['isPartial'] if 'isPartial' in wide else [])].reset_index()
+        df.rename(columns={kw: 'trend_score'}, inplace=True)
+        df['symbol'] = symbol
+        df['coin'] = symbol.split('/')[0]
+        trend_data.append(df)
+
+    if not trend_data:
+        return empty
     all_trends = pd.concat(trend_data, ignore_index=True)
     return all_trends
 
 
 
-def merge_all_data(ohlcv_dir, trends_path, sentiment_path):
-    import os
-    import pandas as pd
-    from glob import glob
+def normalize_symbol(symbols):
+    """Map 'BTC/USDT' / 'btc_usdt' style symbols onto the 'BTC_USDT' file naming."""
+    return symbols.astype(str).str.replace('/', '_', regex=False).str.upper()
 
-    print("🔗 Merging OHLCV, Trends, and Sentiment...")
 
-    # Load and format Google Trends
-    trends_df = pd.read_csv(trends_path)
-    trends_df['date'] = pd.to_datetime(trends_df['date']).dt.date  # Only date part
-
-    # Load and format Sentiment
-    sentiment_df = pd.read_csv(sentiment_path)
-    sentiment_df['publishedAt'] = pd.to_datetime(sentiment_df['publishedAt'], utc=True).dt.date
-
-    all_data = []
+def load_ohlcv_dir(ohlcv_dir):
+    """Load every per-symbol OHLCV CSV into one long frame with a 'symbol' column."""
+    from glob import glob
 
-    for file in glob(os.path.join(ohlcv_dir, '*.csv')):
-        coin = os.path.basename(file).replace('.csv', '')
+    frames = []
+    for file in sorted(glob(os.path.join(ohlcv_dir, '*.csv'))):
         df = pd.read_csv(file, parse_dates=['timestamp'])
+        df['symbol'] = os.path.basename(file).replace('.csv', '')
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
 
-        df['symbol'] = coin
-        df['date'] = df['timestamp'].dt.date
 
-        # Merge trends
-        coin_trend = trends_df[trends_df['symbol'] == coin]
-        df = df.merge(coin_trend[['date', 'trend_score']], on='date', how='left')
-
-        # Merge sentiment (already has sentiment_avg)
-        coin_sentiment = sentiment_df[sentiment_df['symbol'] == coin]
-        df = df.merge(coin_sentiment[['publishedAt', 'sentiment_avg']],
-                      left_on='date', right_on='publishedAt', how='left')
-        df.drop(columns=['publishedAt'], inplace=True)
+def merge_all_data(ohlcv_dir, trends_path, sentiment_path,
+                   trend_tolerance='2h', sentiment_tolerance='1D', store=None):
+    """
+    Join every candle to the latest Google Trends score and news sentiment
+    observed at or before its timestamp (per symbol, across all symbols in one pass).
 
-        all_data.append(df)
+    Args:
+        ohlcv_dir (str): Folder of per-symbol OHLCV CSVs (ignored if `store` is given)
+        trends_path (str): CSV from `fetch_google_trends`
+        sentiment_path (str): CSV from `apply_vader_sentiment`
+        trend_tolerance (str | None): Max age of a trend observation, e.g. '2h'
+        sentiment_tolerance (str | None): Max age of a news sentiment observation
+        store (MarketDataStore | None): Read candles from the Parquet store instead
 
-    master_df = pd.concat(all_data, ignore_index=True)
-    master_df = master_df.sort_values(by=['symbol', 'timestamp'])
+    Returns:
+        pd.DataFrame: Master dataset sorted by symbol, timestamp
+    """
+    print("🔗 Merging OHLCV, Trends, and Sentiment...")
 
+    if store is not None:
+        ohlcv_df = store.load()
+    else:
+        ohlcv_df = load_ohlcv_dir(ohlcv_dir)
+    ohlcv_df['symbol'] = normalize_symbol(ohlcv_df['symbol'])
+    ohlcv_df['timestamp'] = pd.to_datetime(ohlcv_df['timestamp']).astype('datetime64[ns]')
+
+    # Google Trends: hourly observations, trends use 'BTC/USDT' style symbols
+    trends_df = pd.read_csv(trends_path, usecols=['date', 'symbol', 'trend_score'])
+    trends_df['symbol'] = normalize_symbol(trends_df['symbol'])
+    trends_df['trend_time'] = pd.to_datetime(trends_df['date']).astype('datetime64[ns]')
+    trends_df = trends_df.drop(columns=['date']).sort_values('trend_time')
+
+    # Sentiment: one row per article, averaged when several share a timestamp
+    sentiment_df = pd.read_csv(sentiment_path, usecols=['symbol', 'publishedAt', 'sentiment_avg'])
+    sentiment_df['symbol'] = normalize_symbol(sentiment_df['symbol'])
+    sentiment_df['publishedAt'] = (pd.to_datetime(sentiment_df['publishedAt'], utc=True)
+                                     .dt.tz_localize(None).astype('datetime64[ns]'))
+    sentiment_df = (sentiment_df.groupby(['symbol', 'publishedAt'], as_index=False)['sentiment_avg']
+                                .mean()
+                                .sort_values('publishedAt'))
+
+    master_df = ohlcv_df.sort_values('timestamp', kind='stable')
+    master_df = pd.merge_asof(
+        master_df, trends_df,
+        left_on='timestamp', right_on='trend_time', by='symbol',
+        direction='backward',
+        tolerance=pd.Timedelta(trend_tolerance) if trend_tolerance else None,
+    )
+    master_df = pd.merge_asof(
+        master_df, sentiment_df,
+        left_on='timestamp', right_on='publishedAt', by='symbol',
+        direction='backward',
+        tolerance=pd.Timedelta(sentiment_tolerance) if sentiment_tolerance else None,
+    )
+    master_df = master_df.drop(columns=['trend_time', 'publishedAt'])
+
+    master_df = master_df.sort_values(by=['symbol', 'timestamp'], ignore_index=True)
     return master_df
-
@@ -0,0 +1,115 @@
+# src/dataset_schema.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Master dataset layout: epoch-millisecond int64 timestamps, categorical
+# symbols and float32 values. Columns not listed here that are numeric are
+# stored as float32 too (features); derived text columns are dropped.
+MASTER_SCHEMA = {
+    'timestamp': 'int64',
+    'symbol': 'category',
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'close': 'float32',
+    'volume': 'float32',
+    'trend_score': 'float32',
+    'sentiment_avg': 'float32',
+}
+REQUIRED_COLUMNS = ['timestamp', 'symbol', 'open', 'high', 'low', 'close', 'volume']
+DERIVED_COLUMNS = ['date', 'coin']
+# Integer columns that are labels rather than features keep an integer dtype
+LABEL_COLUMNS = ['target', 'signal']
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def to_epoch_ms(values):
+    """Timestamps (datetime-like, strings or epoch ms) as int64 epoch milliseconds."""
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype('int64')  # Lazy under copy-on-write: no copy for int64 input
+    ts = pd.to_datetime(values, utc=True).dt.tz_localize(None)
+    return ts.astype('datetime64[ms]').astype('int64')
+
+
+def epoch_ms_to_datetime(values):
+    """int64 epoch milliseconds back to datetime64 (e.g. for a DatetimeIndex)."""
+    return pd.to_datetime(np.asarray(values, dtype='int64'), unit='ms')
+
+
+def validate_master(df):
+    """Raise ValueError if the frame doesn't satisfy the master dataset schema."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in df]
+    if missing:
+        raise ValueError(f"Master dataset is missing columns: {missing}")
+    for column, dtype in MASTER_SCHEMA.items():
+        if column in df and str(df[column].dtype) != dtype:
+            raise ValueError(f"Column '{column}' has dtype {df[column].dtype}, expected {dtype}")
+    if df['timestamp'].hasnans or df['symbol'].hasnans:
+        raise ValueError("Master dataset has missing timestamps or symbols")
+    duplicated = df.duplicated(['symbol', 'timestamp'])
+    if duplicated.any():
+        raise ValueError(f"Master dataset has {int(duplicated.sum())} duplicate (symbol, timestamp) rows")
+
+
+def apply_master_schema(df, validate=True, report=True):
+    """
+    Downcast a master dataset frame in place, converting each column once:
+
+    - drops derived columns ('date', 'coin')
+    - timestamp -> int64 epoch milliseconds
+    - symbol -> category
+    - OHLCV, trend, sentiment and other numeric feature columns -> float32
+
+    Returns:
+        pd.DataFrame: The same frame, converted
+    """
+    before = memory_mb(df) if report else 0.0
+    df.drop(columns=[c for c in DERIVED_COLUMNS if c in df], inplace=True)
+
+    for column in df.columns:
+        if column == 'timestamp':
+            df[column] = to_epoch_ms(df[column])
+        elif column == 'symbol':
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+        elif column in LABEL_COLUMNS:
+            continue
+        elif pd.api.types.is_bool_dtype(df[column]):
+            continue
+        elif pd.api.types.is_numeric_dtype(df[column]) and df[column].dtype != np.float32:
+            df[column] = df[column].astype('float32')
+
+    if validate:
+        validate_master(df)
+    if report:
+        print(f"[✓] Master dataset: {len(df):,} rows, {before:.1f} MB -> {memory_mb(df):.1f} MB")
+    return df
+
+
+def load_master_dataset(path="data/processed/master_dataset.parquet", columns=None,
+                        validate=True, report=True):
+    """
+    Load the master dataset (Parquet or CSV) and apply `MASTER_SCHEMA`.
+
+    CSVs are parsed straight into compact dtypes where possible, so float64
+    columns never materialize for the known fields.
+    """
+    if path.endswith('.csv'):
+        dtypes = {c: t for c, t in MASTER_SCHEMA.items() if c != 'timestamp'}
+        df = pd.read_csv(path, usecols=columns, dtype=dtypes)
+    else:
+        df = pd.read_parquet(path, columns=columns)
+    return apply_master_schema(df, validate=validate, report=report)
+
+
+def save_master_dataset(df, path="data/processed/master_dataset.parquet"):
+    """Write the master dataset as Parquet with the compact schema."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df.to_parquet(path, index=False)
+    return path
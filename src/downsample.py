@@ -0,0 +1,74 @@
+# src/downsample.py
+
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the
+    visual shape of the series. First and last points are always kept.
+
+    Args:
+        x, y (np.ndarray): Sorted x values (numeric) and finite y values, same length
+        n_out (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted integer indices into x/y
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1], dtype=np.int64)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n_out - 2 buckets over the interior points; the first and last points are fixed
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # The third triangle vertex is the average of the next bucket (the last point for the final one)
+        nlo = edges[i + 1]
+        nhi = max(edges[i + 2] if i + 2 < len(edges) else n, nlo + 1)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Min/max bucketing: the indices of the min and max of each of `n_buckets`
+    equal-count buckets (up to 2 * n_buckets points), which preserves spikes.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    lengths = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(n_buckets), lengths)
+    order = np.lexsort((y, bucket))  # by bucket, then by value
+    first = np.append(0, np.cumsum(lengths)[:-1])
+    last = first + lengths - 1
+    return np.unique(np.concatenate([order[first], order[last]]))
+
+
+def downsample(x, y, n_points, method='lttb'):
+    """
+    Indices of at most `n_points` points of a time series.
+
+    Args:
+        x (np.ndarray): Sorted numeric x values (e.g. epoch milliseconds)
+        y (np.ndarray): Finite values
+        method (str): 'lttb' or 'minmax'
+    """
+    if method == 'lttb':
+        return lttb_indices(x, y, n_points)
+    if method == 'minmax':
+        return minmax_indices(y, max(1, n_points // 2))
+    raise ValueError(f"Unknown downsampling method: {method}")
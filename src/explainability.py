@@ -1,26 +1,103 @@
 # src/explainability.py
 
-import shap
-import joblib
+import os
+import threading
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+# shap and matplotlib are imported inside the functions that use them (both are slow to import)
+
+_explainers = {}  # (model key, background id) -> (model version, explainer)
+_explainers_lock = threading.Lock()
 
 
 def load_model(model_path):
     """
-    Load a trained model (XGBoost, LightGBM, etc.) from disk.
+    Load a trained model (XGBoost, LightGBM, etc.) from disk: a joblib pickle,
+    or a native booster file (.json/.ubj for XGBoost, .txt for LightGBM).
     """
     print(f"[*] Loading model from: {model_path}")
+    ext = os.path.splitext(model_path)[1].lower()
+    if ext in ('.json', '.ubj'):
+        import xgboost as xgb
+        booster = xgb.Booster()
+        booster.load_model(model_path)
+        return booster
+    if ext == '.txt':
+        import lightgbm as lgb
+        return lgb.Booster(model_file=model_path)
+    import joblib
     return joblib.load(model_path)
 
 
+def model_version(model_path):
+    """Version of a model file (size and mtime), which changes whenever it is rewritten."""
+    st = os.stat(model_path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def get_explainer(model, background=None, version=None):
+    """
+    SHAP TreeExplainer for `model`, built once per model version and reused.
+
+    Args:
+        model: Model file path (reloaded when the file changes) or a loaded model
+        background (pd.DataFrame | np.ndarray | None): Background rows for
+            interventional SHAP; None uses the trees' own cover statistics
+            (path-dependent, no background pass)
+        version: Version of a loaded model; defaults to its identity
+    """
+    import shap
+
+    is_path = isinstance(model, (str, os.PathLike))
+    key = (os.path.abspath(model) if is_path else id(model), None if background is None else id(background))
+    version = model_version(model) if is_path else (version if version is not None else id(model))
+    with _explainers_lock:
+        cached = _explainers.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    print("[*] Generating SHAP explainer...")
+    loaded = load_model(model) if is_path else model
+    if background is None:
+        explainer = shap.TreeExplainer(loaded)
+    else:
+        explainer = shap.TreeExplainer(loaded, data=background, feature_perturbation='interventional')
+    with _explainers_lock:
+        _explainers[key] = (version, explainer)
+    return explainer
+
+
+def explain_rows(model, X, background=None):
+    """
+    SHAP attributions of each row's predicted class.
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): class index (n,), base value (n,)
+            and contributions (n, n_features), in the model's raw (margin) units
+    """
+    explainer = get_explainer(model, background)
+    values = np.asarray(explainer.shap_values(X))
+    base = np.atleast_1d(np.asarray(explainer.expected_value, dtype=np.float64))
+    if values.ndim == 2:
+        # Single output (binary): attributions are for class 1, negated they explain class 0
+        margin = base[0] + values.sum(axis=1)
+        classes = (margin > 0).astype(np.int64)
+        sign = np.where(classes == 1, 1.0, -1.0)
+        return classes, sign * base[0], values * sign[:, None]
+    margin = base[None, :] + values.sum(axis=1)
+    classes = margin.argmax(axis=1)
+    rows = np.arange(len(classes))
+    return classes, base[classes], values[rows, :, classes]
+
+
 def explain_model(model, X_sample):
     """
-    Run SHAP explainability on a tree-based model.
+    Run SHAP explainability on a tree-based model (the explainer is cached per model).
     X_sample: pd.DataFrame with sample input features.
     """
-    print("[*] Generating SHAP explainer...")
-    explainer = shap.Explainer(model)
+    explainer = get_explainer(model)
     shap_values = explainer(X_sample)
 
     print("[✓] SHAP values computed.")
@@ -31,6 +108,9 @@ def plot_summary(shap_values, X_sample, max_display=15):
     """
     Plot SHAP feature importance summary.
     """
+    import shap
+    import matplotlib.pyplot as plt
+
     print("[*] Plotting SHAP summary...")
     plt.figure()
     shap.summary_plot(shap_values, X_sample, max_display=max_display)
@@ -41,6 +121,9 @@ def plot_bar(shap_values, X_sample, max_display=15):
     """
     Bar plot version of SHAP feature importances.
     """
+    import shap
+    import matplotlib.pyplot as plt
+
     print("[*] Plotting SHAP bar chart...")
     plt.figure()
     shap.plots.bar(shap_values, max_display=max_display)
@@ -49,9 +132,13 @@ def plot_bar(shap_values, X_sample, max_display=15):
 
 def explain_instance(model, X_sample, index=0):
     """
-    Explain a specific prediction (index) using SHAP force plot.
+    Explain a specific prediction (index) using SHAP force plot. Only that
+    row is explained, with the cached explainer.
     """
-    explainer, shap_values = explain_model(model, X_sample)
+    import shap
+
+    row = X_sample.iloc[[index]] if hasattr(X_sample, 'iloc') else X_sample[index:index + 1]
+    shap_values = get_explainer(model)(row)
     shap.initjs()
     print(f"[*] Explaining instance at index {index}")
-    return shap.plots.force(shap_values[index])
+    return shap.plots.force(shap_values[0])
@@ -0,0 +1,143 @@
+# src/explanation_service.py
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from explainability import explain_rows, get_explainer, model_version
+
+# Set in each worker process by `_init_worker`
+_worker_model_path = None
+_worker_background = None
+
+
+def _init_worker(model_path, background):
+    global _worker_model_path, _worker_background
+    _worker_model_path, _worker_background = model_path, background
+
+
+def _explain_chunk(X):
+    # The worker's explainer is cached across chunks and rebuilt if the model file changes
+    return explain_rows(_worker_model_path, X, _worker_background)
+
+
+class ExplanationService:
+    """
+    SHAP "why" for every stored signal, computed once per row and model.
+
+    The TreeExplainer is built once per model file version (see
+    `explainability.get_explainer`) and reused. `explain_new` skips rows
+    that already have an explanation from the current model and computes the
+    rest in chunks of `chunk_rows`. Batches larger than `parallel_rows` are
+    spread over a pool of worker processes, each of which builds its
+    explainer once and keeps it. Results go to the signal store, next to the
+    predictions, for the dashboard and the PDF reports.
+    """
+
+    def __init__(self, model_path='models/xgb_model.json', store=None, chunk_rows=1024,
+                 parallel_rows=8192, n_workers=None, background=None):
+        self.model_path = model_path
+        self.chunk_rows = chunk_rows
+        self.parallel_rows = parallel_rows
+        self.n_workers = n_workers or os.cpu_count()
+        self.background = background
+        self._store = store
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            from signal_store import get_signal_store
+            self._store = get_signal_store()
+        return self._store
+
+    def _feature_names(self):
+        model = get_explainer(self.model_path, self.background).model.original_model
+        # XGBoost boosters have .feature_names, LightGBM boosters .feature_name()
+        return list(getattr(model, 'feature_names', None) or model.feature_name())
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                                 initargs=(self.model_path, self.background))
+            return self._pool
+
+    def explain(self, features):
+        """
+        Explain feature rows.
+
+        Args:
+            features (pd.DataFrame): One row per prediction, with the model's feature columns
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray, List[str]): class index, base
+                value and contributions per row (see `explainability.explain_rows`),
+                and the feature names
+        """
+        names = self._feature_names()
+        X = features[names].to_numpy(dtype=np.float32)
+        chunks = [X[i:i + self.chunk_rows] for i in range(0, len(X), self.chunk_rows)]
+        if len(X) > self.parallel_rows and self.n_workers > 1:
+            results = list(self._get_pool().map(_explain_chunk, chunks))
+        else:
+            results = [explain_rows(self.model_path, chunk, self.background) for chunk in chunks]
+        if not results:
+            return np.empty(0, np.int64), np.empty(0), np.empty((0, len(names))), names
+        classes, base, values = (np.concatenate(parts) for parts in zip(*results))
+        return classes, base, values, names
+
+    def explain_new(self, features):
+        """
+        Explain the rows of `features` ('symbol', 'timestamp' and feature
+        columns) that have no explanation from the current model yet, and
+        store them.
+
+        Returns:
+            int: Number of rows explained
+        """
+        version = model_version(self.model_path)
+        missing = self.store.unexplained(zip(features['symbol'], features['timestamp']), version)
+        skipped = len(missing) - sum(missing)
+        features = features[missing] if skipped else features
+        if features.empty:
+            return 0
+
+        classes, base, values, names = self.explain(features)
+        self.store.write_explanations(pd.DataFrame({
+            'timestamp': features['timestamp'].to_numpy(),
+            'symbol': features['symbol'].to_numpy(),
+            'model_version': version,
+            'class_index': classes,
+            'base_value': base,
+            'contributions': [dict(zip(names, np.round(row, 6).tolist())) for row in values],
+        }))
+        print(f"[✓] Explained {len(features)} new signal(s) ({skipped} already explained)")
+        return len(features)
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+def format_explanation(contributions, top=3):
+    """'rsi +0.42, sentiment_avg -0.13, ...' for the `top` largest contributions."""
+    items = sorted(contributions.items(), key=lambda kv: -abs(kv[1]))[:top]
+    return ', '.join(f"{name} {value:+.2f}" for name, value in items)
+
+
+_service = None
+
+
+def get_explanation_service():
+    """Shared ExplanationService for the production model (created on first use)."""
+    global _service
+    if _service is None:
+        _service = ExplanationService()
+    return _service
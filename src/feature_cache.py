@@ -0,0 +1,284 @@
+# src/feature_cache.py
+
+import datetime
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def frame_fingerprint(df):
+    """Content hash of a DataFrame (values, index and column names)."""
+    values = pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+    return _sha1(values + json.dumps([str(c) for c in df.columns]).encode('utf-8'))
+
+
+def max_timestamps_fingerprint(df, by='symbol', time_col='timestamp'):
+    """
+    Cheap fingerprint of an append-only long frame: row count and latest
+    timestamp per symbol. Misses in-place edits of old rows; use
+    `frame_fingerprint` where those matter.
+    """
+    summary = df.groupby(by)[time_col].agg(['max', 'size'])
+    return _sha1(summary.to_json(date_format='iso').encode('utf-8'))
+
+
+def code_fingerprint(func):
+    """
+    Hash of the source of the module defining `func` (plus its name), so
+    editing a stage or the helpers next to it invalidates its cached outputs.
+    """
+    name = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+    try:
+        source = inspect.getsource(inspect.getmodule(func))
+    except (OSError, TypeError):
+        source = ''
+    return _sha1(f"{name}\n{source}".encode('utf-8'))
+
+
+def _stable_json(value):
+    """
+    `json.dumps` default for fingerprints and keys: only values with a text
+    form that is the same in every process. Anything else is rejected, since
+    its repr (e.g. '<object at 0x7f...>') would change every run and the
+    entry would never be hit again.
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (datetime.timedelta, np.dtype)):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, os.PathLike):
+        return os.fspath(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if inspect.isbuiltin(value) or (inspect.isfunction(value) and value.__closure__ is None
+                                    and value.__name__ != '<lambda>'):
+        return code_fingerprint(value)
+    raise TypeError(f"{type(value).__name__} value {value!r} has no stable cache key; pass a "
+                    f"JSON-serializable value (or precomputed `fingerprints=` for inputs)")
+
+
+class FeatureCache:
+    """
+    Content-addressed cache of stage outputs (DataFrames) stored as Parquet.
+
+    An entry's key is a hash of the stage name, the fingerprints of its inputs
+    (file content hashes, DataFrame hashes, ...), its parameters and the
+    source of the stage function. An unchanged stage is therefore a lookup,
+    and any change upstream, in the parameters or in the code misses.
+
+    File hashes are memoized by (path, size, mtime) so unchanged raw files are
+    not re-read. Entries are evicted least-recently-used first once the cache
+    exceeds `max_bytes` on disk.
+    """
+
+    def __init__(self, root="data/cache/features", max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stage TEXT, bytes INTEGER, "
+                "created REAL, last_used REAL, hits INTEGER DEFAULT 0)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes (path TEXT PRIMARY KEY, size INTEGER, "
+                "mtime_ns INTEGER, digest TEXT)")
+            self._conn.commit()
+
+    # Fingerprints
+
+    def file_fingerprint(self, path):
+        """Content hash of a file, or of every file under a folder."""
+        if os.path.isdir(path):
+            parts = []
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    parts.append(f"{os.path.relpath(file_path, path)}:{self.file_fingerprint(file_path)}")
+            return _sha1('\n'.join(sorted(parts)).encode('utf-8'))
+
+        st = os.stat(path)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, digest FROM file_hashes WHERE path = ?",
+                                     (os.path.abspath(path),)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                               (os.path.abspath(path), st.st_size, st.st_mtime_ns, digest))
+            self._conn.commit()
+        return digest
+
+    def fingerprint(self, value):
+        """
+        Fingerprint of a stage input: a path, a DataFrame, or any JSON-serializable
+        value (see `_stable_json`; other objects raise TypeError).
+        """
+        if isinstance(value, pd.DataFrame):
+            return frame_fingerprint(value)
+        if isinstance(value, pd.Series):
+            return frame_fingerprint(value.to_frame())
+        if isinstance(value, (str, os.PathLike)) and os.path.exists(value):
+            return self.file_fingerprint(value)
+        return _sha1(json.dumps(value, sort_keys=True, default=_stable_json).encode('utf-8'))
+
+    def make_key(self, stage, input_fingerprints, params=None, code=None):
+        payload = json.dumps({'stage': stage, 'inputs': list(input_fingerprints),
+                              'params': params or {}, 'code': code}, sort_keys=True, default=_stable_json)
+        return _sha1(payload.encode('utf-8'))
+
+    # Storage
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.parquet")
+
+    def get(self, key):
+        """Cached DataFrame for `key`, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_parquet(path)
+        with self._lock:
+            self._conn.execute("UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                               (time.time(), key))
+            self._conn.commit()
+        return df
+
+    def put(self, key, df, stage=''):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries (key, stage, bytes, created, last_used) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, stage, os.path.getsize(path), now, now))
+            self._conn.commit()
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """Drop least-recently-used entries until the cache fits in `max_bytes`; returns the count."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            rows = self._conn.execute("SELECT key, bytes FROM entries ORDER BY last_used DESC").fetchall()
+            total, evicted = 0, []
+            for key, size in rows:
+                total += size
+                if total > max_bytes:
+                    evicted.append(key)
+            for key in evicted:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in evicted])
+            self._conn.commit()
+        return len(evicted)
+
+    def stats(self):
+        """Per-stage entry count, bytes and hits."""
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT stage, COUNT(*) AS entries, SUM(bytes) AS bytes, SUM(hits) AS hits "
+                "FROM entries GROUP BY stage", self._conn)
+
+    def clear(self):
+        return self.evict(max_bytes=0)
+
+    # Stages
+
+    def materialize(self, stage, func, *inputs, fingerprints=None, **params):
+        """
+        `func(*inputs, **params)`, served from the cache when the same stage
+        has already run on the same inputs, params and code.
+
+        Args:
+            stage (str): Stage name (also used for stats)
+            inputs: Paths or DataFrames passed positionally to `func`
+            fingerprints (List | None): Precomputed input fingerprints, e.g.
+                `max_timestamps_fingerprint(df)`, instead of hashing `inputs`
+            params: Keyword arguments for `func`; part of the key, so they must be
+                JSON-serializable or have another stable form (see `_stable_json`)
+
+        Returns:
+            pd.DataFrame
+        """
+        if fingerprints is None:
+            fingerprints = [self.fingerprint(value) for value in inputs]
+        key = self.make_key(stage, fingerprints, params, code_fingerprint(func))
+        df = self.get(key)
+        if df is not None:
+            print(f"[✓] {stage}: cache hit ({key[:12]})")
+            return df
+        start = time.perf_counter()
+        df = func(*inputs, **params)
+        self.put(key, df, stage)
+        print(f"[✓] {stage}: computed in {time.perf_counter() - start:.2f}s and cached ({key[:12]})")
+        return df
+
+
+_cache = None
+
+
+def get_feature_cache():
+    """Shared FeatureCache at the default location (created on first use)."""
+    global _cache
+    if _cache is None:
+        _cache = FeatureCache()
+    return _cache
+
+
+def cached_merge_all_data(ohlcv_dir, trends_path, sentiment_path, cache=None, **params):
+    """`data_loader.merge_all_data`, keyed on the content of every input file."""
+    from data_loader import merge_all_data
+
+    cache = cache or get_feature_cache()
+    return cache.materialize('merge_all_data', merge_all_data, ohlcv_dir, trends_path, sentiment_path,
+                             **params)
+
+
+def cached_technical_indicators(df, cache=None):
+    """Technical indicators for a long multi-symbol frame (panel version), keyed on its content."""
+    from feature_engineering import add_technical_indicators_panel
+
+    cache = cache or get_feature_cache()
+    return cache.materialize('technical_indicators', add_technical_indicators_panel, df)
+
+
+def cached_vader_sentiment(news_df, cache=None):
+    """`apply_vader_sentiment`, keyed on the article texts."""
+    from feature_engineering import apply_vader_sentiment
+
+    cache = cache or get_feature_cache()
+    return cache.materialize('vader_sentiment', apply_vader_sentiment, news_df)
+
+
+def cached_read_csv(path, cache=None, **kwargs):
+    """`pd.read_csv` served from a Parquet copy while the CSV is unchanged."""
+    cache = cache or get_feature_cache()
+    return cache.materialize('read_csv', pd.read_csv, path, **kwargs)
@@ -0,0 +1,408 @@
+# src/feature_shards.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+# xgboost, pyarrow and sklearn are imported on first use
+
+MANIFEST = 'manifest.json'
+DEFAULT_SHARD_ROWS = 1_000_000
+
+
+def iter_parquet_batches(path="data/processed/master_dataset.parquet", columns=None,
+                         batch_rows=250_000):
+    """
+    Stream a Parquet file as DataFrames of `batch_rows` rows with the compact
+    `dataset_schema` dtypes, so the whole file never sits in memory.
+    """
+    import pyarrow.parquet as pq
+
+    from dataset_schema import apply_master_schema
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns):
+        yield apply_master_schema(batch.to_pandas(), validate=False, report=False)
+
+
+def write_feature_shards(frames, root="data/shards/features", target_column='target',
+                         exclude=('symbol', 'timestamp'), shard_rows=DEFAULT_SHARD_ROWS):
+    """
+    Write a training set as memory-mappable NumPy shards:
+    `x_00000.npy` (float32 features, C order), `y_00000.npy` (float32 class
+    indices), `t_00000.npy` (int64 epoch-ms timestamps, when there is a
+    'timestamp' column) and a `manifest.json` with the feature names, row
+    counts, classes and timestamp range of each shard.
+
+    Labels are stored as indices into the manifest's sorted `classes`
+    (e.g. Sell/Hold/Buy -1/0/1 -> 0/1/2), since XGBoost only accepts labels
+    0..k-1; `FeatureShards.targets` maps them back.
+
+    Rows are written in time order, so that the trailing rows of the shards
+    are a chronological holdout (see `model.train_model_from_shards`): each
+    chunk is sorted by 'timestamp', and a chunk starting before the end of
+    the previous one raises ValueError, so pass chunks in time order (e.g.
+    `iter_parquet_batches` over a timestamp-sorted dataset such as the
+    retrain pipeline's training data). Rows without a label are dropped; missing features stay NaN, which XGBoost
+    treats as missing. The shards are built in a temp folder and swapped in,
+    so readers never see a half-written dataset.
+
+    Args:
+        frames (pd.DataFrame | Iterable[pd.DataFrame]): The data, whole or in chunks
+        exclude (Iterable[str]): Non-feature columns ('timestamp' is kept in the manifest)
+        shard_rows (int): Rows per shard file
+
+    Returns:
+        FeatureShards
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    tmp_root = f"{root.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+
+    features, shards, classes = None, [], set()
+    last_timestamp = None
+    digest = hashlib.sha1()
+    buffer, buffered = [], 0
+
+    def flush(parts):
+        X = np.concatenate([p[0] for p in parts]) if len(parts) > 1 else parts[0][0]
+        y = np.concatenate([p[1] for p in parts]) if len(parts) > 1 else parts[0][1]
+        ts = [p[2] for p in parts if p[2] is not None]
+        name = f"{len(shards):05d}"
+        np.save(os.path.join(tmp_root, f"x_{name}.npy"), np.ascontiguousarray(X))
+        np.save(os.path.join(tmp_root, f"y_{name}.npy"), y)
+        if ts:
+            np.save(os.path.join(tmp_root, f"t_{name}.npy"), np.concatenate(ts))
+        digest.update(X.tobytes())
+        digest.update(y.tobytes())
+        shards.append({
+            'x': f"x_{name}.npy", 'y': f"y_{name}.npy", 't': f"t_{name}.npy" if ts else None,
+            'rows': int(len(y)),
+            'first_timestamp': int(min(t.min() for t in ts)) if ts else None,
+            'last_timestamp': int(max(t.max() for t in ts)) if ts else None,
+        })
+
+    for chunk in frames:
+        chunk = chunk[chunk[target_column].notna()]
+        if chunk.empty:
+            continue
+        if features is None:
+            features = [c for c in chunk.columns if c != target_column and c not in exclude]
+        elif [c for c in chunk.columns if c != target_column and c not in exclude] != features:
+            raise ValueError("All chunks must have the same feature columns")
+
+        ts = None
+        if 'timestamp' in chunk:
+            from dataset_schema import to_epoch_ms
+            ts = to_epoch_ms(chunk['timestamp']).to_numpy()
+            if (np.diff(ts) < 0).any():
+                order = np.argsort(ts, kind='stable')  # Stable: symbols keep their order within a bar
+                chunk, ts = chunk.iloc[order], ts[order]
+            if last_timestamp is not None and ts[0] < last_timestamp:
+                shutil.rmtree(tmp_root, ignore_errors=True)
+                raise ValueError(f"Chunks must be in time order: a chunk starts at {ts[0]} before the "
+                                 f"previous chunk's last timestamp {last_timestamp}; sort the dataset "
+                                 f"by timestamp before sharding it")
+            last_timestamp = ts[-1]
+        X = chunk[features].to_numpy(dtype=np.float32)
+        y = chunk[target_column].to_numpy(dtype=np.float32)
+        classes.update(np.unique(y).tolist())
+
+        # Split the chunk at shard boundaries
+        offset = 0
+        while offset < len(y):
+            take = min(shard_rows - buffered, len(y) - offset)
+            buffer.append((X[offset:offset + take], y[offset:offset + take],
+                           None if ts is None else ts[offset:offset + take]))
+            buffered += take
+            offset += take
+            if buffered == shard_rows:
+                flush(buffer)
+                buffer, buffered = [], 0
+    if buffer:
+        flush(buffer)
+    if not shards:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        raise ValueError("No labelled rows to write.")
+
+    # The classes are only known once every chunk is read: rewrite the (small) label files as indices
+    classes = sorted(int(c) if float(c).is_integer() else c for c in classes)
+    values = np.asarray(classes, dtype=np.float32)
+    for shard in shards:
+        path = os.path.join(tmp_root, shard['y'])
+        np.save(path, np.searchsorted(values, np.load(path)).astype(np.float32))
+
+    manifest = {
+        'features': features,
+        'target': target_column,
+        'classes': classes,
+        'n_rows': sum(s['rows'] for s in shards),
+        'fingerprint': digest.hexdigest(),
+        'shards': shards,
+    }
+    with open(os.path.join(tmp_root, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_root = f"{root.rstrip(os.sep)}.old"
+    shutil.rmtree(old_root, ignore_errors=True)
+    if os.path.exists(root):
+        os.replace(root, old_root)
+    os.replace(tmp_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+    print(f"[✓] Wrote {manifest['n_rows']:,} rows x {len(features)} features "
+          f"in {len(shards)} shard(s) to {root}")
+    return FeatureShards(root)
+
+
+def _shard_iter(shards, batch_rows, cache_prefix=None):
+    """`xgboost.DataIter` over the rows of `shards`, one memory-mapped slice per batch."""
+    import xgboost as xgb
+
+    class ShardIter(xgb.DataIter):
+        def __init__(self):
+            self._batches = None
+            self._position = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        def reset(self):
+            self._position = 0
+
+        def next(self, input_data):
+            if self._batches is None:
+                self._batches = list(shards._batch_bounds(batch_rows))
+            if self._position == len(self._batches):
+                return False
+            X, y = shards._read(*self._batches[self._position])
+            input_data(data=X, label=y, feature_names=shards.features)
+            self._position += 1
+            return True
+
+    return ShardIter()
+
+
+class FeatureShards:
+    """
+    A training set written by `write_feature_shards`, read through memory
+    maps: only the pages a batch touches are loaded, and the OS can drop
+    them again under memory pressure.
+
+    XGBoost reads it batch by batch through a `DataIter`, so the raw float
+    features never have to fit in memory at once. `quantile_dmatrix` builds
+    the quantized training matrix once per row range and keeps it, so every
+    Optuna trial and the final fit in a process share the same matrix instead
+    of re-converting the data. Use `external_memory=True` when even the
+    quantized data doesn't fit; XGBoost then pages it from `cache_dir`.
+
+    `subset(start, end)` gives a row range (e.g. the training part of a
+    chronological split) that shares the parent's matrix cache.
+    """
+
+    def __init__(self, root="data/shards/features", start=0, end=None, _shared=None):
+        self.root = root
+        if _shared is None:
+            with open(os.path.join(root, MANIFEST)) as f:
+                manifest = json.load(f)
+            _shared = {'manifest': manifest, 'matrices': {}, 'lock': threading.Lock(),
+                       'offsets': np.cumsum([0] + [s['rows'] for s in manifest['shards']])}
+        self._shared = _shared
+        self.manifest = _shared['manifest']
+        self.features = self.manifest['features']
+        self.classes = self.manifest['classes']
+        self.start = start
+        self.end = self.manifest['n_rows'] if end is None else min(end, self.manifest['n_rows'])
+        if not 0 <= self.start <= self.end:
+            raise ValueError(f"Invalid row range [{start}, {end})")
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getstate__(self):
+        # Matrices and locks stay in their process; a worker rebuilds what it needs once
+        return {'root': self.root, 'start': self.start, 'end': self.end}
+
+    def __setstate__(self, state):
+        self.__init__(state['root'], state['start'], state['end'])
+
+    @property
+    def fingerprint(self):
+        return self.manifest['fingerprint']
+
+    def subset(self, start=0, end=None):
+        """Rows [start, end) of this range, sharing its cache of quantized matrices."""
+        end = len(self) if end is None else min(end, len(self))
+        return FeatureShards(self.root, self.start + start, self.start + end, _shared=self._shared)
+
+    def _shard(self, i):
+        shard = self.manifest['shards'][i]
+        return (np.load(os.path.join(self.root, shard['x']), mmap_mode='r'),
+                np.load(os.path.join(self.root, shard['y']), mmap_mode='r'))
+
+    def _batch_bounds(self, batch_rows=None):
+        """(shard, row_start, row_end) pieces covering this range, at most `batch_rows` each."""
+        offsets = self._shared['offsets']
+        for i, shard in enumerate(self.manifest['shards']):
+            lo, hi = max(self.start, offsets[i]), min(self.end, offsets[i + 1])
+            if lo >= hi:
+                continue
+            step = batch_rows or shard['rows']
+            for begin in range(lo, hi, step):
+                yield i, int(begin - offsets[i]), int(min(hi, begin + step) - offsets[i])
+
+    def _read(self, i, lo, hi):
+        X, y = self._shard(i)
+        return X[lo:hi], y[lo:hi]  # Row slices of a C-order memmap, not copies
+
+    def iter_batches(self, batch_rows=None):
+        """(X, y) memory-mapped batches in row order."""
+        for bounds in self._batch_bounds(batch_rows):
+            yield self._read(*bounds)
+
+    def labels(self):
+        """Class indices of this range, as XGBoost sees them."""
+        return np.concatenate([y for _, y in self.iter_batches()]) if len(self) else np.empty(0, np.float32)
+
+    def targets(self):
+        """Target values of this range (the labels decoded through the manifest's classes)."""
+        return np.asarray(self.classes)[self.labels().astype(np.int64)]
+
+    def last_timestamp(self):
+        """Epoch ms timestamp of the last row in this range, or None without timestamps."""
+        if not len(self):
+            return None
+        offsets = self._shared['offsets']
+        i = int(np.searchsorted(offsets, self.end - 1, side='right')) - 1
+        shard = self.manifest['shards'][i]
+        if not shard.get('t'):
+            return None
+        return int(np.load(os.path.join(self.root, shard['t']), mmap_mode='r')[self.end - 1 - offsets[i]])
+
+    def timestamps(self):
+        """Epoch ms timestamps of this range, or None without timestamps."""
+        parts = []
+        for i, lo, hi in self._batch_bounds():
+            shard = self.manifest['shards'][i]
+            if not shard.get('t'):
+                return None
+            parts.append(np.load(os.path.join(self.root, shard['t']), mmap_mode='r')[lo:hi])
+        return np.concatenate(parts) if parts else np.empty(0, np.int64)
+
+    def to_frame(self):
+        """This range as a DataFrame (features + target); copies, so use it on small ranges."""
+        X = np.concatenate([x for x, _ in self.iter_batches()]) if len(self) else \
+            np.empty((0, len(self.features)), np.float32)
+        df = pd.DataFrame(X, columns=self.features)
+        df[self.manifest['target']] = self.targets()
+        return df
+
+    def quantile_dmatrix(self, max_bin=256, ref=None, batch_rows=DEFAULT_SHARD_ROWS,
+                         external_memory=False, cache_dir=None, nthread=None):
+        """
+        Quantized XGBoost matrix of this range, built once and cached.
+
+        Args:
+            max_bin (int): Histogram bins; training must use the same `max_bin`
+            ref (xgboost.DMatrix | None): Training matrix whose quantile cuts an
+                evaluation matrix reuses
+            external_memory (bool): Page the quantized data to `cache_dir`
+                (`xgboost.ExtMemQuantileDMatrix`) instead of keeping it in memory
+        """
+        import xgboost as xgb
+
+        key = (self.start, self.end, max_bin, id(ref) if ref is not None else None, external_memory)
+        with self._shared['lock']:
+            matrix = self._shared['matrices'].get(key)
+            if matrix is not None:
+                return matrix
+            if external_memory:
+                cache_dir = cache_dir or os.path.join(self.root, 'cache')
+                os.makedirs(cache_dir, exist_ok=True)
+                it = _shard_iter(self, batch_rows, cache_prefix=os.path.join(cache_dir, f"{self.start}_{self.end}"))
+                matrix = xgb.ExtMemQuantileDMatrix(it, max_bin=max_bin, ref=ref, nthread=nthread)
+            else:
+                matrix = xgb.QuantileDMatrix(_shard_iter(self, batch_rows), max_bin=max_bin, ref=ref,
+                                             nthread=nthread)
+            self._shared['matrices'][key] = matrix
+        return matrix
+
+    def clear_cache(self):
+        """Free the cached quantized matrices."""
+        with self._shared['lock']:
+            self._shared['matrices'].clear()
+
+
+def booster_params(params, classes, max_bin=256, n_jobs=None):
+    """
+    Map `XGBClassifier`-style params (as from `optuna_tuner.suggest_params`)
+    to `xgboost.train` params.
+
+    Returns:
+        (dict, int): Booster params and the number of boosting rounds
+    """
+    params = dict(params)
+    rounds = params.pop('n_estimators', 100)
+    params.update(max_bin=max_bin, tree_method='hist')
+    if n_jobs is not None:
+        params['nthread'] = n_jobs
+    if len(classes) > 2:
+        params.update(objective='multi:softprob', num_class=len(classes), eval_metric='mlogloss')
+    else:
+        params.update(objective='binary:logistic', eval_metric='logloss')
+    return params, rounds
+
+
+def predict_proba(booster, matrix):
+    """Class probabilities as (n_rows, n_classes), for binary models too."""
+    proba = booster.predict(matrix)
+    return np.column_stack([1 - proba, proba]) if proba.ndim == 1 else proba
+
+
+def score(scoring, y_true, proba, classes):
+    """
+    Score class probabilities with a metric named like the sklearn scorers.
+    `y_true` are class indices as stored in the shards; both sides are
+    decoded to the target values in `classes` before scoring.
+    """
+    from sklearn import metrics
+
+    classes = np.asarray(classes)
+    y_true = classes[np.asarray(y_true).astype(np.int64)]
+    y_pred = classes[proba.argmax(axis=1)]
+    if scoring == 'accuracy':
+        return metrics.accuracy_score(y_true, y_pred)
+    if scoring == 'balanced_accuracy':
+        return metrics.balanced_accuracy_score(y_true, y_pred)
+    if scoring in ('f1_macro', 'f1_weighted'):
+        return metrics.f1_score(y_true, y_pred, average=scoring[3:])
+    if scoring == 'neg_log_loss':
+        return -metrics.log_loss(y_true, proba, labels=classes)
+    raise ValueError(f"Unsupported scoring for feature shards: {scoring}")
+
+
+def train_booster(shards, params=None, max_bin=256, n_jobs=None, external_memory=False):
+    """Train an XGBoost booster on every row of `shards` (via its cached quantized matrix)."""
+    import xgboost as xgb
+
+    params, rounds = booster_params(params or {}, shards.classes, max_bin, n_jobs)
+    dtrain = shards.quantile_dmatrix(max_bin=max_bin, external_memory=external_memory)
+    return xgb.train(params, dtrain, num_boost_round=rounds)
+
+
+def to_classifier(booster):
+    """Wrap a trained booster in an `XGBClassifier` (for `CryptoModelTrainer` and the pickled model)."""
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    model.load_model(booster.save_raw(raw_format='json'))
+    return model
+
+
+if __name__ == "__main__":
+    # Shard the labelled training data (written in time order by the retrain pipeline) without loading it whole
+    shards = write_feature_shards(iter_parquet_batches("data/processed/training_data.parquet"))
+    print(f"[✓] {len(shards):,} rows, fingerprint {shards.fingerprint[:12]}")
@@ -0,0 +1,85 @@
+# src/import_profiler.py
+
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules on the startup path of the scheduler and dashboard
+DEFAULT_MODULES = [
+    'data_loader', 'feature_engineering', 'ai_intelligence', 'alerts',
+    'model', 'optuna_tuner', 'backtest', 'explainability', 'scheduler',
+    'dashboard.app',
+]
+
+# Import-time budgets in seconds; exceeding one is reported as a regression
+DEFAULT_BUDGETS = {module: 1.0 for module in DEFAULT_MODULES}
+
+
+def measure_import(module, python=None):
+    """
+    Import `module` in a fresh interpreter and return its import profile.
+
+    Returns:
+        dict: {'module', 'seconds', 'heaviest': [(dependency, seconds), ...]}
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_DIR, os.environ.get('PYTHONPATH', '')]))
+    proc = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, env=env, cwd=os.path.dirname(SRC_DIR))
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'unknown error'
+        return {'module': module, 'seconds': None, 'heaviest': [], 'error': error}
+
+    # Children are printed before their parent, so collect the direct children
+    # (depth 3) seen since the previous top-level import until `module` itself.
+    children, total = [], 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cum_us, name = line[len('import time:'):].split('|')
+        depth = len(name) - len(name.lstrip())
+        seconds = int(cum_us) / 1e6
+        if depth == 1:
+            if name.strip() == module:
+                total = seconds
+                break
+            children = []
+        elif depth == 3:
+            children.append((name.strip(), seconds))
+
+    heaviest = sorted(children, key=lambda item: item[1], reverse=True)[:5]
+    return {'module': module, 'seconds': total, 'heaviest': heaviest}
+
+
+def import_time_report(modules=None, budgets=None):
+    """
+    Print the import time of each module (fresh interpreter per module) and
+    flag any that exceed their budget.
+
+    Returns:
+        (List[dict], List[str]): Per-module profiles, and modules over budget
+    """
+    modules = modules or DEFAULT_MODULES
+    budgets = DEFAULT_BUDGETS if budgets is None else budgets
+
+    profiles = [measure_import(module) for module in modules]
+    over_budget = []
+    print(f"{'module':<22}{'import (s)':>12}  heaviest dependencies")
+    for p in profiles:
+        if p['seconds'] is None:
+            print(f"{p['module']:<22}{'failed':>12}  {p['error']}")
+            over_budget.append(p['module'])
+            continue
+        heavy = ', '.join(f"{name} {sec:.2f}s" for name, sec in p['heaviest'][:3])
+        flag = ''
+        if p['module'] in budgets and p['seconds'] > budgets[p['module']]:
+            flag = '  [!] over budget'
+            over_budget.append(p['module'])
+        print(f"{p['module']:<22}{p['seconds']:>12.3f}  {heavy}{flag}")
+    return profiles, over_budget
+
+
+if __name__ == "__main__":
+    _, regressions = import_time_report(sys.argv[1:] or None)
+    sys.exit(1 if regressions else 0)
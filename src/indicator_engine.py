@@ -0,0 +1,205 @@
+# src/indicator_engine.py
+
+import json
+import math
+from collections import deque
+
+import pandas as pd
+
+# Columns produced by `add_technical_indicators`, in the same order
+FEATURE_COLUMNS = ['ema_12', 'ema_26', 'rsi', 'macd', 'macd_signal',
+                   'bb_upper', 'bb_lower', 'volatility', 'roc']
+
+
+class _EWMA:
+    """
+    Recursive EWM mean with the same update rule as
+    `Series.ewm(alpha=..., adjust=False, min_periods=...).mean()`, which is what
+    `ta` uses for EMA, MACD and Wilder RSI.
+    """
+
+    def __init__(self, alpha, min_periods, value=None, nobs=0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = value
+        self.nobs = nobs
+
+    def update(self, x):
+        if x is None or x != x:
+            # Missing input: pandas keeps the running mean and does not count it
+            return self.current()
+        self.nobs += 1
+        if self.value is None:
+            self.value = x
+        elif self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.current()
+
+    def current(self):
+        if self.value is None or self.nobs < self.min_periods:
+            return math.nan
+        return self.value
+
+    def to_dict(self):
+        return {'value': self.value, 'nobs': self.nobs}
+
+
+class SymbolIndicators:
+    """
+    O(1)-per-bar indicator state for one symbol.
+
+    Matches `add_technical_indicators` (EMA-12/26, RSI-14, MACD 12/26/9,
+    Bollinger 20/2, ROC-10, high-low volatility). Rolling windows are kept in
+    fixed-size ring buffers, so memory does not grow with history.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.ema_12 = _EWMA(2 / (12 + 1), 12, **state.get('ema_12', {}))
+        self.ema_26 = _EWMA(2 / (26 + 1), 26, **state.get('ema_26', {}))
+        self.macd_signal = _EWMA(2 / (9 + 1), 9, **state.get('macd_signal', {}))
+        self.rsi_up = _EWMA(1 / 14, 14, **state.get('rsi_up', {}))
+        self.rsi_down = _EWMA(1 / 14, 14, **state.get('rsi_down', {}))
+        self.bb_window = deque(state.get('bb_window', []), maxlen=20)
+        self.roc_window = deque(state.get('roc_window', []), maxlen=11)
+        self.prev_close = state.get('prev_close')
+        self.last_timestamp = state.get('last_timestamp')
+
+    def update(self, close, high, low):
+        """Push one closed candle; returns the feature dict (NaN during warm-up)."""
+        ema_12 = self.ema_12.update(close)
+        ema_26 = self.ema_26.update(close)
+        macd = ema_12 - ema_26
+        macd_signal = self.macd_signal.update(macd)
+
+        # First bar has no diff; `ta` turns that NaN into 0.0 for both directions
+        diff = close - self.prev_close if self.prev_close is not None else math.nan
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        avg_up = self.rsi_up.update(up)
+        avg_down = self.rsi_down.update(down)
+        if avg_down != avg_down:
+            rsi = math.nan
+        elif avg_down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + avg_up / avg_down))
+        self.prev_close = close
+
+        self.bb_window.append(close)
+        if len(self.bb_window) == self.bb_window.maxlen:
+            n = len(self.bb_window)
+            mavg = sum(self.bb_window) / n
+            mstd = math.sqrt(sum((x - mavg) ** 2 for x in self.bb_window) / n)
+            bb_upper, bb_lower = mavg + 2 * mstd, mavg - 2 * mstd
+        else:
+            bb_upper = bb_lower = math.nan
+
+        self.roc_window.append(close)
+        if len(self.roc_window) == self.roc_window.maxlen:
+            base = self.roc_window[0]
+            roc = ((close - base) / base) * 100
+        else:
+            roc = math.nan
+
+        return {
+            'ema_12': ema_12,
+            'ema_26': ema_26,
+            'rsi': rsi,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'volatility': high - low,
+            'roc': roc,
+        }
+
+    def to_dict(self):
+        return {
+            'ema_12': self.ema_12.to_dict(),
+            'ema_26': self.ema_26.to_dict(),
+            'macd_signal': self.macd_signal.to_dict(),
+            'rsi_up': self.rsi_up.to_dict(),
+            'rsi_down': self.rsi_down.to_dict(),
+            'bb_window': list(self.bb_window),
+            'roc_window': list(self.roc_window),
+            'prev_close': self.prev_close,
+            'last_timestamp': self.last_timestamp,
+        }
+
+
+class IndicatorEngine:
+    """
+    Streaming technical indicators for many symbols.
+
+    Push new candles in with `update`/`update_many`; rows come out once a
+    symbol is past its warm-up (the same rows `add_technical_indicators`
+    keeps after `dropna`). State can be saved and restored between
+    scheduler runs with `save`/`load`.
+    """
+
+    def __init__(self, state=None):
+        self.symbols = {symbol: SymbolIndicators(s) for symbol, s in (state or {}).items()}
+
+    def update(self, symbol, timestamp, open, high, low, close, volume):
+        """
+        Push one closed candle for a symbol.
+
+        Returns:
+            dict | None: Feature row, or None during warm-up or when the candle
+            is not newer than the last one seen for this symbol
+        """
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = SymbolIndicators()
+
+        ts = pd.Timestamp(timestamp).isoformat()
+        if state.last_timestamp is not None and ts <= state.last_timestamp:
+            return None
+        state.last_timestamp = ts
+
+        features = state.update(float(close), float(high), float(low))
+        if any(v != v for v in features.values()):
+            return None
+        row = {'symbol': symbol, 'timestamp': pd.Timestamp(timestamp),
+               'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume}
+        row.update(features)
+        return row
+
+    def update_many(self, df, symbol=None):
+        """
+        Push a frame of candles (sorted by time within each symbol).
+
+        Args:
+            df (pd.DataFrame): OHLCV rows; needs a 'symbol' column unless `symbol` is given
+            symbol (str | None): Symbol for a single-symbol frame
+
+        Returns:
+            pd.DataFrame: Feature rows produced by this batch
+        """
+        cols = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        symbols = [symbol] * len(df) if symbol is not None else df['symbol'].tolist()
+        rows = []
+        for sym, values in zip(symbols, df[cols].itertuples(index=False, name=None)):
+            row = self.update(sym, *values)
+            if row is not None:
+                rows.append(row)
+        return pd.DataFrame(rows, columns=['symbol'] + cols + FEATURE_COLUMNS)
+
+    def to_dict(self):
+        return {symbol: state.to_dict() for symbol, state in self.symbols.items()}
+
+    def save(self, path="data/processed/indicator_state.json"):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        print(f"[✓] Indicator state saved: {path} ({len(self.symbols)} symbols)")
+
+    @classmethod
+    def load(cls, path="data/processed/indicator_state.json"):
+        """Restore saved state; returns an empty engine if no state file exists."""
+        try:
+            with open(path) as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
@@ -0,0 +1,146 @@
+# src/market_store.py
+
+import os
+import uuid
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Typed schema for stored candles (partition columns live in the directory names)
+OHLCV_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ms')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.float64()),
+])
+
+PARTITION_SCHEMA = pa.schema([
+    ('symbol', pa.string()),
+    ('timeframe', pa.string()),
+    ('month', pa.string()),
+])
+
+
+def _clean_symbol(symbol):
+    return symbol.replace('/', '_')
+
+
+class MarketDataStore:
+    """
+    Parquet store for OHLCV candles, partitioned as
+    <root>/symbol=<SYM>/timeframe=<TF>/month=<YYYY-MM>/data.parquet
+
+    Reads only open the partitions matching the requested symbols and months,
+    and only decode the requested columns.
+    """
+
+    def __init__(self, root="data/store/ohlcv"):
+        self.root = root
+
+    def _partition_dir(self, symbol, timeframe, month):
+        return os.path.join(self.root, f"symbol={_clean_symbol(symbol)}",
+                            f"timeframe={timeframe}", f"month={month}")
+
+    def append(self, df, symbol, timeframe='1h'):
+        """
+        Merge candles into the store. Duplicate timestamps are resolved in
+        favour of the new rows. Each touched month file is rewritten through a
+        temp file + os.replace, so readers never see a half-written partition.
+
+        Returns:
+            int: Number of rows written
+        """
+        if df.empty:
+            return 0
+        df = df[OHLCV_SCHEMA.names].copy()
+        df['timestamp'] = pd.to_datetime(df['timestamp']).astype('datetime64[ms]')
+        months = df['timestamp'].dt.strftime('%Y-%m')
+
+        written = 0
+        for month, chunk in df.groupby(months, sort=True):
+            part_dir = self._partition_dir(symbol, timeframe, month)
+            path = os.path.join(part_dir, "data.parquet")
+            if os.path.exists(path):
+                existing = pq.read_table(path, schema=OHLCV_SCHEMA).to_pandas()
+                chunk = pd.concat([existing, chunk], ignore_index=True)
+            chunk = (chunk.drop_duplicates(subset='timestamp', keep='last')
+                          .sort_values('timestamp'))
+
+            os.makedirs(part_dir, exist_ok=True)
+            table = pa.Table.from_pandas(chunk, schema=OHLCV_SCHEMA, preserve_index=False)
+            tmp_path = os.path.join(part_dir, f".tmp-{uuid.uuid4().hex}.parquet")
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+            written += len(chunk)
+        return written
+
+    def symbols(self, timeframe=None):
+        """List stored symbols (in 'BTC_USDT' form)."""
+        pattern = os.path.join(self.root, "symbol=*", f"timeframe={timeframe or '*'}")
+        return sorted({os.path.basename(os.path.dirname(p)).split('=', 1)[1]
+                       for p in glob(pattern)})
+
+    def last_timestamp(self, symbol, timeframe='1h'):
+        """Latest stored candle time for a symbol, or None."""
+        months = sorted(glob(os.path.join(self.root, f"symbol={_clean_symbol(symbol)}",
+                                          f"timeframe={timeframe}", "month=*", "data.parquet")))
+        if not months:
+            return None
+        ts = pq.read_table(months[-1], columns=['timestamp']).column('timestamp')
+        return pd.Timestamp(pc.max(ts).as_py())
+
+    def load(self, symbols=None, start=None, end=None, columns=None, timeframe='1h'):
+        """
+        Load candles for a set of symbols and time range.
+
+        Args:
+            symbols (List[str] | None): 'BTC/USDT' or 'BTC_USDT' style; None = all
+            start, end (str | datetime | None): Inclusive time bounds
+            columns (List[str] | None): OHLCV columns to read (timestamp and
+                symbol are always returned)
+            timeframe (str): Candle timeframe partition
+
+        Returns:
+            pd.DataFrame: Long-format candles sorted by symbol, timestamp
+        """
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=['symbol'] + OHLCV_SCHEMA.names)
+
+        dataset = ds.dataset(self.root, format='parquet',
+                             partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+                             schema=pa.unify_schemas([OHLCV_SCHEMA, PARTITION_SCHEMA]))
+
+        # Partition-level predicates prune whole directories before any file is opened
+        expr = ds.field('timeframe') == timeframe
+        if symbols is not None:
+            expr &= ds.field('symbol').isin([_clean_symbol(s) for s in symbols])
+        if start is not None:
+            start = pd.Timestamp(start)
+            expr &= ds.field('month') >= start.strftime('%Y-%m')
+            expr &= ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('ms'))
+        if end is not None:
+            end = pd.Timestamp(end)
+            expr &= ds.field('month') <= end.strftime('%Y-%m')
+            expr &= ds.field('timestamp') <= pa.scalar(end.to_pydatetime(), pa.timestamp('ms'))
+
+        read_columns = ['symbol', 'timestamp'] + [c for c in (columns or OHLCV_SCHEMA.names[1:])
+                                                  if c not in ('symbol', 'timestamp')]
+        table = dataset.to_table(columns=read_columns, filter=expr)
+        df = table.to_pandas()
+        return df.sort_values(['symbol', 'timestamp'], ignore_index=True)
+
+    def import_csv_dir(self, ohlcv_dir="data/raw/ohlcv", timeframe='1h'):
+        """One-off migration of the per-symbol CSVs into the store."""
+        imported = {}
+        for file in sorted(glob(os.path.join(ohlcv_dir, '*.csv'))):
+            symbol = os.path.basename(file).replace('.csv', '')
+            df = pd.read_csv(file, parse_dates=['timestamp'])
+            imported[symbol] = self.append(df, symbol, timeframe)
+        print(f"[✓] Imported {len(imported)} symbols into {self.root}")
+        return imported
@@ -1,90 +1,408 @@
 # src/model.py
 
+import json
+import math
+import os
+from datetime import datetime
+
 import pandas as pd
 import numpy as np
-import joblib
-import optuna
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from xgboost import XGBClassifier
-from lightgbm import LGBMClassifier
+
+# xgboost, lightgbm, optuna, sklearn and joblib are imported inside the methods
+# that need them, so loading a model for prediction doesn't pay for training libraries.
+
+INCREMENTAL_MODEL_TYPES = ('xgboost', 'lightgbm')
+
+
+def model_meta_path(model_path):
+    """Training metadata lives next to the model: models/xgb_model.pkl -> models/xgb_model.meta.json"""
+    return os.path.splitext(model_path)[0] + '.meta.json'
+
+
+def native_model_path(model_path, model_type):
+    """Native booster file next to the pickle: .json for XGBoost, .txt for LightGBM."""
+    return os.path.splitext(model_path)[0] + ('.json' if model_type == 'xgboost' else '.txt')
+
+
+def flat_model_path(model_path):
+    """Flattened tree model (`tree_compiler.FlatTreeModel`) next to the pickle: .trees.npz"""
+    return os.path.splitext(model_path)[0] + '.trees.npz'
+
+
+def load_model_meta(model_path):
+    try:
+        with open(model_meta_path(model_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def encode_labels(y, classes):
+    """
+    Targets as indices into sorted `classes`, e.g. Sell/Hold/Buy {-1, 0, 1} -> {0, 1, 2}.
+    XGBoost only accepts labels 0..k-1; the metadata keeps `classes` to map back.
+    """
+    classes, y = np.asarray(classes), np.asarray(y)
+    index = np.searchsorted(classes, y).clip(0, max(len(classes) - 1, 0))
+    if len(y) and (not len(classes) or not np.array_equal(classes[index], y)):
+        unknown = sorted(set(y.tolist()) - set(classes.tolist()))
+        raise ValueError(f"Labels {unknown} are not in the model classes {classes.tolist()}")
+    return index
+
+
+def feature_stats(X):
+    """{column: [mean, std]} reference statistics for the drift check."""
+    return {col: [float(X[col].mean()), float(X[col].std())] for col in X.columns}
+
+
+def feature_drift(reference_stats, X):
+    """
+    Largest shift of a feature's mean in `X` away from the reference, in units
+    of the reference standard deviation.
+    """
+    drift = 0.0
+    for col, (mean, std) in reference_stats.items():
+        if col not in X or not std or not np.isfinite(std):
+            continue
+        drift = max(drift, abs(float(X[col].mean()) - mean) / std)
+    return drift
+
+
+def _n_trees(model, model_type):
+    if model_type == 'xgboost':
+        return int(model.get_booster().num_boosted_rounds())
+    return int(model.booster_.current_iteration())
 
 
 class CryptoModelTrainer:
-    def __init__(self, df: pd.DataFrame, target_column='target'):
-        self.df = df.dropna()
+    def __init__(self, df: pd.DataFrame, target_column='target', dropna=True):
+        # dropna() copies the whole frame even when nothing is dropped, so only call it when needed.
+        # With dropna=False feature gaps stay NaN (the boosters handle them); unlabelled rows still go.
+        subset = None if dropna else [target_column] if target_column in df else []
+        self.df = df.dropna(subset=subset) if any(df[c].hasnans for c in subset or df.columns) else df
         self.target_column = target_column
+        # Raw target values; the models are fit on their indices (see `encode_labels`)
+        self.classes = sorted(self.df[target_column].unique().tolist()) if target_column in self.df else []
         self.model = None
 
-    def prepare_data(self):
+    @classmethod
+    def from_master(cls, df: pd.DataFrame, target_column='target', exclude=('symbol',), dropna=False):
+        """
+        Trainer over a master dataset loaded with `dataset_schema.load_master_dataset`
+        (float32 features, epoch-ms timestamps): the timestamps become the index
+        and `exclude` columns are left out, without copying the feature columns.
+        If the frame is sorted by timestamp, `prepare_data` splits it without copies too.
+        Missing feature values (e.g. trend/sentiment gaps) are kept unless `dropna`.
+        """
+        from dataset_schema import epoch_ms_to_datetime
+
+        features = df.drop(columns=['timestamp', *[c for c in exclude if c in df]])
+        features.index = epoch_ms_to_datetime(df['timestamp'])
+        return cls(features, target_column=target_column, dropna=dropna)
+
+    def prepare_data(self, shuffle=False):
+        """
+        Split into train/test. By default the split is chronological (last 20%
+        held out) so the test set never precedes training data.
+        """
+        from sklearn.model_selection import train_test_split
+
         print("[+] Preparing training and test data...")
-        X = self.df.drop(columns=[self.target_column])
-        y = self.df[self.target_column]
+        df = self.df
+        if not shuffle and isinstance(df.index, pd.DatetimeIndex) and not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind='stable')
+        X = df.drop(columns=[self.target_column])
+        y = df[self.target_column]
+        if not shuffle:
+            # Positional slices are views (copy-on-write), unlike train_test_split's take()
+            n_train = len(df) - math.ceil(0.2 * len(df))
+            return X.iloc[:n_train], X.iloc[n_train:], y.iloc[:n_train], y.iloc[n_train:]
         return train_test_split(X, y, test_size=0.2, random_state=42)
 
-    def train_xgboost(self, use_optuna=False):
+    def train_xgboost(self, use_optuna=False, n_trials=30, n_jobs=1, storage=None, horizon=4):
+        """
+        Train XGBoost on the chronological split, optionally tuned with Optuna.
+        `horizon` is how many bars ahead the target looks; that many bars are
+        purged before each CV test block.
+        """
+        from sklearn.metrics import classification_report
+        from xgboost import XGBClassifier
+
         X_train, X_test, y_train, y_test = self.prepare_data()
         
         if use_optuna:
-            print("[*] Running Optuna tuning for XGBoost...")
-            def objective(trial):
-                params = {
-                    'max_depth': trial.suggest_int('max_depth', 3, 10),
-                    'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                    'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                    'subsample': trial.suggest_float('subsample', 0.5, 1.0),
-                    'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
-                    'gamma': trial.suggest_float('gamma', 0, 5),
-                }
-                model = XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', **params)
-                score = cross_val_score(model, X_train, y_train, cv=3, scoring='accuracy').mean()
-                return score
-
-            study = optuna.create_study(direction="maximize")
-            study.optimize(objective, n_trials=30)
-            best_params = study.best_params
+            from optuna_tuner import tune_model
+
+            # Purged time-series CV with pruning, warm-started from the last run's best params
+            best_params, _ = tune_model(X_train, encode_labels(y_train, self.classes), model_type='xgboost',
+                                        n_trials=n_trials, purge=horizon, n_jobs=n_jobs, storage=storage)
             print(f"[✓] Best params: {best_params}")
             self.model = XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', **best_params)
         else:
             self.model = XGBClassifier(use_label_encoder=False, eval_metric='mlogloss')
 
         print("[+] Training XGBoost model...")
-        self.model.fit(X_train, y_train)
-        y_pred = self.model.predict(X_test)
+        self.model.fit(X_train, encode_labels(y_train, self.classes))
+        y_pred = self.predict(X_test)
         print(classification_report(y_test, y_pred))
         return self.model
 
     def train_lightgbm(self):
+        from lightgbm import LGBMClassifier
+        from sklearn.metrics import classification_report
+
         X_train, X_test, y_train, y_test = self.prepare_data()
         print("[+] Training LightGBM model...")
         self.model = LGBMClassifier()
-        self.model.fit(X_train, y_train)
-        y_pred = self.model.predict(X_test)
+        self.model.fit(X_train, encode_labels(y_train, self.classes))
+        y_pred = self.predict(X_test)
         print(classification_report(y_test, y_pred))
         return self.model
 
     def predict(self, new_data: pd.DataFrame):
         if self.model is None:
             raise ValueError("Model is not trained. Call train_xgboost or train_lightgbm first.")
-        return self.model.predict(new_data)
+        return np.asarray(self.classes)[self.model.predict(new_data).astype(int)]
 
     def save_model(self, filepath: str = 'models/xgb_model.pkl'):
         if self.model:
+            import joblib
             joblib.dump(self.model, filepath)
             print(f"[✓] Model saved to {filepath}")
         else:
             print("[!] No model to save.")
 
     def load_model(self, filepath: str = 'models/xgb_model.pkl'):
+        import joblib
+        if os.path.getsize(filepath) == 0:
+            raise ValueError(f"{filepath} is an empty placeholder; train a model first (model.train_model)")
         self.model = joblib.load(filepath)
+        meta = load_model_meta(filepath)
+        if meta and meta.get('classes'):
+            self.classes = meta['classes']
         print(f"[✓] Model loaded from {filepath}")
         return self.model
 
+    def save_native_model(self, filepath: str = 'models/xgb_model.json'):
+        """
+        Save the booster in its native format for `predictor.SignalPredictor`.
+        Written to a temp file and renamed, so a watching predictor never
+        reads a partial model.
+        """
+        if self.model is None:
+            print("[!] No model to save.")
+            return
+        root, ext = os.path.splitext(filepath)
+        tmp_path = f"{root}.tmp{ext}"
+        booster = self.model.get_booster() if hasattr(self.model, 'get_booster') else self.model.booster_
+        booster.save_model(tmp_path)
+        os.replace(tmp_path, filepath)
+        print(f"[✓] Native model saved to {filepath}")
+
+    def export_flat_model(self, filepath: str = 'models/xgb_model.trees.npz'):
+        """
+        Export the trained XGBoost/LightGBM model as a `tree_compiler.FlatTreeModel`
+        (NumPy arrays of nodes) for low-overhead scoring of small batches,
+        e.g. `SignalPredictor('models/xgb_model.trees.npz')`.
+        """
+        from tree_compiler import FlatTreeModel
+
+        if self.model is None:
+            print("[!] No model to export.")
+            return None
+        flat = FlatTreeModel.from_model(self.model)
+        flat.save(filepath)
+        return flat
+
+    def retrain_incremental(self, model_path='models/xgb_model.pkl', model_type='xgboost',
+                            window=20000, new_rounds=50, drift_threshold=3.0, max_trees=2000,
+                            full=False):
+        """
+        Continue boosting the saved model on only the bars that arrived since it
+        was last trained, instead of retraining on the full history.
+
+        Falls back to a full retrain on the last `window` bars (with the saved
+        best params) when there is no previous model, the feature set changed,
+        the new bars drift more than `drift_threshold` reference standard
+        deviations, the booster would exceed `max_trees`, or the new bars don't
+        contain every class the model was trained on.
+
+        Args:
+            window (int): Sliding-window cap, in bars, on the data used for either mode
+            new_rounds (int): Boosting rounds added per incremental update
+            full (bool): Force a full retrain
+
+        Returns:
+            Trained model (also saved to `model_path` with its metadata)
+        """
+        if model_type not in INCREMENTAL_MODEL_TYPES:
+            raise ValueError(f"Incremental retraining supports {INCREMENTAL_MODEL_TYPES}, not {model_type}")
+        if not isinstance(self.df.index, pd.DatetimeIndex):
+            raise ValueError("Incremental retraining needs a DatetimeIndex to find the new bars.")
+
+        if self.df.empty:
+            raise ValueError("No training rows left after dropping NaNs.")
+
+        df = self.df
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind='stable')
+        features = [c for c in df.columns if c != self.target_column]
+
+        meta = None if full or not os.path.exists(model_path) else load_model_meta(model_path)
+        reason = 'forced' if full else None
+        if reason is None and meta is None:
+            reason = 'no previous model'
+        elif reason is None and (meta['model_type'] != model_type or meta['feature_columns'] != features):
+            reason = 'model type or feature set changed'
+
+        if reason is None:
+            new = df[df.index > pd.Timestamp(meta['trained_until'])]
+            if new.empty:
+                print(f"[*] No new bars since {meta['trained_until']}, keeping the current model.")
+                return self.load_model(model_path)
+            new = new.iloc[-window:]
+            X_new, y_new = new[features], new[self.target_column]
+
+            drift = feature_drift(meta['feature_stats'], X_new)
+            if drift > drift_threshold:
+                reason = f"feature drift {drift:.2f} > {drift_threshold}"
+            elif meta['n_trees'] + new_rounds > max_trees:
+                reason = f"tree cap {max_trees} reached"
+            elif sorted(set(y_new.tolist())) != meta['classes']:
+                reason = 'new bars do not cover every class'
+            classes = meta['classes']
+
+        if reason is None:
+            print(f"[+] Continuing {model_type} on {len(new)} new bars (+{new_rounds} rounds)...")
+            previous = self.load_model(model_path)
+            model = type(previous)(**dict(previous.get_params(), n_estimators=new_rounds))
+            y_new = encode_labels(y_new, classes)
+            if model_type == 'xgboost':
+                model.fit(X_new, y_new, xgb_model=previous.get_booster())
+            else:
+                model.fit(X_new, y_new, init_model=previous.booster_)
+            mode, n_trained = 'incremental', len(X_new)
+        else:
+            from optuna_tuner import build_model, load_best_params
+
+            recent = df.iloc[-window:]
+            print(f"[+] Full {model_type} retrain on {len(recent)} bars ({reason})...")
+            model = build_model(model_type, load_best_params(model_type) or {})
+            classes = sorted(set(recent[self.target_column].tolist()))
+            model.fit(recent[features], encode_labels(recent[self.target_column], classes))
+            mode, n_trained = 'full', len(recent)
+
+        self.model, self.classes = model, classes
+        recent = df.iloc[-window:]
+        os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+        self.save_model(model_path)
+        meta = {
+            'model_type': model_type,
+            'mode': mode,
+            'trained_at': datetime.utcnow().isoformat(),
+            'trained_until': df.index[-1].isoformat(),
+            'feature_columns': features,
+            'classes': classes,  # Raw target value of each model class index
+            'n_rows': n_trained,  # Rows fit in this update: the new bars, or the whole window
+            'window_rows': len(recent),  # Sliding window the feature stats are taken over
+            'n_trees': _n_trees(model, model_type),
+            'feature_stats': feature_stats(recent[features]),
+        }
+        # Metadata first: a predictor reloading the new native model reads its classes from it
+        with open(model_meta_path(model_path), 'w') as f:
+            json.dump(meta, f, indent=2)
+        self.save_native_model(native_model_path(model_path, model_type))
+        if os.path.exists(flat_model_path(model_path)):
+            self.export_flat_model(flat_model_path(model_path))  # Keep an exported flat model current
+        return self.model
+
+
+def train_model(data_path="data/processed/training_data.parquet", model_path='models/xgb_model.pkl',
+                model_type='xgboost', **kwargs):
+    """
+    Scheduled retrain: incremental when a compatible saved model exists,
+    otherwise a full retrain. Extra kwargs go to `retrain_incremental`.
+
+    `data_path` is a labelled feature dataset (master schema plus a 'target'
+    column), as written by the retrain pipeline's labelling stage.
+    """
+    from dataset_schema import load_master_dataset
+
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"Training data {data_path} not found. It is written by the retrain "
+                                f"pipeline (scheduler.retrain_model) once features exist.")
+    df = load_master_dataset(data_path, report=False)
+    if 'target' not in df:
+        raise ValueError(f"Training data {data_path} has no 'target' column.")
+    trainer = CryptoModelTrainer.from_master(df, target_column='target')
+    return trainer.retrain_incremental(model_path=model_path, model_type=model_type, **kwargs)
+
+
+def train_model_from_shards(shards_root="data/shards/features", model_path='models/xgb_model.pkl',
+                            use_optuna=False, n_trials=30, n_jobs=1, storage=None, max_bin=256,
+                            external_memory=False, stats_rows=20000, horizon=4):
+    """
+    Train XGBoost on memory-mapped feature shards (see `feature_shards.write_feature_shards`)
+    instead of an in-memory frame. The shards are in time order, so the last
+    20% of rows are a chronological holdout; tuning trials and the final fit
+    reuse the same quantized matrices. `horizon` (bars the target looks
+    ahead) is purged before each CV test block when tuning.
+
+    Saves the pickle, the native model and metadata like `retrain_incremental`,
+    so later incremental retrains and the predictor pick the model up.
+    """
+    from sklearn.metrics import classification_report
+
+    from dataset_schema import epoch_ms_to_datetime
+    from feature_shards import FeatureShards, predict_proba, to_classifier, train_booster
+
+    shards = FeatureShards(shards_root)
+    n_train = len(shards) - math.ceil(0.2 * len(shards))
+    train, test = shards.subset(0, n_train), shards.subset(n_train)
+
+    params = {}
+    if use_optuna:
+        from optuna_tuner import tune_model
+
+        params, _ = tune_model(train, None, model_type='xgboost', n_trials=n_trials,
+                               purge=horizon, n_jobs=n_jobs, storage=storage)
+
+    print(f"[+] Training XGBoost on {len(train):,} shard rows...")
+    booster = train_booster(train, params, max_bin=max_bin, external_memory=external_memory)
+    dtest = test.quantile_dmatrix(max_bin=max_bin, ref=train.quantile_dmatrix(max_bin=max_bin))
+    y_pred = np.asarray(shards.classes)[predict_proba(booster, dtest).argmax(axis=1)]
+    print(classification_report(test.targets(), y_pred))
+
+    trainer = CryptoModelTrainer(pd.DataFrame(columns=[*shards.features, shards.manifest['target']]))
+    trainer.model, trainer.classes = to_classifier(booster), shards.classes
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    trainer.save_model(model_path)
+
+    recent = shards.subset(max(0, len(shards) - stats_rows)).to_frame()
+    last_timestamp = train.last_timestamp()  # The held-out rows are left to the next incremental update
+    meta = {
+        'model_type': 'xgboost',
+        'mode': 'full',
+        'trained_at': datetime.utcnow().isoformat(),
+        'trained_until': epoch_ms_to_datetime([last_timestamp])[0].isoformat() if last_timestamp is not None else None,
+        'feature_columns': shards.features,
+        'classes': shards.classes,  # Raw target value of each class index
+        'n_rows': len(train),
+        'n_trees': _n_trees(trainer.model, 'xgboost'),
+        'feature_stats': feature_stats(recent[shards.features]),
+        'shards_fingerprint': shards.fingerprint,
+    }
+    with open(model_meta_path(model_path), 'w') as f:
+        json.dump(meta, f, indent=2)
+    trainer.save_native_model(native_model_path(model_path, 'xgboost'))  # After the metadata, see retrain_incremental
+    return trainer.model
+
 
 if __name__ == "__main__":
-    df = pd.read_csv("data/processed/btc_features.csv", index_col='timestamp', parse_dates=True)
-    
-    # Example: assume we already have Buy/Sell/Hold targets in 'target' column
-    trainer = CryptoModelTrainer(df, target_column='target')
+    from dataset_schema import load_master_dataset
+
+    # Labelled features (Buy/Sell/Hold in the 'target' column) written by the retrain pipeline
+    df = load_master_dataset("data/processed/training_data.parquet")
+    trainer = CryptoModelTrainer.from_master(df, target_column='target')
     model = trainer.train_xgboost(use_optuna=True)
     trainer.save_model()
@@ -0,0 +1,240 @@
+# src/news_ingest.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from rate_limiter import TokenBucket
+from sentiment_service import get_sentiment_service
+
+GNEWS_SEARCH_URL = "https://gnews.io/api/v4/search"
+
+ARTICLE_COLUMNS = ['symbol', 'coin', 'title', 'description', 'content', 'publishedAt',
+                   'url', 'source', 'fetchedAt']
+SENTIMENT_COLUMNS = ['sentiment_title', 'sentiment_description', 'sentiment_avg']
+
+
+def url_key(url):
+    return hashlib.sha1((url or '').strip().encode('utf-8')).hexdigest()
+
+
+def content_key(title, description):
+    """Hash of the normalized headline text, so syndicated copies under different URLs match."""
+    text = f"{title or ''}\n{description or ''}".strip().lower()
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+_session = None
+
+
+def get_http_session(pool_size=16, retries=3):
+    """Shared pooled `requests.Session` with retry on transient HTTP errors."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+class _RecordedResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._payload
+
+
+class RecordedSession:
+    """
+    Offline stand-in for `requests.Session` that replays recorded GNews
+    responses keyed by the query string ('q' param). Unknown queries return
+    an empty article list.
+    """
+
+    def __init__(self, responses):
+        if isinstance(responses, str):
+            with open(responses) as f:
+                responses = json.load(f)
+        self.responses = responses
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        query = (params or {}).get('q', '')
+        self.calls.append(query)
+        return _RecordedResponse(self.responses.get(query, {'articles': []}))
+
+
+class ArticleIndex:
+    """
+    Persistent SQLite index of ingested articles, keyed by (symbol, URL hash)
+    and unique on (symbol, content hash). Used to drop articles we have
+    already stored and scored.
+    """
+
+    def __init__(self, path="data/cache/news_index.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        columns = ', '.join(f"{c} TEXT" for c in ARTICLE_COLUMNS)
+        scores = ', '.join(f"{c} REAL" for c in SENTIMENT_COLUMNS)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS articles (url_key TEXT, content_key TEXT, "
+            f"{columns}, {scores}, PRIMARY KEY (symbol, url_key), UNIQUE (symbol, content_key))")
+        self._conn.commit()
+
+    def known_keys(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT symbol, url_key, content_key FROM articles").fetchall()
+        return {(s, u) for s, u, _ in rows}, {(s, c) for s, _, c in rows}
+
+    def add(self, df):
+        """Insert scored articles; rows colliding on URL or content are ignored."""
+        if df.empty:
+            return 0
+        cols = ['url_key', 'content_key'] + ARTICLE_COLUMNS + SENTIMENT_COLUMNS
+        rows = df[cols].astype(object).where(df[cols].notna(), None).values.tolist()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO articles ({', '.join(cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))})", rows)
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def load(self, symbols=None):
+        """All stored articles (optionally for some symbols) as a DataFrame."""
+        query = f"SELECT {', '.join(ARTICLE_COLUMNS + SENTIMENT_COLUMNS)} FROM articles"
+        params = []
+        if symbols:
+            query += f" WHERE symbol IN ({','.join('?' * len(symbols))})"
+            params = list(symbols)
+        with self._lock:
+            return pd.read_sql_query(query + " ORDER BY publishedAt", self._conn, params=params)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+class NewsIngestor:
+    """
+    Incremental GNews ingestion: concurrent per-symbol queries over a pooled
+    session, paced by a shared token bucket, with only unseen articles
+    scored and stored in the ArticleIndex.
+    """
+
+    def __init__(self, session=None, index=None, api_key=None, rate=1.0, burst=1,
+                 max_workers=4, max_articles_per_symbol=5):
+        self.session = session
+        self.index = index
+        if api_key is None:
+            from data_loader import load_env
+            load_env()
+            api_key = os.getenv("GNEWS_API_KEY")
+        self.api_key = api_key
+        self.bucket = TokenBucket(rate, burst)
+        self.max_workers = max_workers
+        self.max_articles_per_symbol = max_articles_per_symbol
+
+    def _get_session(self):
+        if self.session is None:
+            self.session = get_http_session(pool_size=self.max_workers)
+        return self.session
+
+    def search(self, query, max_articles=10):
+        """Rate-limited GNews search; returns the raw article dicts."""
+        self.bucket.acquire()
+        params = {'q': query, 'lang': 'en', 'token': self.api_key, 'max': max_articles}
+        response = self._get_session().get(GNEWS_SEARCH_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json().get('articles', [])
+
+    def fetch_symbol(self, symbol):
+        coin = symbol.split('/')[0]
+        fetched_at = datetime.utcnow().isoformat()
+        try:
+            articles = self.search(f"{coin} crypto", self.max_articles_per_symbol)
+        except Exception as e:
+            print(f"⚠️ Error fetching news for {coin}: {e}")
+            return []
+        return [{
+            'symbol': symbol,
+            'coin': coin,
+            'title': article.get('title'),
+            'description': article.get('description'),
+            'content': article.get('content'),
+            'publishedAt': article.get('publishedAt'),
+            'url': article.get('url'),
+            'source': (article.get('source') or {}).get('name'),
+            'fetchedAt': fetched_at,
+        } for article in articles]
+
+    def fetch(self, symbols):
+        """Fetch articles for all symbols concurrently (no dedup against the index)."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            batches = list(pool.map(self.fetch_symbol, symbols))
+        return pd.DataFrame([a for batch in batches for a in batch], columns=ARTICLE_COLUMNS)
+
+    def ingest(self, symbols):
+        """
+        Fetch, drop already-indexed articles, score the rest and store them.
+
+        Returns:
+            pd.DataFrame: Newly ingested articles with sentiment columns
+        """
+        print("🔎 Ingesting crypto news via GNews API...")
+        df = self.fetch(symbols)
+        if df.empty:
+            return pd.DataFrame(columns=ARTICLE_COLUMNS + SENTIMENT_COLUMNS)
+
+        df['url_key'] = df['url'].map(url_key)
+        df['content_key'] = [content_key(t, d) for t, d in zip(df['title'], df['description'])]
+        df = (df.drop_duplicates(['symbol', 'url_key'])
+                .drop_duplicates(['symbol', 'content_key']))
+        if self.index is not None:
+            seen_urls, seen_content = self.index.known_keys()
+            is_seen = [(s, u) in seen_urls or (s, c) in seen_content
+                       for s, u, c in zip(df['symbol'], df['url_key'], df['content_key'])]
+            df = df[~pd.Series(is_seen, index=df.index, dtype=bool)]
+
+        n = len(df)
+        scores = get_sentiment_service().score_many(df['title'].tolist() + df['description'].tolist())
+        df = df.assign(sentiment_title=scores[:n], sentiment_description=scores[n:])
+        df['sentiment_avg'] = df[['sentiment_title', 'sentiment_description']].mean(axis=1)
+
+        if self.index is not None:
+            self.index.add(df)
+        print(f"[✓] {n} new articles ingested")
+        return df[ARTICLE_COLUMNS + SENTIMENT_COLUMNS].reset_index(drop=True)
+
+
+_ingestor = None
+
+
+def get_news_ingestor():
+    """Shared NewsIngestor backed by the on-disk article index (created on first use)."""
+    global _ingestor
+    if _ingestor is None:
+        _ingestor = NewsIngestor(index=ArticleIndex())
+    return _ingestor
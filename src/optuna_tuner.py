@@ -1,54 +1,296 @@
 # src/optuna_tuner.py
 
-import optuna
-from sklearn.model_selection import cross_val_score
-from xgboost import XGBClassifier
-from lightgbm import LGBMClassifier
-from sklearn.ensemble import RandomForestClassifier
+import json
+import os
+from datetime import date
 
+import numpy as np
 
-def tune_model(X, y, model_type='xgboost', n_trials=30, scoring='accuracy'):
-    print(f"[*] Starting Optuna tuning for {model_type.upper()}...")
+# optuna, sklearn and the model libraries are imported on first use
 
-    def objective(trial):
-        if model_type == 'xgboost':
-            params = {
-                'max_depth': trial.suggest_int('max_depth', 3, 10),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                'subsample': trial.suggest_float('subsample', 0.5, 1.0),
-                'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
-                'gamma': trial.suggest_float('gamma', 0, 5),
-            }
-            model = XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', **params)
-
-        elif model_type == 'lightgbm':
-            params = {
-                'num_leaves': trial.suggest_int('num_leaves', 20, 100),
-                'max_depth': trial.suggest_int('max_depth', 3, 15),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                'subsample': trial.suggest_float('subsample', 0.5, 1.0),
-            }
-            model = LGBMClassifier(**params)
-
-        elif model_type == 'random_forest':
-            params = {
-                'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                'max_depth': trial.suggest_int('max_depth', 5, 20),
-                'min_samples_split': trial.suggest_int('min_samples_split', 2, 10),
-                'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 4),
-            }
-            model = RandomForestClassifier(**params)
 
+class PurgedTimeSeriesSplit:
+    """
+    Time-ordered CV splits without look-ahead.
+
+    Rows must be in time order. The bars (rows sharing a timestamp, i.e. one
+    row per symbol) are cut into `n_splits + 1` contiguous blocks; fold k
+    tests on block k + 1 and trains on the blocks before it (or on all other
+    blocks when `forward_only=False`). `purge` drops the last bars before
+    each test block from training, since their labels look into the test
+    period: set it to the label horizon (the default matches
+    `feature_engineering.add_target_labels`). `embargo` drops the bars right
+    after the test block when later data is used for training.
+
+    Timestamps come from `groups`, a DatetimeIndex on X, or
+    `FeatureShards.timestamps()`; without any, each row counts as a bar.
+    """
+
+    def __init__(self, n_splits=3, purge=4, embargo=0, forward_only=True):
+        self.n_splits = n_splits
+        self.purge = purge
+        self.embargo = embargo
+        self.forward_only = forward_only
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def split(self, X, y=None, groups=None):
+        n = len(X)
+        times = groups if groups is not None else _bar_times(X)
+        if times is None:
+            starts = np.arange(n + 1)
         else:
-            raise ValueError(f"Unsupported model type: {model_type}")
+            times = np.asarray(times)
+            if n > 1 and (times[1:] < times[:-1]).any():
+                raise ValueError("Rows must be in time order for purged CV splits.")
+            starts = np.concatenate([[0], np.flatnonzero(times[1:] != times[:-1]) + 1, [n]])
+        n_bars = len(starts) - 1  # starts[b] is the first row of bar b
+        bounds = np.linspace(0, n_bars, self.n_splits + 2).astype(int)
+        indices = np.arange(n)
+        for k in range(1, self.n_splits + 1):
+            test_start, test_end = bounds[k], bounds[k + 1]
+            train = indices[:starts[max(0, test_start - self.purge)]]
+            if not self.forward_only:
+                train = np.concatenate([train, indices[starts[min(n_bars, test_end + self.embargo)]:]])
+            if len(train):
+                yield train, indices[starts[test_start]:starts[test_end]]
+
+
+def _bar_times(X):
+    """Timestamp of each row of X, or None when X carries no timestamps."""
+    if hasattr(X, 'timestamps'):
+        return X.timestamps()
+    index = getattr(X, 'index', None)
+    if index is not None and index.dtype.kind == 'M':
+        return index.to_numpy()
+    return None
+
+
+def suggest_params(trial, model_type):
+    """Search space per model type (shared by `tune_model` and `CryptoModelTrainer`)."""
+    if model_type == 'xgboost':
+        return {
+            'max_depth': trial.suggest_int('max_depth', 3, 10),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'subsample': trial.suggest_float('subsample', 0.5, 1.0),
+            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
+            'gamma': trial.suggest_float('gamma', 0, 5),
+        }
+    elif model_type == 'lightgbm':
+        return {
+            'num_leaves': trial.suggest_int('num_leaves', 20, 100),
+            'max_depth': trial.suggest_int('max_depth', 3, 15),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'subsample': trial.suggest_float('subsample', 0.5, 1.0),
+        }
+    elif model_type == 'random_forest':
+        return {
+            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'max_depth': trial.suggest_int('max_depth', 5, 20),
+            'min_samples_split': trial.suggest_int('min_samples_split', 2, 10),
+            'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 4),
+        }
+    raise ValueError(f"Unsupported model type: {model_type}")
+
+
+def build_model(model_type, params, n_jobs=None):
+    """Instantiate a classifier for `model_type` with the given params."""
+    if model_type == 'xgboost':
+        from xgboost import XGBClassifier
+        return XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', n_jobs=n_jobs, **params)
+    elif model_type == 'lightgbm':
+        from lightgbm import LGBMClassifier
+        return LGBMClassifier(n_jobs=n_jobs if n_jobs is not None else -1, verbose=-1, **params)
+    elif model_type == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_jobs=n_jobs, **params)
+    raise ValueError(f"Unsupported model type: {model_type}")
+
+
+def best_params_path(model_type, folder="models"):
+    return os.path.join(folder, f"best_params_{model_type}.json")
+
+
+def load_best_params(model_type, folder="models"):
+    """Best params saved by the previous tuning run, or None."""
+    try:
+        with open(best_params_path(model_type, folder)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_best_params(model_type, params, folder="models"):
+    os.makedirs(folder, exist_ok=True)
+    with open(best_params_path(model_type, folder), 'w') as f:
+        json.dump(params, f, indent=2)
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, 'iloc') else data[idx]
+
+
+def make_objective(X, y, model_type='xgboost', scoring='accuracy', cv=None, model_n_jobs=None):
+    """
+    Optuna objective: mean CV score over purged time-series folds. The running
+    mean is reported after each fold so the pruner can stop bad trials early.
+    """
+    import optuna
+    from sklearn.metrics import get_scorer
+
+    cv = cv or PurgedTimeSeriesSplit()
+    if model_type == 'xgboost' and hasattr(X, 'quantile_dmatrix'):
+        return _make_shard_objective(X, scoring, cv, model_n_jobs)
+    scorer = get_scorer(scoring)
+    folds = list(cv.split(X, y))
+
+    def objective(trial):
+        params = suggest_params(trial, model_type)
+        scores = []
+        for step, (train_idx, test_idx) in enumerate(folds):
+            model = build_model(model_type, params, n_jobs=model_n_jobs)
+            model.fit(_take(X, train_idx), _take(y, train_idx))
+            scores.append(scorer(model, _take(X, test_idx), _take(y, test_idx)))
+
+            trial.report(float(np.mean(scores)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        return float(np.mean(scores))
 
-        score = cross_val_score(model, X, y, cv=3, scoring=scoring).mean()
-        return score
+    return objective
 
-    study = optuna.create_study(direction="maximize")
-    study.optimize(objective, n_trials=n_trials)
 
+def _make_shard_objective(shards, scoring, cv, model_n_jobs=None, max_bin=256):
+    """
+    `make_objective` for `feature_shards.FeatureShards`: each fold's train and
+    test matrices are quantized once and shared by every trial, instead of
+    converting the fold again per trial.
+    """
+    import optuna
+    import xgboost as xgb
+
+    from feature_shards import booster_params, predict_proba, score
+
+    folds = []
+    for train_idx, test_idx in cv.split(shards):
+        # Purged splits are contiguous row ranges, so each fold is a pair of shard subsets
+        train = shards.subset(int(train_idx[0]), int(train_idx[-1]) + 1)
+        test = shards.subset(int(test_idx[0]), int(test_idx[-1]) + 1)
+        dtrain = train.quantile_dmatrix(max_bin=max_bin)
+        folds.append((dtrain, test.quantile_dmatrix(max_bin=max_bin, ref=dtrain), test.labels()))
+
+    def objective(trial):
+        params, rounds = booster_params(suggest_params(trial, 'xgboost'), shards.classes,
+                                        max_bin, model_n_jobs)
+        scores = []
+        for step, (dtrain, dtest, y_test) in enumerate(folds):
+            booster = xgb.train(params, dtrain, num_boost_round=rounds)
+            scores.append(score(scoring, y_test, predict_proba(booster, dtest), shards.classes))
+
+            trial.report(float(np.mean(scores)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        return float(np.mean(scores))
+
+    return objective
+
+
+def tune_model(X, y, model_type='xgboost', n_trials=30, scoring='accuracy',
+               n_splits=3, purge=4, embargo=0, n_jobs=1, storage=None, study_name=None,
+               warm_start=True, warm_n_trials=10, params_folder="models", timeout=None):
+    """
+    Tune a classifier with purged time-series CV and median pruning.
+
+    Args:
+        X, y: Features / labels in time order, or a `feature_shards.FeatureShards`
+            (with y=None) to tune XGBoost on memory-mapped shards
+        purge (int): Bars purged before each CV test block; the label horizon
+            (how many bars ahead the target looks)
+        n_jobs (int): Trials run in parallel threads within this process
+        storage (str | None): Optuna storage URL, e.g. 'sqlite:///models/optuna.db',
+            so several worker processes (see `tune_model_parallel`) share one study
+        study_name (str | None): Defaults to '<model_type>_<today>' so each daily
+            retrain starts a fresh study
+        warm_start (bool): Enqueue the previous run's best params as the first trial
+        warm_n_trials (int | None): Trial budget when a warm start was found; the search
+            only refines around an already good point, so it needs fewer trials than
+            a cold start (None keeps `n_trials`)
+
+    Returns:
+        (dict, float): Best params and best CV score
+    """
+    import optuna
+
+    print(f"[*] Starting Optuna tuning for {model_type.upper()}...")
+
+    study = optuna.create_study(
+        direction="maximize",
+        storage=storage,
+        study_name=study_name or (f"{model_type}_{date.today().isoformat()}" if storage else None),
+        load_if_exists=storage is not None,
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0),
+    )
+
+    if warm_start:
+        previous = load_best_params(model_type, params_folder)
+        if previous and not any(t.params == previous for t in study.trials):
+            study.enqueue_trial(previous)
+        if previous and warm_n_trials is not None and warm_n_trials < n_trials:
+            print(f"[*] Warm start found, running {warm_n_trials} trials instead of {n_trials}")
+            n_trials = warm_n_trials
+
+    cv = PurgedTimeSeriesSplit(n_splits=n_splits, purge=purge, embargo=embargo)
+    # With several trials in flight, keep each model single-threaded to avoid oversubscription
+    objective = make_objective(X, y, model_type, scoring, cv, model_n_jobs=1 if n_jobs != 1 else None)
+    study.optimize(objective, n_trials=n_trials, n_jobs=n_jobs, timeout=timeout)
+
+    save_best_params(model_type, study.best_params, params_folder)
     print(f"[✓] Best {model_type.upper()} params: {study.best_params}")
     return study.best_params, study.best_value
+
+
+def _tune_worker(args):
+    X, y, kwargs = args
+    tune_model(X, y, warm_start=False, **kwargs)
+
+
+def tune_model_parallel(X, y, model_type='xgboost', n_trials=30, n_workers=None,
+                        storage="sqlite:///models/optuna.db", warm_n_trials=10, **kwargs):
+    """
+    Run one study across several worker processes sharing a SQLite-backed
+    Optuna storage; trials are split evenly between workers. With a warm
+    start the budget is cut to `warm_n_trials`, as in `tune_model`.
+
+    Returns:
+        (dict, float): Best params and best CV score
+    """
+    import optuna
+    from concurrent.futures import ProcessPoolExecutor
+
+    n_workers = n_workers or os.cpu_count()
+    study_name = kwargs.pop('study_name', None) or f"{model_type}_{date.today().isoformat()}"
+    params_folder = kwargs.get('params_folder', "models")
+
+    # Create the study and enqueue the warm start once, before workers attach to it
+    study = optuna.create_study(direction="maximize", storage=storage,
+                                study_name=study_name, load_if_exists=True)
+    previous = load_best_params(model_type, params_folder)
+    if previous and not any(t.params == previous for t in study.trials):
+        study.enqueue_trial(previous)
+    if previous and warm_n_trials is not None:
+        n_trials = min(n_trials, warm_n_trials)
+
+    per_worker = [n_trials // n_workers + (i < n_trials % n_workers) for i in range(n_workers)]
+    jobs = [(X, y, dict(kwargs, model_type=model_type, n_trials=n, storage=storage,
+                        study_name=study_name))
+            for n in per_worker if n]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        list(pool.map(_tune_worker, jobs))
+
+    study = optuna.load_study(study_name=study_name, storage=storage)
+    save_best_params(model_type, study.best_params, params_folder)
+    print(f"[✓] Best {model_type.upper()} params ({n_workers} workers): {study.best_params}")
+    return study.best_params, study.best_value
@@ -0,0 +1,281 @@
+# src/pipeline.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+
+def files_fingerprint(*paths):
+    """
+    Fingerprint of files and folders (path, size, mtime of every file), for
+    `Stage(fingerprint=...)`. Missing paths are part of the fingerprint too.
+    """
+    entries = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    entries.append(os.path.join(root, name))
+        else:
+            entries.append(path)
+    parts = []
+    for path in sorted(entries):
+        try:
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{path}:missing")
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def result_version(result):
+    """
+    Content hash of a JSON-serializable stage result, so a stage that produced
+    the same result as last time doesn't invalidate its dependents. Other
+    results (e.g. DataFrames) get None and count as changed on every run.
+    """
+    try:
+        payload = json.dumps(result, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name (str): Unique stage name
+        func (callable): func(inputs) -> result, where `inputs` is {dep name: dep result};
+            with `fan_out`, func(item, inputs) is called once per item instead
+        deps (Iterable[str]): Stages that must finish first
+        fan_out (callable | None): inputs -> list of items (e.g. symbols) run in parallel;
+            the stage result is {item: result}
+        fingerprint (callable | None): inputs -> value describing the stage's external
+            inputs (e.g. `files_fingerprint`). The stage is skipped, reusing its last
+            result, when this and the versions of its deps' results (see
+            `result_version`) are unchanged. Stages without deps or a
+            fingerprint always run.
+    """
+
+    def __init__(self, name, func, deps=(), fan_out=None, fingerprint=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.fan_out = fan_out
+        self.fingerprint = fingerprint
+
+
+class Pipeline:
+    """
+    Runs a DAG of stages on a thread pool: each stage starts as soon as its
+    deps are done, and fan-out items run in parallel, so a cycle takes about
+    as long as its critical path.
+
+    Only one cycle runs at a time. A `run()` that arrives while a cycle is in
+    progress is coalesced into a single follow-up cycle instead of
+    overlapping it. Pipelines sharing a `lock` wait for each other's cycles
+    (e.g. so predicting never overlaps a retrain).
+
+    Every stage run is recorded (status, start, seconds, items) in `history`
+    and appended as JSON lines to `log_path`.
+    """
+
+    def __init__(self, stages, name='pipeline', max_workers=8, lock=None,
+                 log_path="logs/pipeline_runs.jsonl"):
+        self.name = name
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+        self.order = self._toposort()
+        self.max_workers = max_workers
+        self.lock = lock or threading.RLock()
+        self.log_path = log_path
+        self.history = []
+        self.cycles = 0
+        self._results = {}    # stage -> last result
+        self._versions = {}   # stage -> version of its last result
+        self._keys = {}       # stage -> skip key of its last successful run
+        self._running = False
+        self._pending = False
+        self._pending_lock = threading.Lock()
+
+    def _toposort(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown dependency '{name}' of {path[-1] if path else '?'}")
+            state[name] = 'visiting'
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def run(self):
+        """
+        Run one cycle, or coalesce into a follow-up cycle if one is already
+        running (returns None in that case).
+
+        Returns:
+            dict | None: {stage: record} for the cycle
+        """
+        with self._pending_lock:
+            if self._running:
+                self._pending = True
+                print(f"[*] {self.name}: cycle already running, coalescing this trigger")
+                return None
+            self._running = True
+        try:
+            while True:
+                with self._pending_lock:
+                    self._pending = False
+                with self.lock:
+                    records = self._run_cycle()
+                with self._pending_lock:
+                    if not self._pending:
+                        # Cleared under the same lock a new trigger checks, so none is lost
+                        self._running = False
+                        return records
+        except BaseException:
+            with self._pending_lock:
+                self._running = False
+            raise
+
+    def _skip_key(self, stage, inputs):
+        if stage.fingerprint is None and not stage.deps:
+            return None
+        own = stage.fingerprint(inputs) if stage.fingerprint is not None else None
+        return (own, tuple(self._versions.get(dep) for dep in stage.deps))
+
+    def _run_cycle(self):
+        self.cycles += 1
+        cycle = self.cycles
+        cycle_start = time.perf_counter()
+        records, done = {}, set()
+        remaining = list(self.order)
+        running = {}   # future -> (stage name, item or None)
+        fanned = {}    # stage name -> {'items', 'results', 'pending', 'start', 'key'}
+
+        def finish(name, status, start, result=None, key=None, error=None, items=None):
+            seconds = time.perf_counter() - start if start is not None else 0.0
+            if status == 'ok':
+                self._results[name] = result
+                self._versions[name] = result_version(result) or f"{cycle}:{name}"
+                self._keys[name] = key
+            records[name] = {
+                'pipeline': self.name, 'cycle': cycle, 'stage': name, 'status': status,
+                'start': (datetime.now() - timedelta(seconds=seconds)).isoformat(timespec='seconds'),
+                'seconds': round(seconds, 4),
+                'items': items, 'error': error,
+            }
+            done.add(name)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while remaining or running:
+                # Start every stage whose deps are all done
+                for name in list(remaining):
+                    stage = self.stages[name]
+                    if not all(dep in done for dep in stage.deps):
+                        continue
+                    remaining.remove(name)
+                    if any(records[dep]['status'] in ('failed', 'upstream_failed') for dep in stage.deps):
+                        finish(name, 'upstream_failed', None)
+                        continue
+
+                    start = time.perf_counter()
+                    inputs = {dep: self._results.get(dep) for dep in stage.deps}
+                    try:
+                        key = self._skip_key(stage, inputs)
+                        if key is not None and name in self._keys and self._keys[name] == key:
+                            finish(name, 'skipped', start)
+                            continue
+                        if stage.fan_out is None:
+                            running[pool.submit(stage.func, inputs)] = (name, None)
+                            fanned[name] = {'start': start, 'key': key}
+                            continue
+                        items = list(stage.fan_out(inputs))
+                    except Exception as e:
+                        print(f"[x] {self.name}.{name} failed: {e}")
+                        finish(name, 'failed', start, error=str(e))
+                        continue
+                    fanned[name] = {'start': start, 'key': key, 'items': items, 'results': {},
+                                    'pending': len(items), 'errors': {}}
+                    if not items:
+                        finish(name, 'ok', start, result={}, key=key, items=0)
+                    for item in items:
+                        running[pool.submit(stage.func, item, inputs)] = (name, item)
+
+                if not running:
+                    continue
+                completed, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in completed:
+                    name, item = running.pop(future)
+                    state = fanned[name]
+                    error = future.exception()
+                    if self.stages[name].fan_out is None:
+                        if error is not None:
+                            print(f"[x] {self.name}.{name} failed: {error}")
+                            finish(name, 'failed', state['start'], error=str(error))
+                        else:
+                            finish(name, 'ok', state['start'], result=future.result(), key=state['key'])
+                        continue
+
+                    # Fan-out: a failed item is recorded but doesn't fail the stage
+                    if error is not None:
+                        print(f"[x] {self.name}.{name}[{item}] failed: {error}")
+                        state['errors'][item] = str(error)
+                    else:
+                        state['results'][item] = future.result()
+                    state['pending'] -= 1
+                    if state['pending'] == 0:
+                        ok = bool(state['results']) or not state['errors']
+                        finish(name, 'ok' if ok else 'failed', state['start'],
+                               result=state['results'], key=state['key'], items=len(state['items']),
+                               error=json.dumps(state['errors']) if state['errors'] else None)
+
+        wall = time.perf_counter() - cycle_start
+        self._record(records, wall)
+        return records
+
+    def critical_path(self, records):
+        """Longest chain of stage durations through the DAG for a cycle, in seconds."""
+        finish = {}
+        for name in self.order:
+            deps = self.stages[name].deps
+            finish[name] = records[name]['seconds'] + max((finish[d] for d in deps), default=0.0)
+        return max(finish.values(), default=0.0)
+
+    def _record(self, records, wall):
+        self.history.extend(records.values())
+        statuses = {}
+        for r in records.values():
+            statuses[r['status']] = statuses.get(r['status'], 0) + 1
+        summary = ', '.join(f"{n} {s}" for s, n in sorted(statuses.items()))
+        print(f"[✓] {self.name} cycle {self.cycles}: {wall:.2f}s "
+              f"(critical path {self.critical_path(records):.2f}s; {summary})")
+        if self.log_path:
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                for r in records.values():
+                    f.write(json.dumps(dict(r, cycle_seconds=round(wall, 4))) + '\n')
+
+    def timings(self):
+        """Stage timing history as a DataFrame."""
+        import pandas as pd
+        return pd.DataFrame(self.history)
@@ -0,0 +1,205 @@
+# src/predictor.py
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Class index -> signal when the model has no metadata: Sell/Hold/Buy, or Sell/Buy for binary models.
+# Models trained here record their classes (the target values, in index order) in .meta.json.
+DEFAULT_CLASS_SIGNALS = {3: (-1, 0, 1), 2: (-1, 1)}
+SIGNAL_LABELS = {1: 'Buy', 0: 'Hold', -1: 'Sell'}
+
+
+def _meta_classes(model_path):
+    """Target value of each class index from the model's .meta.json, or None."""
+    from model import load_model_meta
+
+    base = model_path[:-len('.trees.npz')] if model_path.endswith('.trees.npz') else model_path
+    meta = load_model_meta(base)
+    return meta.get('classes') if meta else None
+
+
+def _load_booster(path):
+    """
+    Load a native booster: .json/.ubj -> XGBoost, .txt -> LightGBM,
+    .npz -> flattened trees (`tree_compiler.FlatTreeModel`).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npz':
+        from tree_compiler import FlatTreeModel
+        flat = FlatTreeModel.load(path)
+        return 'flat', flat, flat.feature_names
+    if ext in ('.json', '.ubj'):
+        import xgboost as xgb
+        booster = xgb.Booster()
+        booster.load_model(path)
+        booster.set_param({'nthread': 1})
+        return 'xgboost', booster, list(booster.feature_names or [])
+    if ext == '.txt':
+        import lightgbm as lgb
+        booster = lgb.Booster(model_file=path)
+        return 'lightgbm', booster, list(booster.feature_name())
+    raise ValueError(f"Unsupported native model format: {path}")
+
+
+class SignalPredictor:
+    """
+    In-process Buy/Hold/Sell scorer for the latest feature rows of many symbols.
+
+    Loads the booster from its native XGBoost (.json/.ubj) or LightGBM (.txt)
+    file, or an exported flat tree model (.npz), rather than a pickle, copies
+    each batch into a preallocated float32 matrix and scores it in one call.
+    The model file is watched and a newly written model is swapped in between
+    calls, so a retrain doesn't need a restart.
+    """
+
+    def __init__(self, model_path='models/xgb_model.json', max_batch=64, reload_interval=1.0,
+                 class_signals=None):
+        self.model_path = model_path
+        self.reload_interval = reload_interval
+        # Explicit mapping, else the model's recorded classes (re-read on every reload)
+        self._fixed_class_signals = class_signals
+        self.class_signals = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._mtime = None
+        self._buffer = None
+        self._max_batch = max_batch
+        self.reload()
+
+    def reload(self):
+        """(Re)load the model file; the new booster replaces the old one atomically."""
+        mtime = os.stat(self.model_path).st_mtime_ns
+        model_type, booster, features = _load_booster(self.model_path)
+        classes = self._fixed_class_signals or _meta_classes(self.model_path)
+        with self._lock:
+            self.model_type, self.booster, self.feature_columns = model_type, booster, features
+            self.class_signals = None if classes is None else np.asarray(classes)
+            self._buffer = np.empty((self._max_batch, len(features)), dtype=np.float32)
+            self._mtime = mtime
+            self.version += 1
+        print(f"[✓] Predictor loaded {self.model_path} (version {self.version})")
+
+    def maybe_reload(self):
+        """Reload if the model file changed; checked at most every `reload_interval` seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.model_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.reload()
+        except Exception as e:
+            # Keep serving the current model if the new file can't be read
+            print(f"[!] Model reload failed, keeping version {self.version}: {e}")
+            return False
+        return True
+
+    def _fill(self, features):
+        """Copy the feature rows into the preallocated matrix; returns (symbols, view)."""
+        if isinstance(features, pd.DataFrame):
+            symbols = list(features['symbol'] if 'symbol' in features else features.index)
+            values = features[self.feature_columns].to_numpy(dtype=np.float32)
+            rows = None
+        else:
+            if isinstance(features, dict):
+                features = [dict(row, symbol=symbol) for symbol, row in features.items()]
+            symbols = [row['symbol'] for row in features]
+            rows, values = features, None
+
+        n = len(symbols)
+        if n > len(self._buffer):
+            self._buffer = np.empty((n, len(self.feature_columns)), dtype=np.float32)
+        X = self._buffer[:n]
+        if values is not None:
+            X[:] = values
+        else:
+            for i, row in enumerate(rows):
+                for j, col in enumerate(self.feature_columns):
+                    X[i, j] = row.get(col, np.nan)
+        return symbols, X
+
+    def predict_proba(self, features):
+        """
+        Class probabilities for a batch of symbols.
+
+        Args:
+            features: DataFrame (one row per symbol, 'symbol' column or index),
+                list of feature dicts with a 'symbol' key, or {symbol: feature dict}
+
+        Returns:
+            (List[str], np.ndarray): Symbols and an (n, n_classes) probability array
+        """
+        self.maybe_reload()
+        with self._lock:
+            symbols, X = self._fill(features)
+            if self.model_type == 'xgboost':
+                proba = self.booster.inplace_predict(X)
+            elif self.model_type == 'flat':
+                proba = self.booster.predict_proba(X)
+            else:
+                proba = self.booster.predict(X, num_threads=1)
+        proba = np.asarray(proba).reshape(len(symbols), -1)
+        if proba.shape[1] == 1:
+            # Binary boosters return P(class 1) only
+            proba = np.column_stack([1 - proba[:, 0], proba[:, 0]])
+        return symbols, proba
+
+    def predict(self, features):
+        """
+        Signals for a batch of symbols.
+
+        Returns:
+            pd.DataFrame: symbol, signal (-1/0/1), label (Buy/Hold/Sell), confidence
+        """
+        symbols, proba = self.predict_proba(features)
+        classes = proba.argmax(axis=1)
+        class_signals = self.class_signals
+        if class_signals is None:
+            class_signals = np.asarray(DEFAULT_CLASS_SIGNALS[proba.shape[1]])
+        if len(class_signals) != proba.shape[1]:
+            raise ValueError(f"Model has {proba.shape[1]} classes but {len(class_signals)} class signals")
+        signals = class_signals[classes]
+        return pd.DataFrame({
+            'symbol': symbols,
+            'signal': signals,
+            'label': [SIGNAL_LABELS.get(int(s), str(s)) for s in signals],
+            'confidence': proba[np.arange(len(symbols)), classes],
+        })
+
+
+def benchmark_predictor(predictor, features, n_ticks=1000, warmup=20):
+    """
+    Time `predictor.predict` on the whole universe per tick.
+
+    Returns:
+        dict: n_symbols, n_ticks and p50/p90/p99/max latency in milliseconds
+    """
+    for _ in range(warmup):
+        predictor.predict(features)
+    latencies = np.empty(n_ticks)
+    for i in range(n_ticks):
+        start = time.perf_counter()
+        predictor.predict(features)
+        latencies[i] = time.perf_counter() - start
+    latencies *= 1000
+    report = {
+        'n_symbols': len(features),
+        'n_ticks': n_ticks,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+    }
+    print(f"[✓] {report['n_symbols']} symbols/tick: p50 {report['p50_ms']:.3f} ms, "
+          f"p99 {report['p99_ms']:.3f} ms, max {report['max_ms']:.3f} ms")
+    return report
@@ -2,53 +2,211 @@
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
+import hashlib
+import os
+import threading
 import time
-from data_loader import fetch_data_from_ccxt
-from model import train_model
-from ai_intelligence import get_crypto_news
-from alerts import send_telegram_message, generate_pdf_report, send_telegram_file
+
+import pandas as pd
+
+from data_loader import get_top_10_symbols_vs_usdt, sync_ohlcv, fetch_google_trends
+from dataset_schema import (apply_master_schema, epoch_ms_to_datetime, load_master_dataset,
+                            save_master_dataset)
+from feature_cache import cached_merge_all_data, cached_technical_indicators
+from feature_engineering import add_target_labels
+from news_ingest import get_news_ingestor
+from model import native_model_path
+from pipeline import Pipeline, Stage, files_fingerprint
+from alerts import (send_telegram_message, generate_pdf_report, send_telegram_file,
+                    send_signal_alert)
+
+OHLCV_DIR = "data/raw/ohlcv/"
+TRENDS_PATH = "data/processed/google_trends.csv"
+SENTIMENT_PATH = "data/processed/news_with_sentiment.csv"
+MASTER_PATH = "data/processed/master_dataset.parquet"
+FEATURES_PATH = "data/processed/features.parquet"
+MODEL_PATH = "models/xgb_model.pkl"
+TRAINING_DATA_PATH = "data/processed/training_data.parquet"
+LABEL_HORIZON = 4        # Bars ahead the Buy/Sell/Hold target looks
+LABEL_THRESHOLD = 0.01   # Forward return beyond +/-1% is Buy/Sell, else Hold
 
 # Initialize scheduler
 scheduler = BackgroundScheduler()
 
-# 1. Job: Fetch Data (OHLCV + News)
-def fetch_data():
-    print("[*] Fetching data...")
-    fetch_data_from_ccxt()  # Assuming data_loader.py has this function
-    news_data = get_crypto_news("crypto")
-    print(f"[✓] Data fetched at {datetime.now()}")
+# Retraining and the signal pipeline share this lock so they never overlap
+model_lock = threading.RLock()
+
+
+# 1. Signal pipeline stages: symbols -> (ohlcv per symbol, news, trends) -> merge -> features -> predict -> (alert, explain)
+def get_symbols(inputs):
+    return get_top_10_symbols_vs_usdt()
+
+def fetch_symbol_ohlcv(symbol, inputs):
+    return sync_ohlcv(symbol, folder=OHLCV_DIR)  # Only pulls candles newer than what is on disk
+
+def fetch_news(inputs):
+    ingestor = get_news_ingestor()
+    new_articles = ingestor.ingest(inputs['symbols'])  # Only unseen articles are scored
+    if len(new_articles) or not os.path.exists(SENTIMENT_PATH):
+        ingestor.index.load().to_csv(SENTIMENT_PATH, index=False)
+    return len(new_articles)
+
+def fetch_trends(inputs):
+    trends = fetch_google_trends(inputs['symbols'])
+    trends.to_csv(TRENDS_PATH, index=False)
+    # Content hash: an unchanged (cached) response doesn't trigger a re-merge
+    return hashlib.sha1(pd.util.hash_pandas_object(trends, index=False).values.tobytes()).hexdigest()
+
+def merge_data(inputs):
+    master = cached_merge_all_data(OHLCV_DIR, TRENDS_PATH, SENTIMENT_PATH)  # Reused across restarts
+    # Compact, validated layout (epoch-ms timestamps, categorical symbols, float32 values)
+    save_master_dataset(apply_master_schema(master, report=False), MASTER_PATH)
+    return {'rows': len(master), 'last': int(master['timestamp'].max())}
+
+def build_features(inputs):
+    master = load_master_dataset(MASTER_PATH, report=False)
+    # Trend/news gaps stay NaN (the boosters handle missing values) instead of
+    # making the indicator step drop those bars
+    context = ['symbol', 'timestamp', 'trend_score', 'sentiment_avg']
+    features = cached_technical_indicators(master.drop(columns=context[2:]))
+    features = features.merge(master[context], on=['symbol', 'timestamp'], how='left')
+    save_master_dataset(apply_master_schema(features, report=False), FEATURES_PATH)
+    return {'rows': len(features), 'last': int(features['timestamp'].max())}
+
+def latest_features():
+    """Last feature row per symbol, with datetime timestamps for the signal store."""
+    features = load_master_dataset(FEATURES_PATH, report=False)
+    latest = features.sort_values('timestamp').groupby('symbol', sort=False, observed=True).tail(1)
+    return latest.assign(timestamp=epoch_ms_to_datetime(latest['timestamp'])).reset_index(drop=True)
+
+_predictor = None
+
+def get_predictor():
+    """Shared predictor; it hot-reloads the native model written by each retrain."""
+    global _predictor
+    if _predictor is None:
+        from predictor import SignalPredictor
+        _predictor = SignalPredictor(native_model_path(MODEL_PATH, 'xgboost'))
+    return _predictor
+
+def predict_signals(inputs):
+    from signal_store import get_signal_store
+
+    if not os.path.exists(native_model_path(MODEL_PATH, 'xgboost')):
+        print("[!] No trained model yet, skipping predictions until the first retrain")
+        return []
+    latest = latest_features()
+    predictions = get_predictor().predict(latest)
+    predictions['timestamp'] = latest['timestamp'].to_numpy()
+    context = latest.reindex(columns=['sentiment_avg', 'trend_score'])
+    predictions['sentiment'] = context['sentiment_avg'].to_numpy()
+    predictions['trend'] = context['trend_score'].to_numpy()
+    predictions['price'] = latest['close'].to_numpy()
+    get_signal_store().write(predictions)
+    return [{'symbol': r.symbol, 'signal': int(r.signal), 'confidence': float(r.confidence),
+             'price': float(r.price), 'timestamp': str(r.timestamp)}
+            for r in predictions.itertuples()]
+
+def alert_signals(inputs):
+    sent = 0
+    for p in inputs['predict']:
+        if p['signal'] != 0:  # Buy/Sell only; the dispatcher batches them into a digest
+            send_signal_alert(p['symbol'], p['signal'], confidence=p['confidence'], price=p['price'])
+            sent += 1
+    return sent
+
+def explain_signals(inputs):
+    from explanation_service import get_explanation_service
+
+    # SHAP values for the new predictions only, stored next to them for the dashboard and reports
+    predicted = pd.DataFrame(inputs['predict'], columns=['symbol', 'timestamp'])
+    if predicted.empty:
+        return 0
+    latest = latest_features()
+    latest = latest[latest['symbol'].isin(predicted['symbol'])]
+    return get_explanation_service().explain_new(latest)
+
+signal_pipeline = Pipeline([
+    Stage('symbols', get_symbols),
+    Stage('ohlcv', fetch_symbol_ohlcv, deps=['symbols'], fan_out=lambda inputs: inputs['symbols']),
+    Stage('news', fetch_news, deps=['symbols']),
+    Stage('trends', fetch_trends, deps=['symbols']),
+    Stage('merge', merge_data, deps=['ohlcv', 'news', 'trends']),
+    Stage('features', build_features, deps=['merge']),
+    Stage('predict', predict_signals, deps=['features'],
+          fingerprint=lambda inputs: files_fingerprint(native_model_path(MODEL_PATH, 'xgboost'))),
+    Stage('alert', alert_signals, deps=['predict']),
+    Stage('explain', explain_signals, deps=['predict']),
+], name='signals', lock=model_lock)
+
+
+# 2. Retrain pipeline: labels -> train, each skipped when its input hasn't changed
+def build_training_data(inputs):
+    if not os.path.exists(FEATURES_PATH):
+        raise FileNotFoundError(f"{FEATURES_PATH} not found; run the signal pipeline first")
+    features = load_master_dataset(FEATURES_PATH, report=False)
+    # Bars whose forward return is already known, labelled from the same feature columns the predictor uses
+    labelled = add_target_labels(features, horizon=LABEL_HORIZON, threshold=LABEL_THRESHOLD)
+    # Time order (symbols interleaved per bar), so the file streams straight into feature shards
+    labelled = labelled.sort_values(['timestamp', 'symbol'], kind='stable', ignore_index=True)
+    save_master_dataset(labelled, TRAINING_DATA_PATH)
+    return {'rows': len(labelled), 'last': int(labelled['timestamp'].max())}
+
+def retrain(inputs):
+    from model import train_model, load_model_meta
+
+    train_model(TRAINING_DATA_PATH, model_path=MODEL_PATH)  # Incremental when possible
+    return (load_model_meta(MODEL_PATH) or {}).get('trained_until')
+
+retrain_pipeline = Pipeline([
+    Stage('labels', build_training_data, fingerprint=lambda inputs: files_fingerprint(FEATURES_PATH)),
+    Stage('train', retrain, deps=['labels'], fingerprint=lambda inputs: files_fingerprint(TRAINING_DATA_PATH)),
+], name='retrain', lock=model_lock)
+
+def run_signal_pipeline():
+    print("[*] Running signal pipeline...")
+    signal_pipeline.run()
+    if not os.path.exists(native_model_path(MODEL_PATH, 'xgboost')) and os.path.exists(FEATURES_PATH):
+        retrain_model()  # First model as soon as there are features; the daily job takes over after that
 
-# 2. Job: Train ML Model (for model retraining)
 def retrain_model():
     print("[*] Retraining model...")
-    train_model()  # Assuming model.py has this function
-    print(f"[✓] Model retrained at {datetime.now()}")
+    retrain_pipeline.run()
+    print(f"[✓] Model retrain checked at {datetime.now()}")
+
 
-# 3. Job: Send Alerts (e.g., signals)
+# 3. Job: Send daily report with the latest stored signals
 def send_daily_alerts():
+    from signal_store import get_signal_store
+
     print("[*] Generating daily alert and report...")
-    # Generate signals
-    signals = {
-        "BTC": "Buy",
-        "ETH": "Hold",
-        "SOL": "Sell"
-    }
+    store = get_signal_store()
+    latest = store.load().groupby('symbol').tail(1)
+    signals = dict(zip(latest['symbol'], latest['label']))
+    # Stored SHAP explanations of those signals ("why"), no recomputation
+    explanations = {}
+    if len(latest):
+        latest_at = {symbol: ts.isoformat() for symbol, ts in zip(latest['symbol'], latest['timestamp'])}
+        for row in store.query_explanations(start=latest['timestamp'].min(), limit=None, top=3):
+            if latest_at.get(row['symbol']) == row['timestamp']:
+                explanations[row['symbol']] = row['contributions']
     # Generate summary using AI
     summary = "Today's market shows moderate bullish sentiment."
-    
+
     # Generate PDF report
-    report_path = generate_pdf_report(signals, summary)
-    
+    report_path = generate_pdf_report(signals, summary, explanations=explanations)
+
     # Send alerts
     send_telegram_message("📈 Daily Crypto Signals Ready!")
     send_telegram_file(report_path, caption="📊 Full Report")
-    print(f"[✓] Alerts sent at {datetime.now()}")
+    print(f"[✓] Alerts queued at {datetime.now()}")
 
-# 4. Job: Periodic Tasks (every 1 hour, for example)
+# 4. Job: Periodic Tasks; overlapping triggers are coalesced instead of stacking up
 def schedule_periodic_tasks():
-    scheduler.add_job(fetch_data, 'interval', hours=1)
-    scheduler.add_job(retrain_model, 'interval', days=1)  # Retrain model every 1 day
-    scheduler.add_job(send_daily_alerts, 'interval', hours=24)  # Send alerts every 24 hours
+    guards = {'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 300}
+    scheduler.add_job(run_signal_pipeline, 'interval', hours=1, id='signals', **guards)
+    scheduler.add_job(retrain_model, 'interval', days=1, id='retrain', **guards)  # Retrain model every 1 day
+    scheduler.add_job(send_daily_alerts, 'interval', hours=24, id='daily_report', **guards)
 
 # 5. Start Scheduler
 def start_scheduler():
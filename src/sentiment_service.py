@@ -0,0 +1,142 @@
+# src/sentiment_service.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+_worker_analyzer = None
+
+
+def _score_chunk(texts):
+    """Process-pool worker: score a chunk of texts with a per-process analyzer."""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _worker_analyzer = SentimentIntensityAnalyzer()
+    return [_worker_analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+def text_key(text):
+    """Content hash used as the cache key."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SentimentService:
+    """
+    VADER compound scoring with a persistent, content-hash-keyed cache.
+
+    Texts are deduplicated within each batch and looked up in the SQLite
+    cache before scoring, so a headline is only ever scored once. Large
+    backlogs of unseen texts are scored across a process pool. Recently used
+    scores are also kept in memory, in an LRU of at most `memory_size` entries.
+    """
+
+    def __init__(self, cache_path="data/cache/sentiment_cache.sqlite",
+                 processes=None, pool_threshold=2000, chunk_size=500, memory_size=100_000):
+        self.cache_path = cache_path
+        self.processes = processes
+        self.pool_threshold = pool_threshold
+        self.chunk_size = chunk_size
+        self._analyzer = None
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, compound REAL)")
+            self._conn.commit()
+        else:
+            self._conn = None
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            self._analyzer = SentimentIntensityAnalyzer()
+        return self._analyzer
+
+    def _remember(self, scores):
+        for key, compound in scores.items():
+            self._memory[key] = compound
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys):
+        found = {}
+        for k in keys:
+            if k in self._memory:
+                self._memory.move_to_end(k)
+                found[k] = self._memory[k]
+        missing = [k for k in keys if k not in found]
+        if self._conn is not None and missing:
+            # SQLite caps bound parameters per statement, so query in slices
+            for i in range(0, len(missing), 900):
+                part = missing[i:i + 900]
+                rows = self._conn.execute(
+                    f"SELECT key, compound FROM sentiment WHERE key IN ({','.join('?' * len(part))})",
+                    part).fetchall()
+                found.update(rows)
+        self._remember(found)
+        return found
+
+    def _store(self, scores):
+        self._remember(scores)
+        if self._conn is not None and scores:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sentiment (key, compound) VALUES (?, ?)", scores.items())
+            self._conn.commit()
+
+    def _score_uncached(self, texts):
+        if len(texts) < self.pool_threshold:
+            return [self.analyzer.polarity_scores(text)['compound'] for text in texts]
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        print(f"[*] Scoring {len(texts)} new texts across a process pool...")
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            return [score for chunk in pool.map(_score_chunk, chunks) for score in chunk]
+
+    def score_many(self, texts):
+        """
+        Score a batch of texts. Missing values (None/NaN) score 0.0.
+
+        Returns:
+            List[float]: Compound scores in input order
+        """
+        texts = [None if text is None or pd.isna(text) else str(text) for text in texts]
+        unique = {}
+        for text in texts:
+            if text is not None and text not in unique:
+                unique[text] = text_key(text)
+
+        with self._lock:
+            cached = self._lookup(list(set(unique.values())))
+            to_score = [text for text, key in unique.items() if key not in cached]
+            if to_score:
+                new_scores = dict(zip((unique[t] for t in to_score), self._score_uncached(to_score)))
+                self._store(new_scores)
+                cached.update(new_scores)
+
+        return [0.0 if text is None else cached[unique[text]] for text in texts]
+
+    def score(self, text):
+        """Score a single text from -1 (negative) to +1 (positive)."""
+        return self.score_many([text])[0]
+
+
+_service = None
+
+
+def get_sentiment_service():
+    """Shared process-wide SentimentService (created on first use)."""
+    global _service
+    if _service is None:
+        _service = SentimentService()
+    return _service
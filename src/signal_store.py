@@ -0,0 +1,246 @@
+# src/signal_store.py
+
+import json
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+SIGNAL_COLUMNS = ['timestamp', 'symbol', 'signal', 'label', 'confidence', 'sentiment', 'trend']
+SIGNAL_LABELS = {1: 'Buy', 0: 'Hold', -1: 'Sell'}
+EXPLANATION_COLUMNS = ['timestamp', 'symbol', 'model_version', 'class_index', 'base_value', 'contributions']
+
+
+def _to_epoch_ms(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return int(ts.value // 1_000_000)
+
+
+def _where(symbol=None, start=None, end=None):
+    """SQL conditions and parameters for the symbol / time range filters."""
+    where, params = [], []
+    if symbol:
+        where.append("symbol = ?")
+        params.append(symbol)
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(_to_epoch_ms(start))
+    if end is not None:
+        where.append("timestamp <= ?")
+        params.append(_to_epoch_ms(end))
+    return where, params
+
+
+class SignalStore:
+    """
+    SQLite store of trading signals, one row per (symbol, timestamp), written
+    by the pipeline and read by the dashboard.
+
+    Every write bumps a store-wide version and stamps the written rows with it,
+    so readers can cache anything derived from the store per version and fetch
+    only the rows changed since a version they have already seen.
+
+    SHAP explanations of the signals (see `explanation_service`) live in a
+    second table with the same key and their own version counter.
+    """
+
+    def __init__(self, path="data/signals.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS signals (timestamp INTEGER NOT NULL, symbol TEXT NOT NULL, "
+                "signal INTEGER, label TEXT, confidence REAL, sentiment REAL, trend REAL, "
+                "version INTEGER NOT NULL, PRIMARY KEY (symbol, timestamp))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS signals_timestamp ON signals (timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS signals_version ON signals (version)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER)")
+            self._conn.execute("INSERT OR IGNORE INTO store_meta VALUES ('version', 0)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations (timestamp INTEGER NOT NULL, symbol TEXT NOT NULL, "
+                "model_version TEXT, class_index INTEGER, base_value REAL, contributions TEXT, "
+                "version INTEGER NOT NULL, PRIMARY KEY (symbol, timestamp))")
+            self._conn.execute("INSERT OR IGNORE INTO store_meta VALUES ('explanations_version', 0)")
+            self._conn.commit()
+
+    def version(self):
+        """Current store version; changes whenever signals are written."""
+        with self._lock:
+            return self._conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+
+    def write(self, df):
+        """
+        Insert or update signals.
+
+        Args:
+            df (pd.DataFrame): 'timestamp', 'symbol', 'signal' and optionally
+                'label', 'confidence', 'sentiment', 'trend'
+
+        Returns:
+            int: The new store version (unchanged if `df` is empty)
+        """
+        if df.empty:
+            return self.version()
+        df = df.reindex(columns=SIGNAL_COLUMNS)
+        labels = df['label'].where(df['label'].notna(), df['signal'].map(SIGNAL_LABELS))
+        rows = [
+            (_to_epoch_ms(ts), symbol, int(signal), label,
+             *(None if pd.isna(v) else float(v) for v in (confidence, sentiment, trend)))
+            for ts, symbol, signal, label, confidence, sentiment, trend in zip(
+                df['timestamp'], df['symbol'], df['signal'], labels,
+                df['confidence'], df['sentiment'], df['trend'])
+        ]
+        with self._lock:
+            self._conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+            version = self._conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row + (version,) for row in rows])
+            self._conn.commit()
+        return version
+
+    def query(self, symbol=None, start=None, end=None, limit=100, offset=0, since_version=None):
+        """
+        Signals ordered by timestamp then symbol.
+
+        Args:
+            symbol (str | None): Only this symbol
+            start, end: Inclusive time range (anything `pd.Timestamp` accepts)
+            limit (int | None), offset (int): Pagination
+            since_version (int | None): Only rows written after this store version
+
+        Returns:
+            List[dict]: Rows with an ISO 'timestamp' and the row's 'version'
+        """
+        where, params = _where(symbol, start, end)
+        if since_version is not None:
+            where.append("version > ?")
+            params.append(int(since_version))
+
+        sql = f"SELECT {', '.join(SIGNAL_COLUMNS)}, version FROM signals"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp, symbol"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        for row in rows:
+            row['timestamp'] = pd.Timestamp(row['timestamp'], unit='ms').isoformat()
+        return rows
+
+    def load(self, **query):
+        """`query` results as a DataFrame with a datetime 'timestamp' (no limit by default)."""
+        query.setdefault('limit', None)
+        df = pd.DataFrame(self.query(**query), columns=SIGNAL_COLUMNS + ['version'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+
+    # Explanations
+
+    def explanations_version(self):
+        """Version of the explanations table; changes whenever explanations are written."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'explanations_version'").fetchone()[0]
+
+    def unexplained(self, keys, model_version):
+        """
+        Which (symbol, timestamp) keys have no explanation from `model_version` yet.
+
+        Returns:
+            List[bool]: One flag per key, True where an explanation is missing
+        """
+        keys = [(symbol, _to_epoch_ms(ts)) for symbol, ts in keys]
+        if not keys:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT symbol, timestamp FROM explanations WHERE model_version = ? AND timestamp >= ?",
+                (model_version, min(ts for _, ts in keys))).fetchall()
+        done = set(rows)
+        return [key not in done for key in keys]
+
+    def write_explanations(self, df):
+        """
+        Insert or replace explanations.
+
+        Args:
+            df (pd.DataFrame): EXPLANATION_COLUMNS, with 'contributions' as {feature: value} dicts
+
+        Returns:
+            int: The new explanations version
+        """
+        if df.empty:
+            return self.explanations_version()
+        rows = [
+            (_to_epoch_ms(ts), symbol, model_version, int(class_index), float(base_value),
+             json.dumps(contributions, separators=(',', ':')))
+            for ts, symbol, model_version, class_index, base_value, contributions in zip(
+                *(df[c] for c in EXPLANATION_COLUMNS))
+        ]
+        with self._lock:
+            self._conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'explanations_version'")
+            version = self._conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'explanations_version'").fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   [row + (version,) for row in rows])
+            self._conn.commit()
+        return version
+
+    def query_explanations(self, symbol=None, start=None, end=None, limit=100, offset=0, top=None):
+        """
+        Explanations ordered by timestamp then symbol, filtered like `query`.
+
+        Args:
+            top (int | None): Keep only the `top` largest contributions (by
+                absolute value) of each row, largest first
+
+        Returns:
+            List[dict]: Rows with an ISO 'timestamp' and 'contributions' as {feature: value}
+        """
+        where, params = _where(symbol, start, end)
+
+        sql = f"SELECT {', '.join(EXPLANATION_COLUMNS)} FROM explanations"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp, symbol"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            rows = [dict(zip(EXPLANATION_COLUMNS, row)) for row in cursor.fetchall()]
+        for row in rows:
+            row['timestamp'] = pd.Timestamp(row['timestamp'], unit='ms').isoformat()
+            contributions = json.loads(row['contributions'])
+            if top is not None:
+                contributions = dict(sorted(contributions.items(), key=lambda kv: -abs(kv[1]))[:top])
+            row['contributions'] = contributions
+        return rows
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]
+
+
+_store = None
+
+
+def get_signal_store():
+    """Shared SignalStore at the default path (created on first use)."""
+    global _store
+    if _store is None:
+        _store = SignalStore()
+    return _store
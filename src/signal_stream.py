@@ -0,0 +1,236 @@
+# src/signal_stream.py
+
+import json
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from signal_store import get_signal_store
+
+
+def format_sse(data, event=None, event_id=None):
+    """One Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+def _encode(rows):
+    return json.dumps(rows, separators=(',', ':'))
+
+
+class Subscription:
+    """
+    One client's bounded queue of (version, rows, payload) updates.
+
+    When the queue is full the subscription is closed instead of growing; the
+    client reconnects with its last event id and catches up from the store.
+    """
+
+    def __init__(self, broadcaster, symbol=None, maxsize=100):
+        self.broadcaster = broadcaster
+        self.symbol = symbol
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+        self.closed = False
+
+    def put(self, update):
+        try:
+            self.queue.put_nowait(update)
+        except queue.Full:
+            self.overflowed = True
+            self.close()
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broadcaster.unsubscribe(self)
+
+
+class SignalBroadcaster:
+    """
+    Fans out new or changed signal rows from the SignalStore to subscribers.
+
+    A single watcher thread polls the store version (one small query per
+    `poll_interval` for all clients together) and reads only the rows written
+    since the last version it saw. Writers in the same process can call
+    `notify()` to push immediately.
+    """
+
+    def __init__(self, store=None, poll_interval=1.0, queue_size=100):
+        # `is None`, not `or`: an empty SignalStore has len() 0 and is falsy
+        self.store = store if store is not None else get_signal_store()
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.version = self.store.version()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='signal-broadcaster', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def notify(self):
+        """Check the store now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[!] Signal broadcaster poll failed: {e}")
+
+    def poll(self):
+        """Publish rows written since the last seen version; returns the number of rows."""
+        version = self.store.version()
+        if version == self.version:
+            return 0
+        rows = self.store.query(since_version=self.version, limit=None)
+        self.version = version
+        self.publish(version, rows)
+        return len(rows)
+
+    def publish(self, version, rows):
+        """Send rows at `version` to every subscriber (filtered per symbol)."""
+        payload = _encode(rows)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if sub.symbol is None:
+                sub.put((version, rows, payload))
+            else:
+                mine = [r for r in rows if r['symbol'] == sub.symbol]
+                if mine:
+                    sub.put((version, mine, _encode(mine)))
+
+    def subscribe(self, symbol=None):
+        sub = Subscription(self, symbol=symbol, maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, cursor=None, symbol=None, heartbeat=15.0):
+        """
+        Generator of SSE messages for one client.
+
+        Sends the rows written after `cursor` (a previous event id, i.e. a store
+        version) first, then live updates; the event id of each message is the
+        version to resume from. Ends after a 'resync' event if the client fell
+        too far behind.
+        """
+        sub = self.subscribe(symbol)
+        try:
+            # Subscribe before reading the backlog so nothing is missed in between
+            seen = self.store.version()
+            if cursor is not None:
+                backlog = self.store.query(symbol=symbol, since_version=cursor, limit=None)
+                if backlog:
+                    yield format_sse(_encode(backlog), event='signals', event_id=seen)
+            else:
+                yield format_sse('[]', event='signals', event_id=seen)
+
+            while True:
+                try:
+                    version, rows, payload = sub.get(timeout=heartbeat)
+                except queue.Empty:
+                    if sub.overflowed:
+                        yield format_sse(json.dumps({'cursor': seen}), event='resync', event_id=seen)
+                        return
+                    yield ': keep-alive\n\n'
+                    continue
+                # An update can overlap rows already sent (e.g. in the backlog); drop those
+                fresh = [r for r in rows if r['version'] > seen]
+                if not fresh:
+                    continue
+                if len(fresh) < len(rows):
+                    payload = _encode(fresh)
+                seen = version
+                yield format_sse(payload, event='signals', event_id=version)
+        finally:
+            sub.close()
+
+
+class InProcessPublisher:
+    """
+    Writes signals to the store and notifies the broadcaster at once; with
+    `start_demo` it generates random signals for local testing of the stream.
+    """
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.store = broadcaster.store
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self, df):
+        version = self.store.write(df)
+        self.broadcaster.notify()
+        return version
+
+    def start_demo(self, symbols=('BTC/USDT', 'ETH/USDT', 'SOL/USDT'), interval=2.0, seed=None):
+        rng = np.random.default_rng(seed)
+
+        def run():
+            while not self._stop.wait(interval):
+                now = pd.Timestamp.now('UTC').floor('s').tz_localize(None)
+                self.publish(pd.DataFrame({
+                    'timestamp': now,
+                    'symbol': list(symbols),
+                    'signal': rng.integers(-1, 2, len(symbols)),
+                    'confidence': rng.uniform(0.34, 1.0, len(symbols)),
+                    'sentiment': rng.uniform(-1, 1, len(symbols)),
+                    'trend': rng.integers(0, 101, len(symbols)),
+                }))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='demo-publisher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_broadcaster = None
+
+
+def get_broadcaster():
+    """Shared SignalBroadcaster over the shared store, started on first use."""
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = SignalBroadcaster().start()
+    return _broadcaster
@@ -0,0 +1,384 @@
+# src/tree_compiler.py
+
+import json
+import os
+import time
+
+import numpy as np
+
+# xgboost and lightgbm are only needed to export a model, not to score with it
+
+ZERO_THRESHOLD = 1e-35  # LightGBM's "is zero" test for missing_type=Zero
+
+
+class FlatTreeModel:
+    """
+    A boosted tree ensemble flattened into NumPy arrays of nodes, scored by
+    walking every tree of every row at once, one tree level per step.
+
+    Scoring doesn't go through the XGBoost/LightGBM libraries at all, which
+    takes their per-call setup (DMatrix/config/thread pool) out of tiny
+    per-tick batches. Split thresholds are compared with the booster's own
+    operator and leaf values are summed tree by tree in its precision
+    (float32 for XGBoost, float64 for LightGBM), so every row reaches the
+    same leaves and the class predictions are identical to the booster's.
+    Margins agree to within float rounding: XGBoost stores the base score as
+    a probability and its logit is recomputed here, which can differ by
+    ~1e-6 (see `check_exact`).
+
+    Build one with `from_model` (XGBoost or LightGBM, sklearn wrapper or
+    booster), save it with `save` and load it with `FlatTreeModel.load`.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, nan_left, zero_default,
+                 value, roots, n_classes, base_margin, objective, max_depth, feature_names,
+                 inclusive, sigmoid=1.0):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.nan_left = np.asarray(nan_left, dtype=bool)
+        self.zero_default = np.asarray(zero_default, dtype=bool)
+        self.value = np.asarray(value)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.n_classes = int(n_classes)
+        self.base_margin = np.asarray(base_margin, dtype=self.value.dtype)
+        self.objective = objective
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names)
+        self.inclusive = bool(inclusive)
+        self.sigmoid = float(sigmoid)
+        self._has_zero = bool(self.zero_default.any())
+        self._compile()
+        # Trees come in rounds of one tree per class output
+        self._outputs = 1 if self.n_classes <= 2 else self.n_classes
+        if len(self.roots) % self._outputs:
+            raise ValueError("Tree count is not a multiple of the number of classes")
+
+    def _compile(self):
+        """
+        Turn each split into a single `value < threshold` test on the feature or
+        its negation, so missing values (NaN compares False) land on the
+        node's missing-value branch without a separate check:
+
+        - missing goes right: left if x < t (x <= t becomes x < nextafter(t, inf))
+        - missing goes left: right if -x < -t', where t' = t for `<=` splits
+          and nextafter(t, -inf) for `<` splits (i.e. right if x >= t)
+        """
+        dtype = self.value.dtype.type
+        threshold = self.threshold.astype(dtype)
+        n_features = len(self.feature_names)
+        flip = self.nan_left
+        if self.inclusive:
+            right_test = np.nextafter(threshold, dtype(np.inf))
+            left_test = -threshold
+        else:
+            right_test = threshold
+            left_test = -np.nextafter(threshold, dtype(-np.inf))
+        self._test_feature = np.where(flip, self.feature + n_features, self.feature).astype(np.intp)
+        self._test_threshold = np.where(flip, left_test, right_test).astype(dtype)
+        # children[2 * node + test]: test False -> first, True -> second
+        children = np.empty(2 * len(self.feature), dtype=np.intp)
+        children[0::2] = np.where(flip, self.left, self.right)
+        children[1::2] = np.where(flip, self.right, self.left)
+        self._children = children
+        self._roots = self.roots.astype(np.intp)
+
+    # Export
+
+    @classmethod
+    def from_model(cls, model):
+        """Flatten an XGBoost or LightGBM classifier (sklearn wrapper or booster)."""
+        if hasattr(model, 'get_booster'):
+            model = model.get_booster()
+        elif hasattr(model, 'booster_'):
+            model = model.booster_
+        module = type(model).__module__
+        if module.startswith('xgboost'):
+            return cls._from_xgboost(model)
+        if module.startswith('lightgbm'):
+            return cls._from_lightgbm(model)
+        raise ValueError(f"Unsupported model type: {type(model)}")
+
+    @classmethod
+    def _from_xgboost(cls, booster):
+        learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+        gbm = learner['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"Only gbtree boosters can be flattened, not {gbm['name']}")
+        objective = learner['objective']['name']
+        if objective not in ('multi:softprob', 'binary:logistic'):
+            raise ValueError(f"Unsupported objective: {objective}")
+        params = learner['learner_model_param']
+        n_classes = max(int(params['num_class']), 2)
+        base = np.array(json.loads(params['base_score']), dtype=np.float32).reshape(-1)
+        if objective == 'binary:logistic':
+            # Stored as a probability; the trees add to its logit
+            base = -np.log(np.float32(1) / base - np.float32(1))
+
+        trees = gbm['model']['trees']
+        info = gbm['model']['tree_info']
+        outputs = 1 if n_classes <= 2 else n_classes
+        if list(info) != [i % outputs for i in range(len(info))]:
+            raise ValueError("Trees are not in one-tree-per-class rounds")
+
+        nodes = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'default_left', 'value')}
+        roots, max_depth = [], 0
+        for tree in trees:
+            if int(tree['tree_param'].get('size_leaf_vector', '1')) > 1 or any(tree['split_type']):
+                raise ValueError("Vector-leaf and categorical trees are not supported")
+            offset = len(nodes['feature'])
+            roots.append(offset)
+            left, right = tree['left_children'], tree['right_children']
+            for i, (l, r) in enumerate(zip(left, right)):
+                leaf = l == -1
+                # A leaf points at itself, so extra level steps leave it in place
+                nodes['left'].append(offset + (i if leaf else l))
+                nodes['right'].append(offset + (i if leaf else r))
+                nodes['feature'].append(0 if leaf else tree['split_indices'][i])
+                nodes['threshold'].append(np.inf if leaf else tree['split_conditions'][i])
+                nodes['default_left'].append(bool(tree['default_left'][i]))
+                nodes['value'].append(tree['split_conditions'][i] if leaf else 0.0)
+            max_depth = max(max_depth, _depth(left, right))
+
+        return cls(nodes['feature'], np.array(nodes['threshold'], dtype=np.float32),
+                   nodes['left'], nodes['right'], nodes['default_left'], nodes['default_left'],
+                   np.zeros(len(nodes['feature']), dtype=bool),
+                   np.array(nodes['value'], dtype=np.float32), roots, n_classes,
+                   np.broadcast_to(base, (outputs,)), objective, max_depth,
+                   booster.feature_names or [f"f{i}" for i in range(int(params['num_feature']))],
+                   inclusive=False)
+
+    @classmethod
+    def _from_lightgbm(cls, booster):
+        dump = booster.dump_model()
+        objective = dump['objective'].split()[0]
+        if objective not in ('multiclass', 'multiclassova', 'binary') or dump.get('average_output'):
+            raise ValueError(f"Unsupported objective: {dump['objective']}")
+        sigmoid = 1.0
+        for token in dump['objective'].split()[1:]:
+            if token.startswith('sigmoid:'):
+                sigmoid = float(token.split(':')[1])
+        n_classes = max(int(dump['num_class']), 2)
+
+        nodes = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'default_left',
+                                 'nan_left', 'zero_default', 'value')}
+        roots, max_depth = [], 0
+
+        def add(node, depth):
+            index = len(nodes['feature'])
+            for k in nodes:
+                nodes[k].append(None)
+            if 'leaf_value' in node:
+                nodes['feature'][index], nodes['threshold'][index] = 0, np.inf
+                nodes['left'][index] = nodes['right'][index] = index
+                nodes['default_left'][index] = nodes['nan_left'][index] = True
+                nodes['zero_default'][index] = False
+                nodes['value'][index] = node['leaf_value']
+                return index, depth
+            if node['decision_type'] != '<=':
+                raise ValueError("Categorical splits are not supported")
+            threshold, missing = node['threshold'], node['missing_type']
+            nodes['feature'][index] = node['split_feature']
+            nodes['threshold'][index] = threshold
+            nodes['default_left'][index] = node['default_left']
+            # missing_type None: NaN is scored as 0.0; NaN/Zero: it takes the default branch
+            nodes['nan_left'][index] = (0.0 <= threshold) if missing == 'None' else node['default_left']
+            nodes['zero_default'][index] = missing == 'Zero'
+            nodes['value'][index] = 0.0
+            nodes['left'][index], left_depth = add(node['left_child'], depth + 1)
+            nodes['right'][index], right_depth = add(node['right_child'], depth + 1)
+            return index, max(left_depth, right_depth)
+
+        for tree in dump['tree_info']:
+            root, depth = add(tree['tree_structure'], 0)
+            roots.append(root)
+            max_depth = max(max_depth, depth)
+
+        outputs = 1 if n_classes <= 2 else n_classes
+        return cls(nodes['feature'], np.array(nodes['threshold'], dtype=np.float64),
+                   nodes['left'], nodes['right'], nodes['default_left'], nodes['nan_left'],
+                   nodes['zero_default'], np.array(nodes['value'], dtype=np.float64), roots,
+                   n_classes, np.zeros(outputs), objective, max_depth, dump['feature_names'],
+                   inclusive=True, sigmoid=sigmoid)
+
+    # Persistence
+
+    def save(self, filepath='models/xgb_model.trees.npz'):
+        """Save as .npz (temp file + rename, so a watching predictor never reads a partial file)."""
+        root, ext = os.path.splitext(filepath)
+        tmp_path = f"{root}.tmp{ext}"
+        meta = {'n_classes': self.n_classes, 'objective': self.objective, 'max_depth': self.max_depth,
+                'feature_names': self.feature_names, 'inclusive': self.inclusive, 'sigmoid': self.sigmoid}
+        np.savez(tmp_path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, default_left=self.default_left, nan_left=self.nan_left,
+                 zero_default=self.zero_default, value=self.value, roots=self.roots,
+                 base_margin=self.base_margin, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, filepath)
+        print(f"[✓] Flat tree model saved to {filepath}")
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as f:
+            arrays = {k: f[k] for k in f.files}
+        meta = json.loads(str(arrays.pop('meta')))
+        return cls(**arrays, **meta)
+
+    # Scoring
+
+    def _leaves(self, X):
+        """(n_rows, n_trees) leaf node of every tree for every row."""
+        X = X.astype(self.value.dtype, copy=False)
+        values = np.concatenate([X, -X], axis=1).ravel()
+        row_base = (np.arange(len(X)) * (2 * X.shape[1]))[:, None]
+        node = np.repeat(self._roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            feature = self._test_feature[node]
+            v = values[feature + row_base]
+            test = v < self._test_threshold[node]
+            if self._has_zero:
+                # missing_type=Zero: zeros take the default branch too
+                zero = (np.abs(v) <= ZERO_THRESHOLD) & self.zero_default[node]
+                test = np.where(zero, self.default_left[node] != self.nan_left[node], test)
+            node = self._children[2 * node + test]
+        return node
+
+    def predict_margin(self, X, batch_rows=2048):
+        """Raw scores, (n_rows,) for binary models and (n_rows, n_classes) otherwise."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty((len(X), self._outputs), dtype=self.value.dtype)
+        rounds = len(self.roots) // self._outputs
+        for start in range(0, len(X), batch_rows):
+            chunk = X[start:start + batch_rows]
+            values = self.value[self._leaves(chunk)].reshape(len(chunk), rounds, self._outputs)
+            # Sequential sum from the base margin, tree by tree, as the boosters accumulate
+            values = np.concatenate([np.broadcast_to(self.base_margin, (len(chunk), 1, self._outputs)),
+                                     values], axis=1)
+            out[start:start + len(chunk)] = np.cumsum(values, axis=1, dtype=self.value.dtype)[:, -1]
+        return out[:, 0] if self._outputs == 1 else out
+
+    def predict_proba(self, X):
+        """(n_rows, n_classes) class probabilities."""
+        margin = self.predict_margin(X)
+        if self._outputs == 1:
+            one = margin.dtype.type(1)
+            p = one / (one + np.exp(-self.sigmoid * margin if self.sigmoid != 1.0 else -margin))
+            return np.column_stack([one - p, p])
+        if self.objective == 'multiclassova':
+            one = margin.dtype.type(1)
+            return one / (one + np.exp(-self.sigmoid * margin))
+        exp = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        """Class index per row."""
+        margin = self.predict_margin(X)
+        return (margin > 0).astype(np.int64) if margin.ndim == 1 else margin.argmax(axis=1)
+
+
+def _depth(left, right):
+    depth, stack = 0, [(0, 0)]
+    while stack:
+        node, d = stack.pop()
+        depth = max(depth, d)
+        if left[node] != -1:
+            stack.extend([(left[node], d + 1), (right[node], d + 1)])
+    return depth
+
+
+def _native_scorer(model, margin=False):
+    """x -> native booster output (probabilities, or raw margins) for the same float32 rows."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else getattr(model, 'booster_', model)
+    if type(booster).__module__.startswith('xgboost'):
+        booster.set_param({'nthread': 1})
+        return lambda X: booster.inplace_predict(X, predict_type='margin' if margin else 'value')
+    return lambda X: booster.predict(X, raw_score=margin, num_threads=1)
+
+
+def check_exact(flat, model, X, margin_rtol=1e-5, margin_atol=1e-5):
+    """
+    Compare the flat model with the native booster on the rows of `X`:
+    class predictions must be identical and margins equal within
+    `margin_rtol`/`margin_atol` (float rounding, e.g. of the base score).
+
+    Returns:
+        dict: rows, class_mismatches, max_margin_diff and max_proba_diff
+
+    Raises:
+        AssertionError: If any class differs or a margin is outside the tolerance
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    native_margin = np.asarray(_native_scorer(model, margin=True)(X)).reshape(len(X), -1)
+    flat_margin = flat.predict_margin(X).reshape(len(X), -1)
+    native_proba = np.asarray(_native_scorer(model)(X)).reshape(len(X), -1)
+    if native_proba.shape[1] == 1:
+        native_proba = np.column_stack([1 - native_proba, native_proba])
+    flat_proba = flat.predict_proba(X)
+    report = {
+        'rows': len(X),
+        'class_mismatches': int((native_proba.argmax(axis=1) != flat_proba.argmax(axis=1)).sum()),
+        'max_margin_diff': float(np.abs(native_margin.astype(np.float64) - flat_margin).max()),
+        'max_proba_diff': float(np.abs(native_proba.astype(np.float64) - flat_proba).max()),
+    }
+    print(f"[{'✓' if report['class_mismatches'] == 0 else 'x'}] Flat vs native on {len(X):,} rows: "
+          f"{report['class_mismatches']} class mismatches, max margin diff {report['max_margin_diff']:.3g}, "
+          f"max proba diff {report['max_proba_diff']:.3g}")
+    if report['class_mismatches']:
+        raise AssertionError(f"Flat model predicts a different class on {report['class_mismatches']} row(s)")
+    if not np.allclose(flat_margin, native_margin, rtol=margin_rtol, atol=margin_atol):
+        raise AssertionError(f"Flat model margins differ by up to {report['max_margin_diff']:.3g}")
+    return report
+
+
+def benchmark_inference(flat, model, X, tick_rows=10, repeats=200, bulk_repeats=3):
+    """
+    Time the flat model against the native booster (single-threaded, float32
+    input) and the sklearn wrapper on a DataFrame, on three workloads:
+    a single row, one tick of `tick_rows` symbols and the whole of `X`.
+
+    Returns:
+        pd.DataFrame: workload, rows, and per-call milliseconds for each scorer
+    """
+    import pandas as pd
+
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    frame = pd.DataFrame(X, columns=flat.feature_names)
+    native = _native_scorer(model)
+    scorers = {'flat': flat.predict_proba, 'native_booster': native}
+    if hasattr(model, 'predict_proba'):
+        scorers['sklearn_wrapper'] = None  # Scored on DataFrame slices, as before
+
+    workloads = [('single_row', 1, repeats), ('per_tick', tick_rows, repeats), ('bulk', len(X), bulk_repeats)]
+    rows = []
+    for workload, n, reps in workloads:
+        batch, frame_batch = X[-n:], frame.iloc[-n:]
+        record = {'workload': workload, 'rows': n}
+        for name, scorer in scorers.items():
+            call = (lambda: model.predict_proba(frame_batch)) if scorer is None else (lambda: scorer(batch))
+            call()  # Warm up
+            start = time.perf_counter()
+            for _ in range(reps):
+                call()
+            record[f"{name}_ms"] = (time.perf_counter() - start) / reps * 1000
+        rows.append(record)
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    return report
+
+
+if __name__ == "__main__":
+    from dataset_schema import load_master_dataset
+    from model import CryptoModelTrainer, flat_model_path
+
+    # The labelled features the retrain pipeline writes, and the model trained on them
+    df = load_master_dataset("data/processed/training_data.parquet")
+    model = CryptoModelTrainer.from_master(df).load_model("models/xgb_model.pkl")
+    flat = FlatTreeModel.from_model(model)
+    flat.save(flat_model_path("models/xgb_model.pkl"))
+
+    X = df[flat.feature_names].to_numpy(dtype=np.float32)
+    check_exact(flat, model, X)
+    benchmark_inference(flat, model, X)
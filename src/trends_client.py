@@ -0,0 +1,143 @@
+# src/trends_client.py
+
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+MAX_KEYWORDS_PER_PAYLOAD = 5  # Google Trends limit
+
+
+class TrendsClient:
+    """
+    Google Trends client that packs up to five keywords per request and
+    caches responses.
+
+    Each payload carries a shared anchor keyword. Trends scales every payload
+    to its own 0-100 range, so batches are rescaled by the ratio of the
+    anchor's level in the first batch to its level in the batch, which keeps
+    scores comparable across batches.
+
+    Responses are kept in a TTL cache keyed by (keyword set, timeframe), in
+    memory and as Parquet files under `cache_dir`.
+    """
+
+    def __init__(self, anchor="Bitcoin", ttl=3600, cache_dir="data/cache/trends",
+                 hl='en-US', tz=360, pytrends=None):
+        self.anchor = anchor
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.hl = hl
+        self.tz = tz
+        self._pytrends = pytrends
+        self._memory = {}
+
+    @property
+    def pytrends(self):
+        if self._pytrends is None:
+            from pytrends.request import TrendReq
+            self._pytrends = TrendReq(hl=self.hl, tz=self.tz)
+        return self._pytrends
+
+    # Cache
+
+    @staticmethod
+    def _key(keywords, timeframe):
+        return (tuple(sorted(keywords)), timeframe)
+
+    def _cache_path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.parquet")
+
+    def _cache_get(self, key):
+        entry = self._memory.get(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        if self.cache_dir:
+            path = self._cache_path(key)
+            if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl:
+                df = pd.read_parquet(path)
+                self._memory[key] = (os.path.getmtime(path), df)
+                return df
+        return None
+
+    def _cache_put(self, key, df):
+        self._memory[key] = (time.time(), df)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            df.to_parquet(self._cache_path(key))
+
+    # Fetching
+
+    def _fetch_payload(self, keywords, timeframe):
+        key = self._key(keywords, timeframe)
+        df = self._cache_get(key)
+        if df is None:
+            self.pytrends.build_payload(list(keywords), cat=0, timeframe=timeframe, geo='', gprop='')
+            df = self.pytrends.interest_over_time()
+            self._cache_put(key, df)
+        return df
+
+    def interest_over_time(self, keywords, timeframe='now 7-d'):
+        """
+        Interest over time for any number of keywords.
+
+        Returns:
+            pd.DataFrame: Date-indexed, one column per keyword on the scale of
+                the first batch, plus 'isPartial'
+        """
+        others = [kw for kw in dict.fromkeys(keywords) if kw != self.anchor]
+        per_payload = MAX_KEYWORDS_PER_PAYLOAD - 1
+        batches = [others[i:i + per_payload] for i in range(0, len(others), per_payload)] or [[]]
+
+        frames = []
+        reference_level = None
+        for batch in batches:
+            df = self._fetch_payload(batch + [self.anchor], timeframe)
+            if df.empty:
+                continue
+            anchor_level = df[self.anchor].mean()
+            if reference_level is None:
+                reference_level = anchor_level
+            scale = reference_level / anchor_level if anchor_level else 1.0
+            scaled = df[batch] * scale
+            if not frames:
+                scaled[self.anchor] = df[self.anchor]
+                if 'isPartial' in df:
+                    scaled['isPartial'] = df['isPartial']
+            frames.append(scaled)
+
+        if not frames:
+            return pd.DataFrame()
+        result = pd.concat(frames, axis=1)
+        requested = [kw for kw in dict.fromkeys(keywords) if kw in result]
+        extra = ['isPartial'] if 'isPartial' in result else []
+        return result[requested + extra]
+
+    def latest_score(self, keyword, timeframe='now 7-d'):
+        """
+        Latest score for one keyword on its own 0-100 scale: Trends' value for
+        the last bar of a payload holding only that keyword, relative to the
+        keyword's peak over `timeframe`. Always this scale, whatever is cached
+        (the single-keyword payload has its own cache entry, in memory and on
+        disk); batch payloads from `interest_over_time` are relative to the
+        anchor instead and never used here. Use `interest_over_time` for
+        scores comparable across keywords.
+        """
+        df = self._fetch_payload([keyword], timeframe)
+        if df.empty:
+            return 0
+        return int(df[keyword].iloc[-1])
+
+
+_client = None
+
+
+def get_trends_client():
+    """Shared TrendsClient (created on first use)."""
+    global _client
+    if _client is None:
+        _client = TrendsClient()
+    return _client
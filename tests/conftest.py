@@ -0,0 +1,9 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# The modules import each other as top-level names (`from signal_store import ...`),
+# as when run from src/; the dashboard package lives at the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), ROOT]
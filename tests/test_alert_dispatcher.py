@@ -0,0 +1,133 @@
+# tests/test_alert_dispatcher.py
+
+import asyncio
+import datetime
+import time
+
+import pytest
+
+from alert_dispatcher import AlertDispatcher, AlertOutbox, FakeBot
+
+CHAT = '42'
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return AlertOutbox(str(tmp_path / 'outbox.sqlite'))
+
+
+def make_dispatcher(outbox, bot, **kwargs):
+    kwargs = dict({'chat_id': CHAT, 'window': 60.0, 'rate': 100.0, 'burst': 100, 'backoff': 2.0}, **kwargs)
+    return AlertDispatcher(bot=bot, outbox=outbox, **kwargs)
+
+
+def pending(outbox, horizon=3600):
+    """Outbox items still pending, including those scheduled for a later retry."""
+    return outbox.due(time.time() + horizon)
+
+
+def test_signals_are_coalesced_into_one_digest(outbox):
+    bot = FakeBot()
+    dispatcher = make_dispatcher(outbox, bot)
+    dispatcher.submit_signal('BTC/USDT', 1, confidence=0.7, price=64000)
+    dispatcher.submit_signal('ETH/USDT', 1, confidence=0.6)
+    dispatcher.submit_signal('BTC/USDT', -1, confidence=0.9, price=63000)  # Replaces the first
+
+    assert dispatcher.flush_digests() == 0  # The window hasn't passed yet
+    assert outbox.counts() == {'digest': 2}
+
+    counts = asyncio.run(dispatcher.drain(timeout=5))
+    assert counts == {'sent': 1, 'digest': 0}
+    assert len(bot.sent) == 1
+    text = bot.sent[0]['text']
+    assert bot.sent[0]['chat_id'] == CHAT
+    assert text.splitlines() == ['📈 Signal update (2 symbols)',
+                                 'BTC/USDT: Sell (conf 0.90, @ 63000)',
+                                 'ETH/USDT: Buy (conf 0.60)']
+
+
+def test_flood_control_retry_after_is_honoured(outbox):
+    bot = FakeBot(fail_first=1, retry_after=0.3)
+    dispatcher = make_dispatcher(outbox, bot)
+    dispatcher.submit_message("hello")
+
+    before = time.time()
+    assert asyncio.run(dispatcher.send_due()) == 0
+    [item] = pending(outbox)
+    assert item['attempts'] == 1
+    assert outbox.due(before + 0.25) == []  # Not before retry_after
+    assert outbox.due(time.time() + 0.35) != []
+
+    assert asyncio.run(dispatcher.send_due()) == 0  # Still waiting
+    time.sleep(0.35)
+    assert asyncio.run(dispatcher.send_due()) == 1
+    assert [s['text'] for s in bot.sent] == ["hello"]
+    assert outbox.counts() == {'sent': 1, 'digest': 0}
+
+
+def test_retry_after_as_timedelta(outbox):
+    bot = FakeBot(fail_first=1, retry_after=datetime.timedelta(seconds=30))
+    dispatcher = make_dispatcher(outbox, bot)
+    dispatcher.submit_message("hello")
+
+    asyncio.run(dispatcher.send_due())
+    assert outbox.due(time.time() + 25) == []
+    assert len(outbox.due(time.time() + 31)) == 1
+
+
+def test_errors_without_retry_after_back_off_exponentially(outbox):
+    bot = FakeBot(fail_first=2)
+    dispatcher = make_dispatcher(outbox, bot, backoff=10.0)
+    dispatcher.submit_message("hello")
+
+    asyncio.run(dispatcher.send_due())
+    assert outbox.due(time.time() + 9) == [] and len(outbox.due(time.time() + 11)) == 1
+
+    # Make the retry due now, fail again: the next delay doubles
+    outbox._update(pending(outbox)[0]['id'], "next_attempt = 0")
+    asyncio.run(dispatcher.send_due())
+    assert outbox.due(time.time() + 19) == [] and len(outbox.due(time.time() + 21)) == 1
+
+
+def test_gives_up_after_max_attempts(outbox):
+    bot = FakeBot(fail_first=10)
+    dispatcher = make_dispatcher(outbox, bot, max_attempts=2, backoff=0.0)
+    dispatcher.submit_message("hello")
+
+    asyncio.run(dispatcher.send_due())
+    asyncio.run(dispatcher.send_due())
+    assert outbox.counts() == {'failed': 1, 'digest': 0}
+    assert bot.sent == []
+
+
+def test_per_chat_rate_limit_keeps_order(outbox):
+    bot = FakeBot()
+    dispatcher = make_dispatcher(outbox, bot, rate=0.001, burst=2)
+    for i in range(4):
+        dispatcher.submit_message(f"message {i}")
+    dispatcher.submit_message("other chat", chat_id='7')
+
+    assert asyncio.run(dispatcher.send_due()) == 3
+    assert [(s['chat_id'], s['text']) for s in bot.sent] == [
+        (CHAT, "message 0"), (CHAT, "message 1"), ('7', "other chat")]
+    assert [item['payload']['text'] for item in outbox.due(time.time())] == ["message 2", "message 3"]
+
+
+def test_outbox_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'outbox.sqlite')
+    make_dispatcher(AlertOutbox(path), FakeBot()).submit_signal('SOL/USDT', 1)
+
+    bot = FakeBot()
+    restarted = make_dispatcher(AlertOutbox(path), bot)
+    asyncio.run(restarted.drain(timeout=5))
+    assert [s['text'].splitlines()[1] for s in bot.sent] == ['SOL/USDT: Buy']
+
+
+def test_missing_document_is_dropped(outbox, tmp_path):
+    bot = FakeBot()
+    dispatcher = make_dispatcher(outbox, bot)
+    dispatcher.submit_file(str(tmp_path / 'missing.pdf'), caption="report")
+
+    asyncio.run(dispatcher.send_due())
+    assert outbox.counts() == {'failed': 1, 'digest': 0}
+    assert bot.calls == 0
@@ -0,0 +1,52 @@
+# tests/test_backtest.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import compare_with_bt, run_vectorized_backtest
+
+PARITY_RTOL = 1e-12
+
+
+def make_market(n_bars=24 * 60, assets=('BTC', 'ETH', 'SOL'), seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2025-01-01', periods=n_bars, freq='h')
+    returns = rng.normal(0, 0.01, (n_bars, len(assets)))
+    prices = pd.DataFrame(np.exp(np.cumsum(returns, axis=0)) * 100, index=index, columns=list(assets))
+    signals = pd.DataFrame(rng.integers(-1, 2, (n_bars, len(assets))), index=index, columns=list(assets))
+    return prices, signals
+
+
+@pytest.mark.parametrize('scale', [1.0, 1 / 3])
+def test_equity_matches_bt(scale):
+    prices, signals = make_market()
+    result = compare_with_bt(prices, signals * scale, rtol=PARITY_RTOL)
+
+    assert result['match'], result
+    assert result['max_rel_diff'] <= PARITY_RTOL
+
+
+def test_long_only_daily_signals_match_bt():
+    prices, signals = make_market(seed=1)
+    daily = signals.clip(lower=0).resample('D').first().reindex(prices.index).ffill() / 3
+
+    assert compare_with_bt(prices, daily, rtol=PARITY_RTOL)['match']
+
+
+def test_missing_prices_are_filled_like_bt():
+    prices, signals = make_market(seed=2)
+    prices.iloc[100:130, 1] = np.nan
+    prices.iloc[:5, 2] = np.nan
+
+    assert compare_with_bt(prices, signals / 3, rtol=PARITY_RTOL)['match']
+
+
+def test_costs_are_charged_on_turnover():
+    prices, signals = make_market(seed=3)
+    free = run_vectorized_backtest(prices, signals / 3)
+    costly = run_vectorized_backtest(prices, signals / 3, fees=0.001, slippage=0.0005)
+
+    assert (costly.turnover == free.turnover).all()
+    expected = np.prod(1 - 0.0015 * free.turnover.to_numpy())
+    assert costly.equity.iloc[-1] / free.equity.iloc[-1] == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,79 @@
+# tests/test_bulk_fetcher.py
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+import bulk_fetcher
+from bulk_fetcher import FakeAsyncExchange, fetch_ohlcv_bulk
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the backoff delays instead of waiting them out."""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        if delay > 0:
+            delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(bulk_fetcher.asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr(bulk_fetcher.random, 'random', lambda: 0.0)  # No jitter
+    return delays
+
+
+def test_fetches_every_symbol_as_a_frame():
+    exchange = FakeAsyncExchange(n_candles=24)
+    results, failures = fetch_ohlcv_bulk(['BTC/USDT', 'ETH/USDT'], exchange=exchange, limit=24)
+
+    assert failures == {}
+    assert set(results) == {'BTC/USDT', 'ETH/USDT'}
+    df = results['BTC/USDT']
+    assert list(df.columns) == bulk_fetcher.OHLCV_COLUMNS
+    assert len(df) == 24
+    assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+    assert not exchange.closed  # A passed-in exchange is left open for the caller
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(sleeps):
+    exchange = FakeAsyncExchange(n_candles=5, fail_times={'ETH/USDT': 2})
+    results, failures = fetch_ohlcv_bulk(['BTC/USDT', 'ETH/USDT'], exchange=exchange,
+                                         retries=3, backoff=0.5)
+
+    assert failures == {}
+    assert len(results['ETH/USDT']) == 5
+    assert [c[0] for c in exchange.calls].count('ETH/USDT') == 3
+    assert [c[0] for c in exchange.calls].count('BTC/USDT') == 1
+    assert sleeps == [0.5, 1.0]
+
+
+def test_symbol_is_reported_failed_after_the_last_retry(sleeps):
+    exchange = FakeAsyncExchange(n_candles=5, always_fail={'SOL/USDT'})
+    results, failures = fetch_ohlcv_bulk(['BTC/USDT', 'SOL/USDT'], exchange=exchange,
+                                         retries=2, backoff=0.1)
+
+    assert set(results) == {'BTC/USDT'}
+    assert failures == {'SOL/USDT': 'ConnectionError: SOL/USDT unavailable'}
+    assert [c[0] for c in exchange.calls].count('SOL/USDT') == 3
+    assert sleeps == pytest.approx([0.1, 0.2])
+
+
+def test_concurrency_is_capped():
+    exchange = FakeAsyncExchange(n_candles=2, latency=0.01)
+    symbols = [f"C{i}/USDT" for i in range(12)]
+    results, failures = fetch_ohlcv_bulk(symbols, exchange=exchange, max_concurrency=3)
+
+    assert len(results) == 12 and not failures
+    assert exchange.max_in_flight == 3
+
+
+def test_several_timeframes_are_keyed_by_symbol_and_timeframe():
+    exchange = FakeAsyncExchange(n_candles=3)
+    results, _ = fetch_ohlcv_bulk(['BTC/USDT'], timeframes=['1h', '4h'], exchange=exchange,
+                                  since={'BTC/USDT': 1_710_000_000_000})
+
+    assert set(results) == {('BTC/USDT', '1h'), ('BTC/USDT', '4h')}
+    assert all(since == 1_710_000_000_000 for _, _, since, _ in exchange.calls)
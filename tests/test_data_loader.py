@@ -0,0 +1,41 @@
+# tests/test_data_loader.py
+
+import pandas as pd
+
+from data_loader import OHLCV_COLUMNS, append_raw_data, get_last_timestamp
+
+
+def candles(hours, close=1.0):
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2025-04-13') + pd.to_timedelta(list(hours), unit='h'),
+        'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': close, 'volume': 10.0,
+    })[OHLCV_COLUMNS]
+
+
+def test_sync_rewrites_only_the_last_candle_and_appends(tmp_path):
+    path = tmp_path / 'BTC_USDT.csv'
+    # Existing files were written with Windows line endings
+    candles(range(3)).to_csv(path, index=False, lineterminator='\r\n')
+    before = path.read_bytes()
+
+    written = append_raw_data(candles(range(1, 5), close=1.5), 'BTC/USDT', str(tmp_path))
+
+    # Hour 1 is already final on disk; hour 2 was the open candle and is refreshed
+    assert written['timestamp'].dt.hour.tolist() == [2, 3, 4]
+    data = path.read_bytes()
+    assert data.startswith(before[:before.rindex(b'2025-04-13 02:00:00')])
+    assert data.count(b'\r\n') == data.count(b'\n')
+    df = pd.read_csv(path, parse_dates=['timestamp'])
+    assert df['timestamp'].dt.hour.tolist() == [0, 1, 2, 3, 4]
+    assert df['close'].tolist() == [1.0, 1.0, 1.5, 1.5, 1.5]
+    assert get_last_timestamp('BTC/USDT', str(tmp_path)) == pd.Timestamp('2025-04-13 04:00')
+
+
+def test_first_sync_writes_the_file(tmp_path):
+    assert get_last_timestamp('ETH/USDT', str(tmp_path)) is None
+    append_raw_data(candles([1, 0, 1]), 'ETH/USDT', str(tmp_path))
+
+    df = pd.read_csv(tmp_path / 'ETH_USDT.csv', parse_dates=['timestamp'])
+    assert list(df.columns) == OHLCV_COLUMNS
+    assert df['timestamp'].dt.hour.tolist() == [0, 1]
+    assert append_raw_data(candles([0]), 'ETH/USDT', str(tmp_path)).empty
@@ -0,0 +1,51 @@
+# tests/test_feature_shards.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_shards import write_feature_shards
+
+
+def make_training_data(n_bars=50, symbols=('BTC_USDT', 'ETH_USDT', 'SOL_USDT'), seed=0):
+    """Long-format labelled rows sorted by (symbol, timestamp), as the pipeline builds them."""
+    rng = np.random.default_rng(seed)
+    timestamps = 1_700_000_000_000 + 3_600_000 * np.arange(n_bars)
+    df = pd.DataFrame({
+        'timestamp': np.tile(timestamps, len(symbols)),
+        'symbol': np.repeat(symbols, n_bars),
+        'rsi': rng.uniform(0, 100, n_bars * len(symbols)).astype(np.float32),
+        'target': rng.integers(-1, 2, n_bars * len(symbols)).astype(np.int8),
+    })
+    return df
+
+
+def test_rows_are_written_in_time_order(tmp_path):
+    df = make_training_data()
+    shards = write_feature_shards(df, str(tmp_path / 'shards'), shard_rows=40)
+
+    timestamps = np.concatenate([np.load(tmp_path / 'shards' / s['t']) for s in shards.manifest['shards']])
+    assert (np.diff(timestamps) >= 0).all()
+    # The trailing rows are the latest bars of every symbol, not the last symbols
+    holdout = shards.subset(len(shards) - 30)
+    assert holdout.to_frame().shape[0] == 30
+    assert shards.subset(0, len(shards) - 30).last_timestamp() <= timestamps[len(shards) - 30]
+
+
+def test_chunks_out_of_time_order_are_rejected(tmp_path):
+    df = make_training_data()
+    chunks = [df.iloc[i:i + 50] for i in range(0, len(df), 50)]  # One symbol per chunk
+
+    with pytest.raises(ValueError, match="time order"):
+        write_feature_shards(chunks, str(tmp_path / 'shards'))
+    assert not (tmp_path / 'shards.tmp').exists()
+
+
+def test_labels_follow_their_rows_when_sorted(tmp_path):
+    df = make_training_data()
+    shards = write_feature_shards(df, str(tmp_path / 'shards'))
+
+    expected = df.sort_values('timestamp', kind='stable')
+    frame = shards.to_frame()
+    np.testing.assert_array_equal(frame['rsi'].to_numpy(), expected['rsi'].to_numpy())
+    np.testing.assert_array_equal(frame['target'].to_numpy(), expected['target'].to_numpy())
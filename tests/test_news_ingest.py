@@ -0,0 +1,88 @@
+# tests/test_news_ingest.py
+
+import json
+
+import pandas as pd
+import pytest
+
+import news_ingest
+from news_ingest import ARTICLE_COLUMNS, SENTIMENT_COLUMNS, ArticleIndex, NewsIngestor, RecordedSession
+from sentiment_service import SentimentService
+
+RESPONSES = {
+    'BTC crypto': {'totalArticles': 3, 'articles': [
+        {'title': 'Bitcoin rallies to a great new high', 'description': 'Investors are happy',
+         'content': 'Full text', 'url': 'https://news.example/btc-high',
+         'publishedAt': '2025-04-13T10:00:00Z', 'source': {'name': 'Example News', 'url': 'https://news.example'}},
+        {'title': 'Bitcoin crashes in terrible sell-off', 'description': 'Traders fear losses',
+         'content': None, 'url': 'https://news.example/btc-crash',
+         'publishedAt': '2025-04-13T12:00:00Z', 'source': {'name': 'Example News'}},
+        # Syndicated copy of the first article under another URL
+        {'title': 'Bitcoin rallies to a great new high', 'description': 'Investors are happy',
+         'content': 'Full text', 'url': 'https://mirror.example/btc-high',
+         'publishedAt': '2025-04-13T10:05:00Z', 'source': None},
+    ]},
+    'ETH crypto': {'totalArticles': 1, 'articles': [
+        {'title': 'Ethereum upgrade ships', 'description': None, 'url': 'https://news.example/eth',
+         'publishedAt': '2025-04-13T09:00:00Z', 'source': {'name': 'Chain Daily'}},
+    ]},
+}
+
+
+@pytest.fixture(autouse=True)
+def sentiment(monkeypatch):
+    # Score with VADER but without touching the shared on-disk sentiment cache
+    service = SentimentService(cache_path=None)
+    monkeypatch.setattr(news_ingest, 'get_sentiment_service', lambda: service)
+    return service
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    path = tmp_path / 'gnews.json'
+    path.write_text(json.dumps(RESPONSES))
+    return NewsIngestor(session=RecordedSession(str(path)), index=ArticleIndex(str(tmp_path / 'index.sqlite')),
+                        api_key='test', rate=1000, burst=10)
+
+
+def test_recorded_articles_are_parsed_into_rows(ingestor):
+    df = ingestor.fetch(['BTC/USDT', 'ETH/USDT'])
+
+    assert list(df.columns) == ARTICLE_COLUMNS
+    assert sorted(ingestor.session.calls) == ['BTC crypto', 'ETH crypto']
+    assert len(df) == 4
+    first = df.iloc[0]
+    assert first['symbol'] == 'BTC/USDT' and first['coin'] == 'BTC'
+    assert first['title'] == 'Bitcoin rallies to a great new high'
+    assert first['publishedAt'] == '2025-04-13T10:00:00Z'
+    assert first['source'] == 'Example News'
+    assert pd.isna(df.iloc[2]['source'])  # 'source': null in the response
+    assert df.loc[df['symbol'] == 'ETH/USDT', 'description'].isna().all()
+
+
+def test_ingest_scores_and_drops_duplicates(ingestor):
+    df = ingestor.ingest(['BTC/USDT', 'ETH/USDT'])
+
+    assert list(df.columns) == ARTICLE_COLUMNS + SENTIMENT_COLUMNS
+    # The mirrored copy matches the first article on content and is dropped
+    assert len(df) == 3
+    scores = dict(zip(df['url'], df['sentiment_avg']))
+    assert scores['https://news.example/btc-high'] > 0
+    assert scores['https://news.example/btc-crash'] < 0
+    assert len(ingestor.index) == 3
+
+
+def test_second_ingest_only_returns_unseen_articles(ingestor):
+    ingestor.ingest(['BTC/USDT', 'ETH/USDT'])
+    again = ingestor.ingest(['BTC/USDT', 'ETH/USDT'])
+
+    assert again.empty
+    assert len(ingestor.index) == 3
+
+
+def test_unknown_query_returns_no_articles(ingestor):
+    df = ingestor.ingest(['DOGE/USDT'])
+
+    assert ingestor.session.calls == ['DOGE crypto']
+    assert df.empty
+    assert list(df.columns) == ARTICLE_COLUMNS + SENTIMENT_COLUMNS
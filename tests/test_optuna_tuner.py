@@ -0,0 +1,47 @@
+# tests/test_optuna_tuner.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_shards import write_feature_shards
+from optuna_tuner import PurgedTimeSeriesSplit
+from test_feature_shards import make_training_data
+
+HORIZON = 4
+
+
+def assert_purged(splits, times):
+    for train, test in splits:
+        # No training label (horizon bars ahead) reaches the test block
+        last_train_bar = np.flatnonzero(np.unique(times) == times[train[-1]])[0]
+        first_test_bar = np.flatnonzero(np.unique(times) == times[test[0]])[0]
+        assert first_test_bar - last_train_bar > HORIZON
+        assert not set(times[train]) & set(times[test])
+
+
+def test_splits_purge_bars_across_interleaved_symbols():
+    df = make_training_data().sort_values('timestamp', kind='stable')
+    X = df.set_index(pd.to_datetime(df['timestamp'], unit='ms'))[['rsi']]
+
+    splits = list(PurgedTimeSeriesSplit(n_splits=3, purge=HORIZON).split(X))
+
+    assert len(splits) == 3
+    assert_purged(splits, df['timestamp'].to_numpy())
+
+
+def test_shard_splits_use_shard_timestamps(tmp_path):
+    df = make_training_data()
+    shards = write_feature_shards(df, str(tmp_path / 'shards'), shard_rows=40)
+    times = shards.timestamps()
+
+    assert len(times) == len(shards)
+    np.testing.assert_array_equal(shards.subset(10, 20).timestamps(), times[10:20])
+    assert_purged(PurgedTimeSeriesSplit(purge=HORIZON).split(shards), times)
+
+
+def test_rows_out_of_time_order_are_rejected():
+    X = pd.DataFrame({'rsi': [1.0, 2.0, 3.0]}, index=pd.to_datetime([3, 1, 2], unit='h'))
+
+    with pytest.raises(ValueError, match="time order"):
+        list(PurgedTimeSeriesSplit().split(X))
@@ -0,0 +1,154 @@
+# tests/test_signal_stream.py
+
+import json
+
+import pandas as pd
+import pytest
+
+from signal_store import SignalStore
+from signal_stream import InProcessPublisher, SignalBroadcaster, format_sse
+
+
+def signals(symbols, hour=0, signal=1):
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2025-04-13') + pd.Timedelta(hours=hour),
+        'symbol': list(symbols),
+        'signal': signal,
+        'confidence': 0.8,
+    })
+
+
+def parse(message):
+    """(event, id, data) of one SSE message."""
+    fields = {}
+    for line in message.strip().splitlines():
+        name, _, value = line.partition(': ')
+        fields[name] = value
+    return fields.get('event'), fields.get('id'), json.loads(fields['data']) if 'data' in fields else None
+
+
+def next_event(stream, max_keepalives=100):
+    """Next SSE message, skipping (a bounded number of) keep-alive comments."""
+    for _ in range(max_keepalives + 1):
+        message = next(stream)
+        if not message.startswith(':'):
+            return parse(message)
+    raise AssertionError("no event before the keep-alive limit")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SignalStore(str(tmp_path / 'signals.sqlite'))
+
+
+@pytest.fixture
+def broadcaster(store):
+    # Polled by hand instead of by the watcher thread, so every step is deterministic
+    return SignalBroadcaster(store, queue_size=2)
+
+
+def test_format_sse_splits_multiline_data():
+    assert format_sse('a\nb', event='signals', event_id=3) == "id: 3\nevent: signals\ndata: a\ndata: b\n\n"
+
+
+def test_published_signals_are_delivered(broadcaster):
+    publisher = InProcessPublisher(broadcaster)
+    stream = broadcaster.stream(heartbeat=0.01)
+
+    assert next_event(stream) == ('signals', '0', [])
+    version = publisher.publish(signals(['BTC/USDT', 'ETH/USDT']))
+    assert broadcaster.poll() == 2
+
+    event, event_id, rows = next_event(stream)
+    assert event == 'signals' and event_id == str(version)
+    assert sorted(r['symbol'] for r in rows) == ['BTC/USDT', 'ETH/USDT']
+    assert all(r['label'] == 'Buy' and r['version'] == version for r in rows)
+    stream.close()
+    assert len(broadcaster) == 0
+
+
+def test_notify_wakes_the_watcher_thread(store):
+    # The poll interval is far longer than the test: only notify() can deliver in time
+    broadcaster = SignalBroadcaster(store, poll_interval=60).start()
+    try:
+        publisher = InProcessPublisher(broadcaster)
+        stream = broadcaster.stream(heartbeat=0.02)
+        next_event(stream)
+        publisher.publish(signals(['BTC/USDT']))
+
+        _, _, rows = next_event(stream, max_keepalives=250)
+        assert [r['symbol'] for r in rows] == ['BTC/USDT']
+        stream.close()
+    finally:
+        broadcaster.stop()
+
+
+def test_symbol_filter(broadcaster):
+    publisher = InProcessPublisher(broadcaster)
+    stream = broadcaster.stream(symbol='ETH/USDT', heartbeat=0.01)
+    next_event(stream)
+
+    publisher.publish(signals(['BTC/USDT']))
+    broadcaster.poll()
+    publisher.publish(signals(['BTC/USDT', 'ETH/USDT'], hour=1, signal=-1))
+    broadcaster.poll()
+
+    event, _, rows = next_event(stream)
+    assert [(r['symbol'], r['signal']) for r in rows] == [('ETH/USDT', -1)]
+    stream.close()
+
+
+def test_reconnect_with_cursor_replays_missed_rows(broadcaster):
+    publisher = InProcessPublisher(broadcaster)
+    first = publisher.publish(signals(['BTC/USDT']))
+    publisher.publish(signals(['ETH/USDT'], hour=1))
+    second = publisher.publish(signals(['SOL/USDT'], hour=2))
+
+    stream = broadcaster.stream(cursor=first, heartbeat=0.01)
+    event, event_id, rows = next_event(stream)
+    assert event == 'signals' and event_id == str(second)
+    assert sorted(r['symbol'] for r in rows) == ['ETH/USDT', 'SOL/USDT']
+    stream.close()
+
+
+def test_backlog_rows_are_not_sent_again_live(broadcaster):
+    publisher = InProcessPublisher(broadcaster)
+    first = publisher.publish(signals(['BTC/USDT']))
+    publisher.publish(signals(['ETH/USDT'], hour=1))  # Written but not yet polled
+
+    stream = broadcaster.stream(cursor=first, heartbeat=0.01)
+    _, _, backlog = next_event(stream)
+    assert [r['symbol'] for r in backlog] == ['ETH/USDT']
+
+    # The next poll covers both unpolled writes; only the new row goes out
+    last = publisher.publish(signals(['SOL/USDT'], hour=2))
+    broadcaster.poll()
+    _, event_id, rows = next_event(stream)
+    assert event_id == str(last)
+    assert [r['symbol'] for r in rows] == ['SOL/USDT']
+    stream.close()
+
+
+def test_slow_client_gets_resync_and_catches_up(broadcaster):
+    publisher = InProcessPublisher(broadcaster)
+    stream = broadcaster.stream(heartbeat=0.01)
+    next_event(stream)
+
+    # Queue of 2: the third update overflows and closes the subscription
+    for hour, symbol in enumerate(['BTC/USDT', 'ETH/USDT', 'SOL/USDT']):
+        publisher.publish(signals([symbol], hour=hour))
+        broadcaster.poll()
+    assert len(broadcaster) == 0
+
+    delivered = [next_event(stream) for _ in range(2)]
+    assert [rows[0]['symbol'] for _, _, rows in delivered] == ['BTC/USDT', 'ETH/USDT']
+    event, event_id, data = next_event(stream)
+    assert event == 'resync' and data == {'cursor': int(delivered[-1][1])}
+    with pytest.raises(StopIteration):
+        next(stream)
+
+    # Reconnecting from the resync cursor replays what was dropped
+    resumed = broadcaster.stream(cursor=data['cursor'], heartbeat=0.01)
+    _, _, rows = next_event(resumed)
+    assert [r['symbol'] for r in rows] == ['SOL/USDT']
+    resumed.close()
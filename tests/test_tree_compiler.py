@@ -0,0 +1,61 @@
+# tests/test_tree_compiler.py
+
+import numpy as np
+import pytest
+
+from tree_compiler import FlatTreeModel, check_exact
+
+
+def make_data(n_classes, n_rows=3000, n_features=8, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan  # Missing values take each node's default branch
+    X[:200, 3] = 0.0                        # Exact zeros (LightGBM's zero handling)
+    score = np.nan_to_num(X[:, 0]) + 0.5 * np.nan_to_num(X[:, 1]) - np.nan_to_num(X[:, 2]) ** 2
+    y = np.digitize(score, np.quantile(score, np.linspace(0, 1, n_classes + 1)[1:-1]))
+    return X, y
+
+
+def fit(library, n_classes, seed=0):
+    X, y = make_data(n_classes, seed=seed)
+    if library == 'xgboost':
+        from xgboost import XGBClassifier
+        model = XGBClassifier(n_estimators=40, max_depth=5, learning_rate=0.2, n_jobs=1)
+    else:
+        from lightgbm import LGBMClassifier
+        model = LGBMClassifier(n_estimators=40, num_leaves=24, learning_rate=0.2, n_jobs=1, verbose=-1)
+    return model.fit(X, y), X
+
+
+@pytest.mark.parametrize('library', ['xgboost', 'lightgbm'])
+@pytest.mark.parametrize('n_classes', [2, 3])
+def test_flat_model_predicts_the_same_classes(library, n_classes):
+    model, X = fit(library, n_classes)
+    flat = FlatTreeModel.from_model(model)
+
+    report = check_exact(flat, model, X)
+    assert report['rows'] == len(X)
+    assert report['class_mismatches'] == 0
+    assert report['max_margin_diff'] < 1e-5
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+
+@pytest.mark.parametrize('library', ['xgboost', 'lightgbm'])
+def test_saved_model_scores_the_same(library, tmp_path):
+    model, X = fit(library, 3)
+    flat = FlatTreeModel.from_model(model)
+    path = str(tmp_path / 'model.trees.npz')
+    flat.save(path)
+
+    loaded = FlatTreeModel.load(path)
+    assert loaded.feature_names == flat.feature_names
+    np.testing.assert_array_equal(loaded.predict_margin(X), flat.predict_margin(X))
+    assert check_exact(loaded, model, X)['class_mismatches'] == 0
+
+
+def test_check_exact_fails_on_a_different_model():
+    model, X = fit('xgboost', 3)
+    other, _ = fit('xgboost', 3, seed=1)
+
+    with pytest.raises(AssertionError):
+        check_exact(FlatTreeModel.from_model(other), model, X)
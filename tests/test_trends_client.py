@@ -0,0 +1,50 @@
+# tests/test_trends_client.py
+
+import pandas as pd
+import pytest
+
+from trends_client import TrendsClient
+
+# Raw interest per keyword; each payload is scaled to its own peak, as Trends does
+RAW = {'Bitcoin': [400, 500], 'Dogecoin': [5, 10], 'Solana': [20, 40]}
+
+
+class FakePyTrends:
+    def __init__(self):
+        self.payloads = []
+
+    def build_payload(self, keywords, **kwargs):
+        self.payloads.append(list(keywords))
+
+    def interest_over_time(self):
+        keywords = self.payloads[-1]
+        peak = max(max(RAW[kw]) for kw in keywords)
+        df = pd.DataFrame({kw: [round(100 * v / peak) for v in RAW[kw]] for kw in keywords},
+                          index=pd.date_range('2025-04-13', periods=2, freq='h', name='date'))
+        df['isPartial'] = False
+        return df
+
+
+@pytest.fixture
+def client(tmp_path):
+    return TrendsClient(cache_dir=str(tmp_path / 'trends'), pytrends=FakePyTrends())
+
+
+def test_batches_are_rescaled_to_the_anchor(client):
+    df = client.interest_over_time(['Dogecoin', 'Solana'])
+
+    assert list(df.columns) == ['Dogecoin', 'Solana', 'isPartial']
+    assert client.pytrends.payloads == [['Dogecoin', 'Solana', 'Bitcoin']]
+    assert df['Dogecoin'].iloc[-1] == 2
+
+
+def test_latest_score_ignores_cached_batches(client, tmp_path):
+    client.interest_over_time(['Dogecoin', 'Solana'])
+
+    # Dogecoin on its own scale, not the anchor-relative 2 of the cached batch
+    assert client.latest_score('Dogecoin') == 100
+    assert client.pytrends.payloads[-1] == ['Dogecoin']
+    # A fresh client reading the disk cache gets the same scale without a request
+    restarted = TrendsClient(cache_dir=str(tmp_path / 'trends'), pytrends=FakePyTrends())
+    assert restarted.latest_score('Dogecoin') == 100
+    assert restarted.pytrends.payloads == []